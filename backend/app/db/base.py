@@ -0,0 +1,4 @@
+"""Declarative base for the SQLAlchemy models of the local backend"""
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
@@ -0,0 +1,245 @@
+"""
+Write-behind Message Persistence
+Chat messages are queued and inserted in batches by one background task,
+so saving a message never sits on the request's latency path.
+Rows get their `id` and `created_at` here, which lets callers return them
+immediately and makes a retried batch idempotent.
+
+Callers have the row (and its id) before it is stored; reads merge in the
+rows still pending. A batch that still fails after MESSAGE_WRITER_MAX_RETRIES
+is retried row by row, and only the rows that fail on their own are moved to
+an in-memory dead-letter list (bounded, counted in metrics as `dead_letters`);
+those messages are lost when the worker exits.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional
+
+from .repository import Repository, get_repository
+from ..utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_WRITER_MAX_QUEUE = int(os.getenv("MESSAGE_WRITER_MAX_QUEUE", "2000"))
+MESSAGE_WRITER_BATCH_SIZE = int(os.getenv("MESSAGE_WRITER_BATCH_SIZE", "50"))
+MESSAGE_WRITER_FLUSH_MS = float(os.getenv("MESSAGE_WRITER_FLUSH_MS", "50"))
+MESSAGE_WRITER_MAX_RETRIES = int(os.getenv("MESSAGE_WRITER_MAX_RETRIES", "5"))
+MESSAGE_WRITER_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("MESSAGE_WRITER_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+MESSAGE_WRITER_RETRY_BACKOFF_SECONDS = 0.2
+MESSAGE_WRITER_MAX_BACKOFF_SECONDS = 5.0
+# Rows kept after their batch exhausted its retries (oldest are dropped beyond this)
+MESSAGE_WRITER_MAX_DEAD_LETTERS = 10_000
+
+
+class MessageWriter:
+    """
+    Bounded queue drained by a single writer task.
+    A batch is flushed when `batch_size` rows are waiting or `flush_ms`
+    after its first row, whichever comes first. Batches are written one at
+    a time in queue order (a failing batch is retried before the next), so
+    messages of a conversation are stored in the order they were written.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[Repository] = None,
+        max_queue: int = MESSAGE_WRITER_MAX_QUEUE,
+        batch_size: int = MESSAGE_WRITER_BATCH_SIZE,
+        flush_ms: float = MESSAGE_WRITER_FLUSH_MS,
+        max_retries: int = MESSAGE_WRITER_MAX_RETRIES
+    ):
+        self._repository = repository
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_retries = max_retries
+
+        # Created on the running loop by start()
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Structure: {conversation_id: deque of rows not yet stored, oldest first}
+        self._pending: Dict[str, Deque[Dict]] = {}
+        self._dead_letters: Deque[Dict] = deque(maxlen=MESSAGE_WRITER_MAX_DEAD_LETTERS)
+        self._last_created_at = datetime.min.replace(tzinfo=timezone.utc)
+        self._stats = {
+            "written_total": 0,
+            "batches_total": 0,
+            "retries_total": 0,
+            "failed_total": 0,
+        }
+
+    @property
+    def repository(self) -> Repository:
+        return self._repository or get_repository()
+
+    def start(self) -> None:
+        """Start the writer task on the running loop (no-op if already running)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._batch_ready = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _created_at(self) -> str:
+        # Strictly increasing, so messages written in one turn keep their order
+        now = datetime.now(timezone.utc)
+        if now <= self._last_created_at:
+            now = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = now
+        return now.isoformat()
+
+    async def write(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        tokens_used: Optional[int] = None
+    ) -> Dict:
+        """
+        Queue a message and return its row right away.
+        Waits only when the queue is full (backpressure on a stalled database).
+        """
+        row = {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "tokens_used": tokens_used,
+            "created_at": self._created_at(),
+        }
+        self.start()
+        await self._queue.put(row)
+        # No await since the put, so the writer cannot have stored (and forgotten) it yet;
+        # a request cancelled while waiting for queue space leaves nothing behind
+        self._pending.setdefault(conversation_id, deque()).append(row)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+        return row
+
+    def pending(self, conversation_id: str) -> List[Dict]:
+        """Rows of a conversation queued or in flight, oldest first"""
+        return list(self._pending.get(conversation_id, ()))
+
+    def dead_letters(self) -> List[Dict]:
+        """Rows that were never stored because their batch kept failing, oldest first"""
+        return list(self._dead_letters)
+
+    async def _next_batch(self) -> List[Dict]:
+        batch = [await self._queue.get()]
+        if self._queue.qsize() < self.batch_size - 1:
+            self._batch_ready.clear()
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._insert(batch)
+            finally:
+                self._forget(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _insert(self, batch: List[Dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.repository.insert_messages(batch)
+                self._stats["written_total"] += len(batch)
+                self._stats["batches_total"] += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    if len(batch) > 1:
+                        logger.error(f"Batch of {len(batch)} messages failed {attempt + 1} times ({e}), inserting row by row")
+                        await self._insert_each(batch)
+                    else:
+                        self._dead_letter(batch[0], e)
+                    return
+                self._stats["retries_total"] += 1
+                delay = min(MESSAGE_WRITER_RETRY_BACKOFF_SECONDS * (2 ** attempt), MESSAGE_WRITER_MAX_BACKOFF_SECONDS)
+                logger.warning(f"Message insert failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _insert_each(self, batch: List[Dict]) -> None:
+        """Insert rows one at a time so a row that cannot be stored does not take its batch with it"""
+        for row in batch:
+            try:
+                await self.repository.insert_messages([row])
+                self._stats["written_total"] += 1
+            except Exception as e:
+                self._dead_letter(row, e)
+
+    def _dead_letter(self, row: Dict, error: Exception) -> None:
+        self._stats["failed_total"] += 1
+        self._dead_letters.append(row)
+        logger.error(f"Moving message {row['id']} to the dead-letter list: {error}")
+
+    def _forget(self, batch: List[Dict]) -> None:
+        for row in batch:
+            rows = self._pending.get(row["conversation_id"])
+            if not rows:
+                continue
+            # Batches leave in queue order, so the row is almost always the oldest
+            if rows[0]["id"] == row["id"]:
+                rows.popleft()
+            else:
+                for pending in rows:
+                    if pending["id"] == row["id"]:
+                        rows.remove(pending)
+                        break
+            if not rows:
+                del self._pending[row["conversation_id"]]
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far is stored (or dropped)"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self, timeout: float = MESSAGE_WRITER_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Flush queued messages, then stop the writer task"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Shutting down with {self._queue.qsize()} messages still queued")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def metrics(self) -> Dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "pending_conversations": len(self._pending),
+            "dead_letters": len(self._dead_letters),
+            **self._stats,
+        }
+
+
+# Singleton instance
+_writer: Optional[MessageWriter] = None
+
+
+def get_message_writer() -> MessageWriter:
+    """Get or create the message writer singleton"""
+    global _writer
+    if _writer is None:
+        _writer = MessageWriter()
+        register_metrics("message_writer", _writer.metrics)
+    return _writer
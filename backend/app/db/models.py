@@ -0,0 +1,184 @@
+"""
+Tables of the local backend, mirroring the Supabase schema.
+Timestamps and dates accept datetimes or ISO strings and come back as ISO
+strings, so rows have the same shape whichever backend produced them.
+"""
+
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import JSON, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.types import TypeDecorator
+
+from .base import Base
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Timestamp(TypeDecorator):
+    """UTC timestamp; naive values are taken as UTC"""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+
+
+class Day(TypeDecorator):
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return date.fromisoformat(value) if isinstance(value, str) else value
+
+    def process_result_value(self, value, dialect):
+        return value.isoformat() if value is not None else None
+
+
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    email = Column(Text, nullable=False, unique=True)
+    username = Column(Text, nullable=False)
+    password_hash = Column(Text)
+    location = Column(Text)
+    phone = Column(Text)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+    deleted_at = Column(Timestamp)
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    __table_args__ = (Index("conversations_user_created_at_idx", "user_id", "created_at", "id"),)
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    title = Column(Text)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+    updated_at = Column(Timestamp, nullable=False, default=_now, onupdate=_now)
+    deleted_at = Column(Timestamp)
+
+
+class Message(Base):
+    __tablename__ = "messages"
+    __table_args__ = (Index("messages_conversation_created_at_id_idx", "conversation_id", "created_at", "id"),)
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    conversation_id = Column(String(36), ForeignKey("conversations.id"), nullable=False)
+    role = Column(String(16), nullable=False)
+    content = Column(Text, nullable=False)
+    tokens_used = Column(Integer)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+
+
+class RollingSummary(Base):
+    __tablename__ = "rolling_summaries"
+
+    conversation_id = Column(String(36), ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    summarized_until = Column(Timestamp, nullable=False)
+    summarized_until_id = Column(String(36), nullable=False)
+    updated_at = Column(Timestamp, nullable=False, default=_now, onupdate=_now)
+
+
+class FarmContextRow(Base):
+    __tablename__ = "farm_contexts"
+
+    conversation_id = Column(String(36), ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    context = Column(JSON, nullable=False)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(Timestamp, nullable=False, default=_now, onupdate=_now)
+
+
+class CropCategory(Base):
+    __tablename__ = "crop_categories"
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    name = Column(Text, nullable=False)
+    icon = Column(Text)
+    display_order = Column(Integer, nullable=False, default=0)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+
+
+class Crop(Base):
+    __tablename__ = "crops"
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    category_id = Column(String(36), ForeignKey("crop_categories.id"))
+    name = Column(Text, nullable=False)
+    name_hindi = Column(Text)
+    icon = Column(Text, nullable=False, default="🌾")
+    unit = Column(Text, nullable=False, default="per quintal")
+    msp_price = Column(Float)
+    msp_year = Column(Text)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+    updated_at = Column(Timestamp, nullable=False, default=_now, onupdate=_now)
+
+
+class CropPrice(Base):
+    __tablename__ = "crop_prices"
+    __table_args__ = (Index("crop_prices_crop_recorded_at_idx", "crop_id", "recorded_at"),)
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    crop_id = Column(String(36), ForeignKey("crops.id"), nullable=False)
+    price = Column(Float, nullable=False)
+    price_type = Column(Text, nullable=False, default="market")
+    market_name = Column(Text)
+    state = Column(Text)
+    district = Column(Text)
+    recorded_at = Column(Day, nullable=False, default=date.today)
+    source = Column(Text, nullable=False, default="manual")
+    created_at = Column(Timestamp, nullable=False, default=_now)
+
+
+class InsightType(Base):
+    __tablename__ = "insight_types"
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    name = Column(Text, nullable=False)
+    icon = Column(Text)
+    color = Column(Text)
+    display_order = Column(Integer, nullable=False, default=0)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+
+
+class Insight(Base):
+    __tablename__ = "insights"
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    type_id = Column(String(36), ForeignKey("insight_types.id"))
+    title = Column(Text, nullable=False)
+    message = Column(Text, nullable=False)
+    is_actionable = Column(Boolean, nullable=False, default=False)
+    action_url = Column(Text)
+    priority = Column(Integer, nullable=False, default=0)
+    target_states = Column(JSON)
+    target_crops = Column(JSON)
+    publish_at = Column(Timestamp)
+    expires_at = Column(Timestamp)
+    is_published = Column(Boolean, nullable=False, default=False)
+    is_pinned = Column(Boolean, nullable=False, default=False)
+    created_at = Column(Timestamp, nullable=False, default=_now)
+    updated_at = Column(Timestamp, nullable=False, default=_now, onupdate=_now)
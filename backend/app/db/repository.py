@@ -0,0 +1,572 @@
+"""
+Data Access Layer
+Async repository used by every route instead of calling the Supabase client directly.
+The Supabase client is synchronous, so queries run on a bounded worker pool:
+a slow query holds one DB worker, never the event loop. Rows are plain dicts
+shaped like the tables; joined rows use the keys the API returns
+(`category`, `crop`, `insight_type`).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .supabase import get_supabase
+
+logger = logging.getLogger(__name__)
+
+# Concurrent DB round trips per worker process. The Supabase client's HTTP
+# session keeps connections alive, so this also bounds the open connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+
+# Storage backend: supabase (default) or sql (local SQLAlchemy database, see db/session.py)
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase")
+
+_MESSAGE_COLUMNS = "id, role, content, created_at, tokens_used"
+
+_PRICE_COLUMNS = "id, crop_id, price, price_type, market_name, state, district, recorded_at, source, created_at"
+# Ids per `in` filter (they travel in the URL) and rows per response (PostgREST max-rows)
+_IN_FILTER_MAX_IDS = 100
+_MAX_ROWS_PER_RESPONSE = 1000
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get or create the shared worker pool for blocking DB calls"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=DB_POOL_SIZE,
+                    thread_name_prefix="db-worker"
+                )
+    return _executor
+
+
+def _first(rows: Optional[List[Dict]]) -> Optional[Dict]:
+    return rows[0] if rows else None
+
+
+def _keyset_filter(op: str, position: Tuple[str, str]) -> str:
+    """PostgREST `or` filter for rows past a (created_at, id) position; `op` is gt or lt"""
+    created_at, row_id = position
+    return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}."{row_id}")'
+
+
+def _rename(row: Dict, source: str, target: str) -> Dict:
+    """Move an embedded (joined) row to the key the API exposes"""
+    row[target] = row.pop(source, None)
+    return row
+
+
+class Repository(ABC):
+    """Storage operations the API needs, independent of the backend"""
+
+    # === Conversations ===
+
+    @abstractmethod
+    async def create_conversation(self, user_id: str, title: str) -> Optional[Dict]:
+        """Insert a conversation and return the stored row"""
+
+    @abstractmethod
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        """`id`, `user_id` and `deleted_at` of a conversation, or None"""
+
+    @abstractmethod
+    async def conversation_summaries(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        """
+        A user's conversations that are not deleted, newest first (by
+        `created_at`, then `id`), in one query. Rows carry `id`, `title`,
+        `created_at`, `updated_at`, `last_message` (first 100 characters),
+        `last_message_role` and `message_count`.
+        `before` is the (created_at, id) of the last row of the previous page.
+        """
+
+    @abstractmethod
+    async def update_conversation(self, conversation_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        """Update columns and return the updated row, or None if it does not exist"""
+
+    # === Messages ===
+
+    @abstractmethod
+    async def insert_messages(self, rows: List[Dict[str, Any]]) -> List[Dict]:
+        """
+        Insert messages in one round trip. Rows carry their own `id`;
+        rows whose id already exists are skipped, so retrying a batch is safe.
+        """
+
+    @abstractmethod
+    async def list_messages(self, conversation_id: str, limit: int, offset: int = 0) -> List[Dict]:
+        """A page of messages by offset, oldest first"""
+
+    @abstractmethod
+    async def messages_after(
+        self,
+        conversation_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        """
+        Up to `limit` messages following the (created_at, id) position
+        `after` (from the first message if None), oldest first
+        """
+
+    @abstractmethod
+    async def messages_before(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        """
+        Up to `limit` messages preceding the (created_at, id) position
+        `before` (the newest ones if None), oldest first
+        """
+
+    @abstractmethod
+    async def recent_messages(self, conversation_id: str, limit: int) -> List[Dict]:
+        """The last `limit` messages (`id`, `role`, `content`, `tokens_used`, `created_at`), oldest first"""
+
+    @abstractmethod
+    async def get_rolling_summary(self, conversation_id: str) -> Optional[Dict]:
+        """
+        `summary`, `summarized_until` and `summarized_until_id` (the position
+        of the last message folded into it), or None if there is no summary
+        """
+
+    @abstractmethod
+    async def save_rolling_summary(self, conversation_id: str, summary: str, until: Tuple[str, str]) -> None:
+        """Insert or replace a conversation's summary; `until` is the (created_at, id) of its last message"""
+
+    @abstractmethod
+    async def get_farm_context(self, conversation_id: str) -> Optional[Dict]:
+        """`context` (FarmContext fields) and its `version`, or None if none is stored"""
+
+    @abstractmethod
+    async def save_farm_context(self, conversation_id: str, context: Dict[str, Any], version: int) -> bool:
+        """
+        Store `context` as `version`, only if the stored version is `version - 1`
+        (none stored for version 1). Returns False if another write got there first.
+        """
+
+    # === Users ===
+
+    @abstractmethod
+    async def create_user(self, row: Dict[str, Any]) -> Optional[Dict]:
+        """Insert a user and return the stored row"""
+
+    @abstractmethod
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        """Public columns of an active user, or None"""
+
+    # === Crops ===
+
+    @abstractmethod
+    async def list_categories(self) -> List[Dict]:
+        """Crop categories in display order"""
+
+    @abstractmethod
+    async def create_category(self, row: Dict[str, Any]) -> Optional[Dict]:
+        """Insert a crop category and return the stored row"""
+
+    @abstractmethod
+    async def list_crops(self, active_only: bool = False, category_id: Optional[str] = None) -> List[Dict]:
+        """Crops by name, each with its `category` (name, icon)"""
+
+    @abstractmethod
+    async def get_crop(self, crop_id: str) -> Optional[Dict]:
+        """A crop with its `category`, or None"""
+
+    @abstractmethod
+    async def create_crop(self, row: Dict[str, Any]) -> Optional[Dict]:
+        """Insert a crop and return the stored row"""
+
+    @abstractmethod
+    async def update_crop(self, crop_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        """Update columns and return the updated row, or None if it does not exist"""
+
+    # === Prices ===
+
+    @abstractmethod
+    async def list_prices(self, crop_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Newest price entries, each with its `crop` (name, icon)"""
+
+    @abstractmethod
+    async def price_histories(self, crop_ids: List[str], since: date) -> List[Dict]:
+        """`crop_id`, `price` and `recorded_at` of the crops' entries since `since`, oldest first per crop"""
+
+    @abstractmethod
+    async def insert_prices(self, rows: List[Dict[str, Any]]) -> List[Dict]:
+        """Insert price entries and return the stored rows"""
+
+    @abstractmethod
+    async def delete_price(self, price_id: str) -> bool:
+        """Delete a price entry; False if it did not exist"""
+
+    # === Insights ===
+
+    @abstractmethod
+    async def list_insight_types(self) -> List[Dict]:
+        """Insight types in display order"""
+
+    @abstractmethod
+    async def list_insights(
+        self,
+        published_only: bool = False,
+        type_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Newest insights, each with its `insight_type` (name, icon, color)"""
+
+    @abstractmethod
+    async def published_insights(self, now: str, limit: int = 10) -> List[Dict]:
+        """Insights published by `now` (ISO timestamp), by priority then newest"""
+
+    @abstractmethod
+    async def get_insight(self, insight_id: str) -> Optional[Dict]:
+        """An insight with its `insight_type`, or None"""
+
+    @abstractmethod
+    async def create_insight(self, row: Dict[str, Any]) -> Optional[Dict]:
+        """Insert an insight and return the stored row"""
+
+    @abstractmethod
+    async def update_insight(self, insight_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        """Update columns and return the updated row, or None if it does not exist"""
+
+    @abstractmethod
+    async def delete_insight(self, insight_id: str) -> bool:
+        """Delete an insight; False if it did not exist"""
+
+    # === Stats ===
+
+    @abstractmethod
+    async def count_rows(self, table: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Rows in `table` whose columns equal `filters`"""
+
+
+class SupabaseRepository(Repository):
+    """
+    Repository over the synchronous Supabase client.
+    Queries are built on the event loop and executed on the DB worker pool.
+    """
+
+    def __init__(self, client: Any = None, executor: Optional[ThreadPoolExecutor] = None):
+        self._client = client
+        self._executor = executor
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = get_supabase()
+        return self._client
+
+    def table(self, name: str) -> Any:
+        return self.client.table(name)
+
+    async def execute(self, query: Any) -> Any:
+        """Run a built PostgREST query on the DB worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor or get_db_executor(), query.execute)
+
+    async def _rows(self, query: Any) -> List[Dict]:
+        return (await self.execute(query)).data or []
+
+    # === Conversations ===
+
+    async def create_conversation(self, user_id: str, title: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            self.table("conversations").insert({"user_id": user_id, "title": title})
+        ))
+
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            self.table("conversations")
+            .select("id, user_id, deleted_at")
+            .eq("id", conversation_id)
+            .limit(1)
+        ))
+
+    async def conversation_summaries(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        # Function defined in supabase/migrations/*_conversation_summaries.sql
+        before_created_at, before_id = before or (None, None)
+        return await self._rows(self.client.rpc("conversation_summaries", {
+            "p_user_id": user_id,
+            "p_limit": limit,
+            "p_before_created_at": before_created_at,
+            "p_before_id": before_id,
+        }))
+
+    async def update_conversation(self, conversation_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(
+            self.table("conversations").update(fields).eq("id", conversation_id)
+        ))
+
+    # === Messages ===
+
+    async def insert_messages(self, rows: List[Dict[str, Any]]) -> List[Dict]:
+        return await self._rows(self.table("messages").upsert(rows, ignore_duplicates=True))
+
+    async def list_messages(self, conversation_id: str, limit: int, offset: int = 0) -> List[Dict]:
+        return await self._rows(
+            self.table("messages")
+            .select(_MESSAGE_COLUMNS)
+            .eq("conversation_id", conversation_id)
+            .order("created_at", desc=False)
+            .range(offset, offset + limit - 1)
+        )
+
+    async def messages_after(
+        self,
+        conversation_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        query = self.table("messages").select(_MESSAGE_COLUMNS).eq("conversation_id", conversation_id)
+        if after:
+            query = query.or_(_keyset_filter("gt", after))
+        return await self._rows(query.order("created_at").order("id").limit(limit))
+
+    async def messages_before(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        query = self.table("messages").select(_MESSAGE_COLUMNS).eq("conversation_id", conversation_id)
+        if before:
+            query = query.or_(_keyset_filter("lt", before))
+        rows = await self._rows(query.order("created_at", desc=True).order("id", desc=True).limit(limit))
+        rows.reverse()
+        return rows
+
+    async def recent_messages(self, conversation_id: str, limit: int) -> List[Dict]:
+        rows = await self._rows(
+            self.table("messages")
+            .select("id, role, content, tokens_used, created_at")
+            .eq("conversation_id", conversation_id)
+            .order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit)
+        )
+        rows.reverse()
+        return rows
+
+    async def get_rolling_summary(self, conversation_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            self.table("rolling_summaries")
+            .select("summary, summarized_until, summarized_until_id")
+            .eq("conversation_id", conversation_id)
+            .limit(1)
+        ))
+
+    async def save_rolling_summary(self, conversation_id: str, summary: str, until: Tuple[str, str]) -> None:
+        await self.execute(self.table("rolling_summaries").upsert({
+            "conversation_id": conversation_id,
+            "summary": summary,
+            "summarized_until": until[0],
+            "summarized_until_id": until[1],
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }, on_conflict="conversation_id"))
+
+    async def get_farm_context(self, conversation_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            self.table("farm_contexts")
+            .select("context, version")
+            .eq("conversation_id", conversation_id)
+            .limit(1)
+        ))
+
+    async def save_farm_context(self, conversation_id: str, context: Dict[str, Any], version: int) -> bool:
+        updated_at = datetime.now(timezone.utc).isoformat()
+        if version == 1:
+            query = self.table("farm_contexts").upsert({
+                "conversation_id": conversation_id,
+                "context": context,
+                "version": version,
+                "updated_at": updated_at,
+            }, on_conflict="conversation_id", ignore_duplicates=True)
+        else:
+            query = (
+                self.table("farm_contexts")
+                .update({"context": context, "version": version, "updated_at": updated_at})
+                .eq("conversation_id", conversation_id)
+                .eq("version", version - 1)
+            )
+        # Only a row that was written comes back
+        return bool(await self._rows(query))
+
+    # === Users ===
+
+    async def create_user(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(self.table("users").insert(row)))
+
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            self.table("users")
+            .select("id, email, username, location, phone, created_at")
+            .eq("id", user_id)
+            .is_("deleted_at", "null")
+            .limit(1)
+        ))
+
+    # === Crops ===
+
+    async def list_categories(self) -> List[Dict]:
+        return await self._rows(self.table("crop_categories").select("*").order("display_order"))
+
+    async def create_category(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(self.table("crop_categories").insert(row)))
+
+    async def list_crops(self, active_only: bool = False, category_id: Optional[str] = None) -> List[Dict]:
+        query = self.table("crops").select("*, crop_categories(name, icon)")
+        if active_only:
+            query = query.eq("is_active", True)
+        if category_id:
+            query = query.eq("category_id", category_id)
+        rows = await self._rows(query.order("name"))
+        return [_rename(row, "crop_categories", "category") for row in rows]
+
+    async def get_crop(self, crop_id: str) -> Optional[Dict]:
+        row = _first(await self._rows(
+            self.table("crops").select("*, crop_categories(name, icon)").eq("id", crop_id)
+        ))
+        return _rename(row, "crop_categories", "category") if row else None
+
+    async def create_crop(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(self.table("crops").insert(row)))
+
+    async def update_crop(self, crop_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(self.table("crops").update(fields).eq("id", crop_id)))
+
+    # === Prices ===
+
+    async def list_prices(self, crop_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        query = self.table("crop_prices").select(f"{_PRICE_COLUMNS}, crops(name, icon)")
+        if crop_id:
+            query = query.eq("crop_id", crop_id)
+        rows = await self._rows(query.order("recorded_at", desc=True).limit(limit))
+        return [_rename(row, "crops", "crop") for row in rows]
+
+    async def price_histories(self, crop_ids: List[str], since: date) -> List[Dict]:
+        # Usually one request; long id lists and results are split to stay within API limits
+        rows: List[Dict] = []
+        for start in range(0, len(crop_ids), _IN_FILTER_MAX_IDS):
+            offset = 0
+            while True:
+                page = await self._rows(
+                    self.table("crop_prices")
+                    .select("crop_id, price, recorded_at")
+                    .in_("crop_id", crop_ids[start:start + _IN_FILTER_MAX_IDS])
+                    .gte("recorded_at", since.isoformat())
+                    .order("recorded_at")
+                    .order("id")
+                    .range(offset, offset + _MAX_ROWS_PER_RESPONSE - 1)
+                )
+                rows.extend(page)
+                if len(page) < _MAX_ROWS_PER_RESPONSE:
+                    break
+                offset += _MAX_ROWS_PER_RESPONSE
+        return rows
+
+    async def insert_prices(self, rows: List[Dict[str, Any]]) -> List[Dict]:
+        return await self._rows(self.table("crop_prices").insert(rows))
+
+    async def delete_price(self, price_id: str) -> bool:
+        return bool(await self._rows(self.table("crop_prices").delete().eq("id", price_id)))
+
+    # === Insights ===
+
+    async def list_insight_types(self) -> List[Dict]:
+        return await self._rows(self.table("insight_types").select("*").order("display_order"))
+
+    async def list_insights(
+        self,
+        published_only: bool = False,
+        type_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        query = self.table("insights").select("*, insight_types(name, icon, color)")
+        if published_only:
+            query = query.eq("is_published", True)
+        if type_id:
+            query = query.eq("type_id", type_id)
+        rows = await self._rows(query.order("created_at", desc=True).limit(limit))
+        return [_rename(row, "insight_types", "insight_type") for row in rows]
+
+    async def published_insights(self, now: str, limit: int = 10) -> List[Dict]:
+        rows = await self._rows(
+            self.table("insights")
+            .select("*, insight_types(name, icon, color)")
+            .eq("is_published", True)
+            .lte("publish_at", now)
+            .order("priority", desc=True)
+            .order("created_at", desc=True)
+            .limit(limit)
+        )
+        return [_rename(row, "insight_types", "insight_type") for row in rows]
+
+    async def get_insight(self, insight_id: str) -> Optional[Dict]:
+        row = _first(await self._rows(
+            self.table("insights").select("*, insight_types(name, icon, color)").eq("id", insight_id)
+        ))
+        return _rename(row, "insight_types", "insight_type") if row else None
+
+    async def create_insight(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(self.table("insights").insert(row)))
+
+    async def update_insight(self, insight_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(self.table("insights").update(fields).eq("id", insight_id)))
+
+    async def delete_insight(self, insight_id: str) -> bool:
+        return bool(await self._rows(self.table("insights").delete().eq("id", insight_id)))
+
+    # === Stats ===
+
+    async def count_rows(self, table: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        query = self.table(table).select("id", count="exact")
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        # Only the count is needed; don't transfer the ids
+        result = await self.execute(query.limit(1))
+        return result.count or 0
+
+
+# Singleton instance
+_repository: Optional[Repository] = None
+
+
+def create_repository(backend: str = DB_BACKEND) -> Repository:
+    """Build the repository selected by DB_BACKEND"""
+    if backend == "sql":
+        from .sql_repository import SqlRepository
+        return SqlRepository()
+    if backend != "supabase":
+        raise ValueError(f"Unknown DB_BACKEND: {backend!r} (expected 'supabase' or 'sql')")
+    return SupabaseRepository()
+
+
+def get_repository() -> Repository:
+    """Get or create the repository singleton"""
+    global _repository
+    if _repository is None:
+        _repository = create_repository()
+    return _repository
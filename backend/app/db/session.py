@@ -1,14 +1,66 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+"""
+Local SQL Database Engine
+SQLAlchemy engine for the local backend (DB_BACKEND=sql): SQLite or a local
+Postgres. Created on first use, so importing this module needs no database;
+pooled, with statement echo off unless DB_ECHO is set.
+"""
+
 import os
+import threading
+from typing import Optional
+
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-assert DATABASE_URL is not None, "DATABASE_URL is not set in .env"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./krishi.db")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+# Same setting as the Supabase worker pool: concurrent DB round trips per worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or ":memory:" in url
+
+
+def _sqlite_pragmas(dbapi_connection, _record) -> None:
+    # WAL lets readers proceed while the message writer inserts
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, echo: bool = DB_ECHO) -> Engine:
+    """Pooled engine for `url`"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=echo, pool_size=DB_POOL_SIZE, max_overflow=0, pool_pre_ping=True)
+
+    connect_args = {"check_same_thread": False, "timeout": 30}
+    if _is_memory_sqlite(url):
+        # One shared connection, or every pooled connection would get its own empty database
+        return create_engine(url, echo=echo, connect_args=connect_args, poolclass=StaticPool)
+
+    engine = create_engine(url, echo=echo, connect_args=connect_args, pool_size=DB_POOL_SIZE, max_overflow=0)
+    event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+def get_engine() -> Engine:
+    """Get or create the engine singleton (also binds SessionLocal)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+                SessionLocal.configure(bind=_engine)
+    return _engine
@@ -0,0 +1,389 @@
+"""
+Local SQL Repository
+Repository on a SQLAlchemy engine (SQLite or a local Postgres), selected
+with DB_BACKEND=sql, so the API can run, be tested and be load tested
+without Supabase or a network. Queries run on the same bounded DB worker
+pool as the Supabase backend and return rows of the same shape.
+"""
+
+import asyncio
+import threading
+from contextlib import nullcontext
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import Table, and_, delete, func, insert, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import StaticPool
+
+from .base import Base
+from .models import (
+    Conversation, Crop, CropCategory, CropPrice, FarmContextRow, Insight, InsightType, Message, RollingSummary,
+    User
+)
+from .repository import Repository, _first, get_db_executor
+from .session import get_engine
+
+T = TypeVar("T")
+
+conversations: Table = Conversation.__table__
+messages: Table = Message.__table__
+rolling_summaries: Table = RollingSummary.__table__
+farm_contexts: Table = FarmContextRow.__table__
+users: Table = User.__table__
+crop_categories: Table = CropCategory.__table__
+crops: Table = Crop.__table__
+crop_prices: Table = CropPrice.__table__
+insight_types: Table = InsightType.__table__
+insights: Table = Insight.__table__
+
+
+def _keyset(table: Table, op: str, position: Tuple[str, str]) -> Any:
+    """Rows past a (created_at, id) position; `op` is gt or lt"""
+    created_at, row_id = position
+    if op == "gt":
+        return or_(table.c.created_at > created_at, and_(table.c.created_at == created_at, table.c.id > row_id))
+    return or_(table.c.created_at < created_at, and_(table.c.created_at == created_at, table.c.id < row_id))
+
+
+def _nest(row: Dict, key: str, columns: List[str]) -> Dict:
+    """Move joined `<key>_<column>` values into `row[key]`, like a PostgREST embed"""
+    values = {column: row.pop(f"{key}_{column}") for column in columns}
+    row[key] = values if any(v is not None for v in values.values()) else None
+    return row
+
+
+class SqlRepository(Repository):
+    """
+    Each call runs in its own transaction on a pooled connection.
+    Tables are created on first use if they do not exist.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, executor: Any = None):
+        self._engine = engine
+        self._executor = executor
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._connection_lock: Any = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_engine()
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    Base.metadata.create_all(self._engine)
+                    # An in-memory SQLite database is one shared connection; take turns on it
+                    shared = isinstance(self._engine.pool, StaticPool)
+                    self._connection_lock = threading.Lock() if shared else nullcontext()
+                    self._schema_ready = True
+        return self._engine
+
+    def _transaction(self, work: Callable[[Connection], T]) -> T:
+        engine = self.engine
+        with self._connection_lock, engine.begin() as conn:
+            return work(conn)
+
+    async def run(self, work: Callable[[Connection], T]) -> T:
+        """Run `work(connection)` in a transaction on the DB worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor or get_db_executor(), self._transaction, work)
+
+    async def _rows(self, statement: Any) -> List[Dict]:
+        return await self.run(lambda conn: [dict(row) for row in conn.execute(statement).mappings()])
+
+    def _dialect_insert(self, table: Table) -> Any:
+        """INSERT supporting ON CONFLICT (PostgreSQL and SQLite)"""
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert(table)
+
+    def _insert(self, table: Table, ignore_duplicates: bool = False) -> Any:
+        if ignore_duplicates and self.engine.dialect.name in ("postgresql", "sqlite"):
+            return self._dialect_insert(table).on_conflict_do_nothing(index_elements=["id"])
+        return insert(table)
+
+    async def _insert_rows(self, table: Table, rows: List[Dict[str, Any]], ignore_duplicates: bool = False) -> List[Dict]:
+        if not rows:
+            return []
+        statement = self._insert(table, ignore_duplicates).returning(*table.c)
+
+        def work(conn: Connection) -> List[Dict]:
+            # executemany needs every row to set the same columns
+            if all(row.keys() == rows[0].keys() for row in rows):
+                return [dict(row) for row in conn.execute(statement, rows).mappings()]
+            return [dict(conn.execute(statement, row).mappings().one()) for row in rows]
+
+        return await self.run(work)
+
+    async def _update(self, table: Table, row_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._rows(
+            update(table).where(table.c.id == row_id).values(fields).returning(*table.c)
+        ))
+
+    async def _delete(self, table: Table, row_id: str) -> bool:
+        return bool(await self._rows(delete(table).where(table.c.id == row_id).returning(table.c.id)))
+
+    # === Conversations ===
+
+    async def create_conversation(self, user_id: str, title: str) -> Optional[Dict]:
+        return _first(await self._insert_rows(conversations, [{"user_id": user_id, "title": title}]))
+
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            select(conversations.c.id, conversations.c.user_id, conversations.c.deleted_at)
+            .where(conversations.c.id == conversation_id)
+        ))
+
+    async def conversation_summaries(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        of_conversation = messages.c.conversation_id == conversations.c.id
+        newest = messages.c.created_at.desc()
+        query = (
+            select(
+                conversations.c.id,
+                conversations.c.title,
+                conversations.c.created_at,
+                conversations.c.updated_at,
+                select(func.substr(messages.c.content, 1, 100)).where(of_conversation)
+                .order_by(newest).limit(1).scalar_subquery().label("last_message"),
+                select(messages.c.role).where(of_conversation)
+                .order_by(newest).limit(1).scalar_subquery().label("last_message_role"),
+                select(func.count()).where(of_conversation).scalar_subquery().label("message_count"),
+            )
+            .where(conversations.c.user_id == user_id, conversations.c.deleted_at.is_(None))
+            .order_by(conversations.c.created_at.desc(), conversations.c.id.desc())
+            .limit(limit)
+        )
+        if before:
+            query = query.where(_keyset(conversations, "lt", before))
+        return await self._rows(query)
+
+    async def update_conversation(self, conversation_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return await self._update(conversations, conversation_id, fields)
+
+    # === Messages ===
+
+    async def insert_messages(self, rows: List[Dict[str, Any]]) -> List[Dict]:
+        return await self._insert_rows(messages, rows, ignore_duplicates=True)
+
+    def _select_messages(self, conversation_id: str) -> Any:
+        return select(
+            messages.c.id, messages.c.role, messages.c.content, messages.c.created_at, messages.c.tokens_used
+        ).where(messages.c.conversation_id == conversation_id)
+
+    async def list_messages(self, conversation_id: str, limit: int, offset: int = 0) -> List[Dict]:
+        return await self._rows(
+            self._select_messages(conversation_id).order_by(messages.c.created_at).limit(limit).offset(offset)
+        )
+
+    async def messages_after(
+        self,
+        conversation_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        query = self._select_messages(conversation_id)
+        if after:
+            query = query.where(_keyset(messages, "gt", after))
+        return await self._rows(query.order_by(messages.c.created_at, messages.c.id).limit(limit))
+
+    async def messages_before(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        query = self._select_messages(conversation_id)
+        if before:
+            query = query.where(_keyset(messages, "lt", before))
+        rows = await self._rows(query.order_by(messages.c.created_at.desc(), messages.c.id.desc()).limit(limit))
+        rows.reverse()
+        return rows
+
+    async def recent_messages(self, conversation_id: str, limit: int) -> List[Dict]:
+        rows = await self._rows(
+            select(messages.c.id, messages.c.role, messages.c.content, messages.c.tokens_used, messages.c.created_at)
+            .where(messages.c.conversation_id == conversation_id)
+            .order_by(messages.c.created_at.desc(), messages.c.id.desc())
+            .limit(limit)
+        )
+        rows.reverse()
+        return rows
+
+    async def get_rolling_summary(self, conversation_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            select(
+                rolling_summaries.c.summary,
+                rolling_summaries.c.summarized_until,
+                rolling_summaries.c.summarized_until_id,
+            ).where(rolling_summaries.c.conversation_id == conversation_id)
+        ))
+
+    async def save_rolling_summary(self, conversation_id: str, summary: str, until: Tuple[str, str]) -> None:
+        fields = {"summary": summary, "summarized_until": until[0], "summarized_until_id": until[1]}
+        statement = self._dialect_insert(rolling_summaries).values(conversation_id=conversation_id, **fields)
+        statement = statement.on_conflict_do_update(
+            index_elements=["conversation_id"], set_={**fields, "updated_at": func.now()}
+        )
+        await self.run(lambda conn: conn.execute(statement))
+
+    async def get_farm_context(self, conversation_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            select(farm_contexts.c.context, farm_contexts.c.version)
+            .where(farm_contexts.c.conversation_id == conversation_id)
+        ))
+
+    async def save_farm_context(self, conversation_id: str, context: Dict[str, Any], version: int) -> bool:
+        if version == 1:
+            statement = self._dialect_insert(farm_contexts).values(
+                conversation_id=conversation_id, context=context, version=version
+            ).on_conflict_do_nothing(index_elements=["conversation_id"])
+        else:
+            statement = update(farm_contexts).where(
+                farm_contexts.c.conversation_id == conversation_id, farm_contexts.c.version == version - 1
+            ).values(context=context, version=version, updated_at=func.now())
+        # Only a row that was written comes back
+        return bool(await self._rows(statement.returning(farm_contexts.c.version)))
+
+    # === Users ===
+
+    async def create_user(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._insert_rows(users, [row]))
+
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        return _first(await self._rows(
+            select(users.c.id, users.c.email, users.c.username, users.c.location, users.c.phone, users.c.created_at)
+            .where(users.c.id == user_id, users.c.deleted_at.is_(None))
+        ))
+
+    # === Crops ===
+
+    async def list_categories(self) -> List[Dict]:
+        return await self._rows(select(crop_categories).order_by(crop_categories.c.display_order))
+
+    async def create_category(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._insert_rows(crop_categories, [row]))
+
+    def _select_crops(self) -> Any:
+        return select(
+            crops,
+            crop_categories.c.name.label("category_name"),
+            crop_categories.c.icon.label("category_icon"),
+        ).select_from(crops.outerjoin(crop_categories, crops.c.category_id == crop_categories.c.id))
+
+    async def list_crops(self, active_only: bool = False, category_id: Optional[str] = None) -> List[Dict]:
+        query = self._select_crops()
+        if active_only:
+            query = query.where(crops.c.is_active.is_(True))
+        if category_id:
+            query = query.where(crops.c.category_id == category_id)
+        rows = await self._rows(query.order_by(crops.c.name))
+        return [_nest(row, "category", ["name", "icon"]) for row in rows]
+
+    async def get_crop(self, crop_id: str) -> Optional[Dict]:
+        row = _first(await self._rows(self._select_crops().where(crops.c.id == crop_id)))
+        return _nest(row, "category", ["name", "icon"]) if row else None
+
+    async def create_crop(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._insert_rows(crops, [row]))
+
+    async def update_crop(self, crop_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return await self._update(crops, crop_id, fields)
+
+    # === Prices ===
+
+    async def list_prices(self, crop_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        query = select(
+            crop_prices,
+            crops.c.name.label("crop_name"),
+            crops.c.icon.label("crop_icon"),
+        ).select_from(crop_prices.outerjoin(crops, crop_prices.c.crop_id == crops.c.id))
+        if crop_id:
+            query = query.where(crop_prices.c.crop_id == crop_id)
+        rows = await self._rows(query.order_by(crop_prices.c.recorded_at.desc()).limit(limit))
+        return [_nest(row, "crop", ["name", "icon"]) for row in rows]
+
+    async def price_histories(self, crop_ids: List[str], since: date) -> List[Dict]:
+        if not crop_ids:
+            return []
+        return await self._rows(
+            select(crop_prices.c.crop_id, crop_prices.c.price, crop_prices.c.recorded_at)
+            .where(crop_prices.c.crop_id.in_(crop_ids), crop_prices.c.recorded_at >= since)
+            .order_by(crop_prices.c.recorded_at, crop_prices.c.id)
+        )
+
+    async def insert_prices(self, rows: List[Dict[str, Any]]) -> List[Dict]:
+        return await self._insert_rows(crop_prices, rows)
+
+    async def delete_price(self, price_id: str) -> bool:
+        return await self._delete(crop_prices, price_id)
+
+    # === Insights ===
+
+    async def list_insight_types(self) -> List[Dict]:
+        return await self._rows(select(insight_types).order_by(insight_types.c.display_order))
+
+    def _select_insights(self) -> Any:
+        return select(
+            insights,
+            insight_types.c.name.label("insight_type_name"),
+            insight_types.c.icon.label("insight_type_icon"),
+            insight_types.c.color.label("insight_type_color"),
+        ).select_from(insights.outerjoin(insight_types, insights.c.type_id == insight_types.c.id))
+
+    @staticmethod
+    def _nest_type(row: Dict) -> Dict:
+        return _nest(row, "insight_type", ["name", "icon", "color"])
+
+    async def list_insights(
+        self,
+        published_only: bool = False,
+        type_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        query = self._select_insights()
+        if published_only:
+            query = query.where(insights.c.is_published.is_(True))
+        if type_id:
+            query = query.where(insights.c.type_id == type_id)
+        rows = await self._rows(query.order_by(insights.c.created_at.desc()).limit(limit))
+        return [self._nest_type(row) for row in rows]
+
+    async def published_insights(self, now: str, limit: int = 10) -> List[Dict]:
+        rows = await self._rows(
+            self._select_insights()
+            .where(insights.c.is_published.is_(True), insights.c.publish_at <= now)
+            .order_by(insights.c.priority.desc(), insights.c.created_at.desc())
+            .limit(limit)
+        )
+        return [self._nest_type(row) for row in rows]
+
+    async def get_insight(self, insight_id: str) -> Optional[Dict]:
+        row = _first(await self._rows(self._select_insights().where(insights.c.id == insight_id)))
+        return self._nest_type(row) if row else None
+
+    async def create_insight(self, row: Dict[str, Any]) -> Optional[Dict]:
+        return _first(await self._insert_rows(insights, [row]))
+
+    async def update_insight(self, insight_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        return await self._update(insights, insight_id, fields)
+
+    async def delete_insight(self, insight_id: str) -> bool:
+        return await self._delete(insights, insight_id)
+
+    # === Stats ===
+
+    async def count_rows(self, table: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        target = Base.metadata.tables[table]
+        query = select(func.count()).select_from(target)
+        for column, value in (filters or {}).items():
+            query = query.where(target.c[column] == value)
+        return await self.run(lambda conn: conn.execute(query).scalar_one())
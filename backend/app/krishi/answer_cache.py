@@ -0,0 +1,135 @@
+"""
+KrishiGPT Answer Cache
+Reuses answers to repeated farming questions asked with the same farm context.
+Only first-turn questions are cached - follow-ups depend on conversation history.
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Dict, Iterator, List, Optional
+
+from .types import FarmContext
+from ..utils.ttl_cache import TTLCache
+from ..utils.metrics import register_metrics
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Size of the SSE chunks used when replaying a cached answer
+REPLAY_CHUNK_CHARS = 80
+
+# FarmContext fields that change the advice and therefore the cache key
+CONTEXT_KEY_FIELDS = (
+    "location",
+    "crop",
+    "crop_stage",
+    "season",
+    "soil_type",
+    "land_size_acres",
+    "irrigation_method",
+    "weather_summary",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,।॥]+$")
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question: NFKC, lowercase, collapsed whitespace, no trailing punctuation"""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def _context_key(context: Optional[FarmContext]) -> str:
+    if context is None:
+        return ""
+    parts = []
+    for field in CONTEXT_KEY_FIELDS:
+        value = getattr(context, field, None)
+        if value is None:
+            continue
+        value = getattr(value, "value", value)  # Enums
+        if isinstance(value, str):
+            value = _WHITESPACE.sub(" ", value.lower()).strip()
+        parts.append(f"{field}={value}")
+    return "|".join(parts)
+
+
+def has_prior_history(conversation_history: List[Dict], user_message: str) -> bool:
+    """
+    True if the conversation has turns before the current message.
+    Routes fetch history after saving the user message, so a trailing copy
+    of the current question does not count.
+    """
+    if not conversation_history:
+        return False
+    if len(conversation_history) == 1:
+        only = conversation_history[0]
+        is_current = normalize_question(only.get("content", "")) == normalize_question(user_message)
+        return not (only.get("role") == "user" and is_current)
+    return True
+
+
+class AnswerCache:
+    """TTL/LRU cache of final (sanitized) answers keyed by question + farm context"""
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+        enabled: bool = ANSWER_CACHE_ENABLED
+    ):
+        self.enabled = enabled
+        self._cache = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+            sizeof=lambda answer: len(answer.encode("utf-8"))
+        )
+        self.bypassed = 0
+
+    @staticmethod
+    def make_key(namespace: str, question: str, context: Optional[FarmContext] = None) -> str:
+        raw = f"{namespace}\x1f{normalize_question(question)}\x1f{_context_key(context)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return self._cache.get(key)
+
+    def set(self, key: str, answer: str) -> None:
+        if self.enabled and answer:
+            self._cache.set(key, answer)
+
+    def record_bypass(self) -> None:
+        """Count a lookup skipped because conversation history was present"""
+        self.bypassed += 1
+
+    def metrics(self) -> Dict:
+        return {"enabled": self.enabled, "bypassed": self.bypassed, **self._cache.stats()}
+
+
+def iter_replay_chunks(answer: str, size: int = REPLAY_CHUNK_CHARS) -> Iterator[str]:
+    """Split a cached answer into stream-sized chunks for SSE replay"""
+    for start in range(0, len(answer), size):
+        yield answer[start:start + size]
+
+
+# Singleton instance
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Get or create the answer cache singleton"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+        register_metrics("answer_cache", _answer_cache.metrics)
+    return _answer_cache
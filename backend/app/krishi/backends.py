@@ -0,0 +1,196 @@
+"""
+KrishiGPT LLM Backends
+Interchangeable text generators behind the LLM gateway.
+`gemini` talks to Google Gemini; `fake` is a deterministic local stand-in
+for load testing without network access or API quota.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .streaming import stream_text, generate_text
+
+logger = logging.getLogger(__name__)
+
+KRISHI_LLM_BACKEND = os.getenv("KRISHI_LLM_BACKEND", "gemini").lower()
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+FAKE_LLM_TTFT_MS = float(os.getenv("FAKE_LLM_TTFT_MS", "400"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_CORPUS_PATH = os.getenv("FAKE_LLM_CORPUS_PATH", "")
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "42"))
+
+DEFAULT_FAKE_CORPUS = [
+    "For wheat at the tillering stage, apply the second dose of nitrogen "
+    "right after the first irrigation. Keep the field free of weeds and watch "
+    "for yellow rust on the leaves, especially in cool and humid weather. "
+    "Consult your local Krishi Vigyan Kendra before using any pesticide.",
+    "Paddy needs standing water of about 5 cm during the vegetative stage. "
+    "Drain the field 10 to 15 days before harvest so the grain dries evenly. "
+    "If you see brown spots on the leaves, get a sample checked at the nearest "
+    "agriculture office before spraying anything.",
+    "Drip irrigation saves 30 to 50 percent water compared to flood irrigation "
+    "and works well for vegetables and orchards. Check the PM Krishi Sinchai "
+    "Yojana for a subsidy on the system cost through your district agriculture office.",
+    "Get your soil tested once every two to three years through the Soil Health "
+    "Card scheme. Add well-decomposed farmyard manure before sowing and follow "
+    "the fertilizer doses recommended on the card for your crop.",
+]
+
+
+class FakeLLMError(Exception):
+    """Injected failure from the fake backend"""
+
+
+class LLMBackend(ABC):
+    """A text generator the gateway can call"""
+
+    name: str = "base"
+    model_name: str = ""
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def generate(
+        self, prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None
+    ) -> str:
+        """Return the complete response text; `timeout` is the call's deadline in seconds"""
+
+    @abstractmethod
+    def stream(
+        self, prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as they are produced"""
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini via the blocking SDK, run on the LLM worker pool.
+    Static instructions are sent as the model's system instruction; one
+    model object is kept per distinct instruction so it is built only once.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], model_name: str = GEMINI_MODEL_NAME):
+        self.model_name = model_name
+        self.model = None
+        self._genai = None
+        # Structure: {system_instruction: GenerativeModel}
+        self._models: Dict[str, Any] = {}
+
+        if api_key:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self.model = genai.GenerativeModel(model_name)
+                self._genai = genai
+                logger.info(f"Gemini backend configured with {model_name}")
+            except Exception as e:
+                logger.error(f"Error configuring Gemini: {e}")
+
+    @property
+    def is_configured(self) -> bool:
+        return self.model is not None
+
+    def _model_for(self, system_instruction: Optional[str]) -> Any:
+        if not system_instruction:
+            return self.model
+        model = self._models.get(system_instruction)
+        if model is None:
+            model = self._genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+            self._models[system_instruction] = model
+        return model
+
+    async def generate(
+        self, prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None
+    ) -> str:
+        return await generate_text(self._model_for(system_instruction), prompt, timeout)
+
+    def stream(
+        self, prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        return stream_text(self._model_for(system_instruction), prompt, timeout)
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic local backend for load tests.
+    The same prompt always gets the same corpus entry; timing follows
+    `ttft_ms` and `tokens_per_second`, and `error_rate` of calls fail
+    before the first token (drawn from a seeded RNG).
+    """
+
+    name = "fake"
+    model_name = "fake"
+
+    def __init__(
+        self,
+        ttft_ms: float = FAKE_LLM_TTFT_MS,
+        tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+        corpus: Optional[List[str]] = None,
+        seed: int = FAKE_LLM_SEED
+    ):
+        self.ttft = ttft_ms / 1000
+        self.token_interval = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+        self.error_rate = error_rate
+        self.corpus = corpus or DEFAULT_FAKE_CORPUS
+        self._rng = random.Random(seed)
+
+    @staticmethod
+    def load_corpus(path: str) -> List[str]:
+        """Read responses from a text file, one per blank-line-separated paragraph"""
+        with open(path, encoding="utf-8") as f:
+            paragraphs = [p.strip() for p in f.read().split("\n\n")]
+        return [p for p in paragraphs if p]
+
+    def _pick(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return self.corpus[int.from_bytes(digest[:4], "big") % len(self.corpus)]
+
+    def _tokens(self, text: str) -> List[str]:
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    async def _start(self) -> None:
+        await asyncio.sleep(self.ttft)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise FakeLLMError("Injected fake backend failure")
+
+    async def generate(
+        self, prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None
+    ) -> str:
+        answer = self._pick(prompt)
+        await self._start()
+        await asyncio.sleep(self.token_interval * (len(self._tokens(answer)) - 1))
+        return answer
+
+    async def stream(
+        self, prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        tokens = self._tokens(self._pick(prompt))
+        await self._start()
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(self.token_interval)
+            yield token
+
+
+def create_backend(name: str = KRISHI_LLM_BACKEND) -> LLMBackend:
+    """Build the backend selected by KRISHI_LLM_BACKEND"""
+    if name == "fake":
+        corpus = FakeBackend.load_corpus(FAKE_LLM_CORPUS_PATH) if FAKE_LLM_CORPUS_PATH else None
+        logger.warning("Using the fake LLM backend - responses are canned, not generated")
+        return FakeBackend(corpus=corpus)
+    if name != "gemini":
+        raise ValueError(f"Unknown KRISHI_LLM_BACKEND: {name!r} (expected 'gemini' or 'fake')")
+    return GeminiBackend(api_key=os.getenv("GEMINI_API_KEY"))
@@ -0,0 +1,122 @@
+"""
+KrishiGPT Farm Context Store
+The FarmContext of each conversation is stored once and merged server-side
+with whatever fields a request changes, so clients send only the delta and
+the controller gets a ready FarmContext instead of re-parsing it every turn.
+Every stored context carries a version; writes are compare-and-set on it,
+so concurrent updates from different workers are merged, not lost.
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import Any, Dict, NamedTuple, Optional
+
+from .types import FarmContext
+from ..db.repository import get_repository
+from ..utils.metrics import register_metrics
+from ..utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FARM_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("FARM_CONTEXT_CACHE_TTL_SECONDS", "300"))
+FARM_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("FARM_CONTEXT_CACHE_MAX_ENTRIES", "5000"))
+# Attempts of a merge whose write lost a race with another worker
+FARM_CONTEXT_MAX_WRITE_ATTEMPTS = 3
+
+
+class VersionedContext(NamedTuple):
+    context: FarmContext
+    # 0 while nothing is stored for the conversation
+    version: int
+
+
+_EMPTY = VersionedContext(FarmContext(), 0)
+
+
+class FarmContextStore:
+    """
+    Reads contexts through a per-worker TTL cache. Cached FarmContext objects
+    are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(
+            max_entries=FARM_CONTEXT_CACHE_MAX_ENTRIES, ttl_seconds=FARM_CONTEXT_CACHE_TTL_SECONDS
+        )
+        # Merges of one conversation are serialized within a worker. Every merge
+        # running or waiting holds a reference to its lock, so an entry lives
+        # exactly as long as someone needs it.
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._stats = {
+            "updates_total": 0,
+            "unchanged_total": 0,
+            "write_conflicts_total": 0,
+        }
+
+    async def get(self, conversation_id: str) -> VersionedContext:
+        """The stored context of a conversation (empty, version 0, if none)"""
+        current = self._cache.get(conversation_id)
+        if current is None:
+            current = await self._load(conversation_id)
+        return current
+
+    async def _load(self, conversation_id: str) -> VersionedContext:
+        row = await get_repository().get_farm_context(conversation_id)
+        current = VersionedContext(FarmContext(**row["context"]), row["version"]) if row else _EMPTY
+        self._cache.set(conversation_id, current)
+        return current
+
+    async def merge(self, conversation_id: str, changes: Optional[Dict[str, Any]]) -> VersionedContext:
+        """
+        Apply `changes` (field -> value, None clears a field) on top of the
+        stored context and persist the result as the next version.
+        """
+        if not changes:
+            return await self.get(conversation_id)
+
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            return await self._merge(conversation_id, changes)
+
+    async def _merge(self, conversation_id: str, changes: Dict[str, Any]) -> VersionedContext:
+        current = await self.get(conversation_id)
+        for _ in range(FARM_CONTEXT_MAX_WRITE_ATTEMPTS):
+            merged = current.context.model_copy(update=changes)
+            if merged == current.context:
+                self._stats["unchanged_total"] += 1
+                return current
+
+            updated = VersionedContext(merged, current.version + 1)
+            if await get_repository().save_farm_context(
+                conversation_id, merged.model_dump(mode="json"), updated.version
+            ):
+                self._cache.set(conversation_id, updated)
+                self._stats["updates_total"] += 1
+                return updated
+
+            # Another worker stored a newer version; merge onto that one
+            self._stats["write_conflicts_total"] += 1
+            current = await self._load(conversation_id)
+
+        raise RuntimeError(f"Farm context of {conversation_id} kept changing during the update")
+
+    def metrics(self) -> Dict:
+        return {
+            **self._stats,
+            "cache": self._cache.stats(),
+        }
+
+
+# Singleton instance
+_context_store: Optional[FarmContextStore] = None
+
+
+def get_context_store() -> FarmContextStore:
+    """Get or create the farm context store singleton"""
+    global _context_store
+    if _context_store is None:
+        _context_store = FarmContextStore()
+        register_metrics("farm_contexts", _context_store.metrics)
+    return _context_store
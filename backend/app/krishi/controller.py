@@ -4,21 +4,31 @@ Main orchestration logic for AI interactions.
 RULE: Farmer safety over correctness, speed, or elegance.
 """
 
-import json
 import logging
-from typing import Optional, List, Dict, Any, AsyncGenerator
-import google.generativeai as genai
-import os
+from typing import Optional, List, Dict, Any, AsyncGenerator, NamedTuple
 
 from .types import FarmContext, ConfidenceLevel, CropStage, SoilType
 from .prompt_builder import KrishiPromptBuilder
 from .safety import SafetyValidator
 from .forms import get_form, KRISHI_FORMS
 from .tools_continued import get_tool, get_available_tools
+from .llm import get_llm_gateway
+from .answer_cache import AnswerCache, get_answer_cache, has_prior_history, iter_replay_chunks
+from .single_flight import SingleFlight
+from .intent import get_intent_engine
+from ..utils.metrics import register_metrics
+from .events import StreamEvent, ChunkEvent, DoneEvent, FormRequestEvent, ErrorEvent
+from ..utils.sse import coalesce_chunks, StreamAccumulator
 
 logger = logging.getLogger(__name__)
 
 
+class AnswerLookup(NamedTuple):
+    # None when the turn bypasses the answer cache
+    key: Optional[str]
+    answer: Optional[str]
+
+
 class KrishiGPTController:
     """
     Main controller for KrishiGPT interactions.
@@ -32,38 +42,19 @@ class KrishiGPTController:
     """
     
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        self.model = None
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.llm = get_llm_gateway()
+        self.answer_cache = get_answer_cache()
+        self.intent_engine = get_intent_engine()
+        # Identical prompts arriving together share one generation
+        self.single_flight = SingleFlight()
+        register_metrics("single_flight", self.single_flight.metrics)
     
     def _detect_intent(self, message: str) -> Dict[str, Any]:
         """
         Detect farmer's intent from message.
-        Returns intent type and any extracted entities.
+        Returns intents ranked by score (highest first) and their scores.
         """
-        message_lower = message.lower()
-        
-        # Intent detection keywords
-        intents = {
-            "diagnosis": ["problem", "disease", "pest", "yellow", "spots", "wilting", "insects", "dying", "help"],
-            "fertilizer": ["fertilizer", "urea", "dap", "npk", "nutrient", "manure", "खाद"],
-            "irrigation": ["water", "irrigation", "सिंचाई", "पानी", "when to water"],
-            "weather": ["rain", "weather", "frost", "heat", "cold", "बारिश", "मौसम"],
-            "price": ["price", "msp", "rate", "sell", "market", "मंडी", "भाव"],
-            "pesticide": ["pesticide", "spray", "कीटनाशक", "दवाई"],
-        }
-        
-        detected = []
-        for intent, keywords in intents.items():
-            if any(kw in message_lower for kw in keywords):
-                detected.append(intent)
-        
-        return {
-            "intents": detected if detected else ["general"],
-            "needs_clarification": len(detected) == 0 or len(detected) > 2
-        }
+        return self.intent_engine.classify(message)
     
     def _check_context_sufficiency(
         self, 
@@ -77,15 +68,84 @@ class KrishiGPTController:
         # Always sufficient - let AI handle clarification naturally in conversation
         return True, None
     
+    def _answer_cache_key(
+        self,
+        user_message: str,
+        context: FarmContext,
+        conversation_history: List[Dict],
+        conversation_summary: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Cache key for first-turn questions.
+        Returns None when earlier turns make the answer conversation-specific.
+        """
+        if conversation_summary or has_prior_history(conversation_history, user_message):
+            self.answer_cache.record_bypass()
+            return None
+        return AnswerCache.make_key("krishi", user_message, context)
+    
+    def lookup_answer(
+        self,
+        user_message: str,
+        context: FarmContext,
+        conversation_history: List[Dict],
+        form_data: Optional[Dict[str, Any]] = None,
+        conversation_summary: Optional[str] = None
+    ) -> AnswerLookup:
+        """
+        Answer-cache lookup for a turn.
+        Routes call it before admission (a hit needs no LLM call) and pass the
+        result on to process_message / process_message_stream.
+        """
+        if form_data:
+            context = self._update_context_from_form(context, form_data)
+        key = self._answer_cache_key(user_message, context, conversation_history, conversation_summary)
+        return AnswerLookup(key, self.answer_cache.get(key) if key else None)
+    
+    def _calculate_confidence(self, context: FarmContext, primary_intent: str) -> ConfidenceLevel:
+        """Response confidence from the context available for this intent"""
+        return SafetyValidator.validate_response_confidence(
+            has_crop=bool(context.crop),
+            has_crop_stage=bool(context.crop_stage),
+            has_location=bool(context.location),
+            has_land_size=bool(context.land_size_acres),
+            is_dosage_advice=primary_intent == "fertilizer"
+        )
+    
+    def _build_response(
+        self,
+        ai_content: str,
+        context: FarmContext,
+        primary_intent: str,
+        cached: bool = False
+    ) -> Dict[str, Any]:
+        """Structured response returned by process_message"""
+        return {
+            "type": "response",
+            "content": ai_content,
+            "confidence": self._calculate_confidence(context, primary_intent).value,
+            "context_used": {
+                "crop": context.crop,
+                "stage": context.crop_stage.value if context.crop_stage else None,
+                "location": context.location,
+            },
+            "intent": primary_intent,
+            "cached": cached
+        }
+    
     async def process_message(
         self,
         user_message: str,
         context: FarmContext,
         conversation_history: List[Dict],
-        form_data: Optional[Dict[str, Any]] = None
+        form_data: Optional[Dict[str, Any]] = None,
+        conversation_summary: Optional[str] = None,
+        lookup: Optional[AnswerLookup] = None
     ) -> Dict[str, Any]:
         """
         Main entry point for processing farmer messages.
+        `conversation_summary` covers turns older than `conversation_history`;
+        `lookup` is the result of lookup_answer if the caller already did it.
         Returns structured response with optional form request.
         """
         # Step 1: Update context from form data if provided
@@ -110,14 +170,23 @@ class KrishiGPTController:
                     "confidence": ConfidenceLevel.LOW.value
                 }
         
-        # Step 4: Build prompt and call AI
-        full_prompt = KrishiPromptBuilder.build_full_prompt(
+        # Step 4: Serve repeated first-turn questions from the answer cache
+        if lookup is None:
+            lookup = self.lookup_answer(user_message, context, conversation_history, None, conversation_summary)
+        cache_key, cached_answer = lookup
+        
+        if cached_answer is not None:
+            return self._build_response(cached_answer, context, primary_intent, cached=True)
+        
+        # Step 5: Build prompt and call AI (static rules go as the system instruction)
+        user_prompt = KrishiPromptBuilder.build_user_prompt(
             user_message,
             context,
-            conversation_history
+            conversation_history,
+            conversation_summary=conversation_summary
         )
         
-        if not self.model:
+        if not self.llm.is_configured:
             return {
                 "type": "error",
                 "message": "AI service not configured",
@@ -125,32 +194,19 @@ class KrishiGPTController:
             }
         
         try:
-            response = self.model.generate_content(full_prompt)
-            ai_content = response.text
+            ai_content = await self.single_flight.call(
+                SingleFlight.make_key("generate", user_prompt),
+                lambda: self.llm.generate(user_prompt, system_instruction=KrishiPromptBuilder.SYSTEM_PROMPT)
+            )
             
-            # Step 5: Sanitize response for safety
-            ai_content = SafetyValidator.sanitize_ai_response(ai_content)
+            # Step 6: Sanitize response for safety
+            ai_content = SafetyValidator.sanitize_ai_response(ai_content, context.location)
             
-            # Step 6: Calculate confidence
-            confidence = SafetyValidator.validate_response_confidence(
-                has_crop=bool(context.crop),
-                has_crop_stage=bool(context.crop_stage),
-                has_location=bool(context.location),
-                has_land_size=bool(context.land_size_acres),
-                is_dosage_advice=primary_intent == "fertilizer"
-            )
+            if cache_key:
+                self.answer_cache.set(cache_key, ai_content)
             
-            return {
-                "type": "response",
-                "content": ai_content,
-                "confidence": confidence.value,
-                "context_used": {
-                    "crop": context.crop,
-                    "stage": context.crop_stage.value if context.crop_stage else None,
-                    "location": context.location,
-                },
-                "intent": primary_intent
-            }
+            # Step 7: Attach confidence and return
+            return self._build_response(ai_content, context, primary_intent)
             
         except Exception as e:
             logger.error(f"AI generation error: {e}")
@@ -165,11 +221,13 @@ class KrishiGPTController:
         user_message: str,
         context: FarmContext,
         conversation_history: List[Dict],
-        form_data: Optional[Dict[str, Any]] = None
-    ) -> AsyncGenerator[str, None]:
+        form_data: Optional[Dict[str, Any]] = None,
+        conversation_summary: Optional[str] = None,
+        lookup: Optional[AnswerLookup] = None
+    ) -> AsyncGenerator[StreamEvent, None]:
         """
         Streaming version of process_message.
-        Yields SSE-formatted chunks.
+        Yields typed events; routes encode them to SSE with `to_sse()`.
         """
         # Update context from form data
         if form_data:
@@ -184,62 +242,70 @@ class KrishiGPTController:
         if not is_sufficient and form_id:
             form = get_form(form_id)
             if form:
-                data = json.dumps({
-                    "type": "form_request",
-                    "form": form.model_dump(),
-                    "message": "I need a bit more information to help you properly.",
-                    "done": True
-                })
-                yield f"data: {data}\n\n"
+                yield FormRequestEvent(
+                    form.model_dump(),
+                    "I need a bit more information to help you properly."
+                )
                 return
         
-        # Build prompt
-        full_prompt = KrishiPromptBuilder.build_full_prompt(
-            user_message,
-            context,
-            conversation_history
-        )
+        # Replay cached answers for repeated first-turn questions
+        if lookup is None:
+            lookup = self.lookup_answer(user_message, context, conversation_history, None, conversation_summary)
+        cache_key, cached_answer = lookup
         
-        if not self.model:
-            error_data = json.dumps({"error": "AI not configured", "done": True})
-            yield f"data: {error_data}\n\n"
-            return
+        if cached_answer is None:
+            # Build prompt (static rules go as the system instruction)
+            user_prompt = KrishiPromptBuilder.build_user_prompt(
+                user_message,
+                context,
+                conversation_history,
+                conversation_summary=conversation_summary
+            )
+            
+            if not self.llm.is_configured:
+                yield ErrorEvent("AI not configured")
+                return
         
         try:
-            response = self.model.generate_content(full_prompt, stream=True)
-            accumulated = ""
+            accumulated = StreamAccumulator()
             
-            for chunk in response:
-                if chunk.text:
-                    # Sanitize each chunk
-                    safe_chunk = SafetyValidator.sanitize_ai_response(chunk.text)
-                    accumulated += safe_chunk
-                    
-                    data = json.dumps({"chunk": safe_chunk, "done": False})
-                    yield f"data: {data}\n\n"
+            if cached_answer is not None:
+                for safe_chunk in iter_replay_chunks(cached_answer):
+                    accumulated.append(safe_chunk)
+                    yield ChunkEvent(safe_chunk)
+            else:
+                stream_key = SingleFlight.make_key("stream", user_prompt)
+                chunks = self.single_flight.stream(
+                    stream_key,
+                    lambda: self.llm.stream(user_prompt, system_instruction=KrishiPromptBuilder.SYSTEM_PROMPT)
+                )
+                
+                # Sanitize across chunk boundaries; a short tail is held back between chunks
+                sanitizer = SafetyValidator.stream_sanitizer(context.location)
+                
+                # Coalesce small chunks into fewer SSE frames
+                async for text in coalesce_chunks(chunks):
+                    safe_chunk = sanitizer.feed(text)
+                    if safe_chunk:
+                        accumulated.append(safe_chunk)
+                        yield ChunkEvent(safe_chunk)
+                
+                safe_chunk = sanitizer.flush()
+                if safe_chunk:
+                    accumulated.append(safe_chunk)
+                    yield ChunkEvent(safe_chunk)
+                
+                if cache_key:
+                    self.answer_cache.set(cache_key, accumulated.text)
             
             # Calculate final confidence
-            confidence = SafetyValidator.validate_response_confidence(
-                has_crop=bool(context.crop),
-                has_crop_stage=bool(context.crop_stage),
-                has_location=bool(context.location),
-                has_land_size=bool(context.land_size_acres),
-                is_dosage_advice=primary_intent == "fertilizer"
-            )
+            confidence = self._calculate_confidence(context, primary_intent)
             
-            final_data = json.dumps({
-                "chunk": "",
-                "done": True,
-                "full_text": accumulated,
-                "confidence": confidence.value,
-                "intent": primary_intent
-            })
-            yield f"data: {final_data}\n\n"
+            yield DoneEvent(accumulated.text, confidence=confidence.value, intent=primary_intent)
             
         except Exception as e:
             logger.error(f"Streaming error: {e}")
-            error_data = json.dumps({"error": str(e), "done": True})
-            yield f"data: {error_data}\n\n"
+            yield ErrorEvent(str(e))
     
     def _update_context_from_form(
         self, 
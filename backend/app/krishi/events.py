@@ -0,0 +1,89 @@
+"""
+KrishiGPT Stream Events
+Typed events yielded by the streaming pipelines.
+They are serialized to SSE once, at the route, so persistence hooks can
+read the text directly instead of re-parsing JSON frames.
+"""
+
+from typing import Any, Dict, Optional
+
+from ..utils.sse import sse_event
+
+
+class StreamEvent:
+    """Base class for streaming events"""
+
+    __slots__ = ()
+
+    def to_payload(self, include_full_text: bool = False) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def to_sse(self, include_full_text: bool = False) -> str:
+        """Encode as an SSE `data:` frame"""
+        return sse_event(self.to_payload(include_full_text))
+
+
+class ChunkEvent(StreamEvent):
+    """A piece of the answer text"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def to_payload(self, include_full_text: bool = False) -> Dict[str, Any]:
+        return {"chunk": self.text, "done": False}
+
+
+class DoneEvent(StreamEvent):
+    """
+    End of a successful answer.
+    `text` is always the full answer; it is only sent to the client as
+    `full_text` when the client negotiated it.
+    """
+
+    __slots__ = ("text", "confidence", "intent")
+
+    def __init__(self, text: str, confidence: Optional[str] = None, intent: Optional[str] = None):
+        self.text = text
+        self.confidence = confidence
+        self.intent = intent
+
+    def to_payload(self, include_full_text: bool = False) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"chunk": "", "done": True}
+        if include_full_text:
+            payload["full_text"] = self.text
+        if self.confidence is not None:
+            payload["confidence"] = self.confidence
+        if self.intent is not None:
+            payload["intent"] = self.intent
+        return payload
+
+
+class FormRequestEvent(StreamEvent):
+    """The controller needs more farm context before answering"""
+
+    __slots__ = ("form", "message")
+
+    def __init__(self, form: Dict[str, Any], message: str):
+        self.form = form
+        self.message = message
+
+    def to_payload(self, include_full_text: bool = False) -> Dict[str, Any]:
+        return {"type": "form_request", "form": self.form, "message": self.message, "done": True}
+
+
+class ErrorEvent(StreamEvent):
+    """Generation failed or is unavailable"""
+
+    __slots__ = ("message", "done")
+
+    def __init__(self, message: str, done: bool = True):
+        self.message = message
+        self.done = done
+
+    def to_payload(self, include_full_text: bool = False) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"error": self.message}
+        if self.done:
+            payload["done"] = True
+        return payload
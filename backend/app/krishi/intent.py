@@ -0,0 +1,284 @@
+"""
+KrishiGPT Intent Engine
+Ranks farmer intents from a message in one pass over a compiled keyword automaton.
+Handles English, Devanagari Hindi and common Latin transliterations ("khaad", "sinchai").
+An optional NumPy char-n-gram model can be blended in when a trained model file is configured.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.aho_corasick import AhoCorasick
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional here
+    np = None
+
+logger = logging.getLogger(__name__)
+
+KRISHI_INTENT_MODEL_PATH = os.getenv("KRISHI_INTENT_MODEL_PATH", "")
+# How much a confident n-gram prediction adds to the keyword score
+KRISHI_INTENT_MODEL_WEIGHT = float(os.getenv("KRISHI_INTENT_MODEL_WEIGHT", "1.0"))
+
+GENERAL_INTENT = "general"
+
+# Keyword weights per intent. Keywords match whole words only, so
+# inflections are listed explicitly ("spray", "spraying", "sprayed").
+INTENT_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "diagnosis": {
+        "problem": 1.0, "problems": 1.0, "disease": 2.0, "diseases": 2.0, "diseased": 2.0,
+        "pest": 1.0, "pests": 1.0, "yellow": 1.5, "yellowing": 1.5, "spot": 1.5, "spots": 1.5,
+        "wilt": 2.0, "wilting": 2.0, "wilted": 2.0, "insect": 1.5, "insects": 1.5, "dying": 1.5,
+        "help": 0.5, "fungus": 2.0, "fungal": 2.0, "rot": 1.5, "rotting": 1.5, "rotten": 1.5,
+        "leaf curl": 2.0, "leaf curling": 2.0, "rog": 2.0, "bimari": 2.0, "keeda": 1.5,
+        "keede": 1.5, "peela": 1.5, "peele": 1.5, "peeli": 1.5, "रोग": 2.0, "रोगों": 2.0,
+        "बीमारी": 2.0, "बीमारियां": 2.0, "कीड़ा": 1.5, "कीड़े": 1.5, "कीड़ों": 1.5, "पीला": 1.5,
+        "पीले": 1.5, "पीली": 1.5, "धब्बा": 1.5, "धब्बे": 1.5, "धब्बों": 1.5, "समस्या": 1.0,
+        "समस्याएं": 1.0,
+    },
+    "fertilizer": {
+        "fertilizer": 2.0, "fertilizers": 2.0, "fertiliser": 2.0, "fertilisers": 2.0,
+        "urea": 2.0, "dap": 2.0, "npk": 2.0, "nutrient": 1.5, "nutrients": 1.5, "manure": 1.5,
+        "compost": 1.5, "khaad": 2.0, "khad": 2.0, "urvarak": 2.0, "gobar": 1.0,
+        "खाद": 2.0, "उर्वरक": 2.0, "यूरिया": 2.0, "गोबर": 1.0,
+    },
+    "irrigation": {
+        "water": 1.0, "watering": 1.5, "watered": 1.0, "irrigate": 2.0, "irrigating": 2.0,
+        "irrigated": 2.0, "irrigation": 2.0, "when to water": 2.0, "drip": 1.5,
+        "sprinkler": 1.5, "sprinklers": 1.5, "sinchai": 2.0, "paani": 1.5, "pani": 1.5,
+        "सिंचाई": 2.0, "पानी": 1.5,
+    },
+    "weather": {
+        "rain": 1.5, "rains": 1.5, "raining": 1.5, "rainfall": 1.5, "weather": 2.0,
+        "frost": 2.0, "heat": 1.0, "heatwave": 1.5, "cold": 1.0, "forecast": 2.0,
+        "barish": 1.5, "baarish": 1.5, "mausam": 2.0, "pala": 1.5,
+        "बारिश": 1.5, "मौसम": 2.0, "पाला": 1.5, "ठंड": 1.0, "गर्मी": 1.0,
+    },
+    "price": {
+        "price": 2.0, "prices": 2.0, "msp": 2.0, "rate": 1.0, "rates": 1.0,
+        # Selling is the farmer's question even when an input is named ("sell urea")
+        "sell": 2.5, "selling": 2.5, "market": 1.5, "markets": 1.5,
+        "mandi": 2.0, "bhav": 2.0, "daam": 1.5, "मंडी": 2.0, "भाव": 2.0, "दाम": 1.5,
+        "कीमत": 2.0, "बेचना": 2.5, "बेचें": 2.5, "बेचे": 2.5, "बेचने": 2.5, "बेचूं": 2.5,
+    },
+    "pesticide": {
+        "pesticide": 2.5, "pesticides": 2.5, "spray": 1.5, "spraying": 1.5, "sprayed": 1.5,
+        "insecticide": 2.5, "insecticides": 2.5, "fungicide": 2.5, "fungicides": 2.5,
+        "keetnashak": 2.5, "dawai": 1.5, "dawa": 1.5, "कीटनाशक": 2.5, "दवाई": 1.5, "दवा": 1.5,
+    },
+}
+
+# Latin transliterations of Hindi words. Farmers stretch their vowels
+# ("khaaad", "paaani"), so a word with doubled letters that collapses to the
+# same form as one of these is read as that keyword. English words are never
+# collapsed ("sell" stays "sell").
+TRANSLITERATED_KEYWORDS = frozenset({
+    "rog", "bimari", "keeda", "keede", "peela", "peele", "peeli", "khaad", "khad", "urvarak",
+    "gobar", "sinchai", "paani", "pani", "barish", "baarish", "mausam", "pala", "mandi",
+    "bhav", "daam", "keetnashak", "dawai", "dawa",
+})
+
+# Devanagari marks that vary between keyboards and transliteration tools
+_DEVANAGARI_FOLD = str.maketrans({
+    "\u093c": None,      # nukta
+    "\u200c": None,      # zero-width non-joiner
+    "\u200d": None,      # zero-width joiner
+    "\u0901": "\u0902",  # chandrabindu -> anusvara
+})
+_NON_WORD = re.compile(r"[^\w\u0900-\u097f]+")  # keep Devanagari vowel signs
+_REPEATED_LATIN = re.compile(r"([a-z])\1+")
+# Latin words with a doubled letter somewhere
+_DOUBLED_LATIN_WORD = re.compile(r"(?<![\w\u0900-\u097f])[a-z]*([a-z])\1[a-z]*(?![\w\u0900-\u097f])")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form for matching: NFKC, lowercase, folded Devanagari marks
+    and punctuation to spaces, padded with a space on both sides.
+    """
+    text = unicodedata.normalize("NFKC", text).lower().translate(_DEVANAGARI_FOLD)
+    text = _NON_WORD.sub(" ", text)
+    return f" {text.strip()} "
+
+
+def collapse_repeats(word: str) -> str:
+    """Doubled Latin letters collapsed ("khaaad" -> "khad")"""
+    return _REPEATED_LATIN.sub(r"\1", word)
+
+
+class NgramIntentModel:
+    """
+    Tiny linear classifier over hashed character n-grams (NumPy).
+    Trained offline with `fit()` and loaded from an .npz file at runtime.
+    """
+
+    def __init__(self, labels: List[str], weights: Any, bias: Any, dim: int = 4096, n: int = 3):
+        self.labels = labels
+        self.weights = weights  # (labels, dim)
+        self.bias = bias        # (labels,)
+        self.dim = dim
+        self.n = n
+
+    def features(self, texts: List[str]) -> Any:
+        """Row-normalized bag of hashed n-grams, one row per (normalized) text"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for start in range(len(text) - self.n + 1):
+                gram = text[start:start + self.n].encode("utf-8")
+                matrix[row, zlib.crc32(gram) % self.dim] += 1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-6)
+
+    def predict_proba(self, texts: List[str]) -> Any:
+        logits = self.features(texts) @ self.weights.T + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    @classmethod
+    def fit(
+        cls,
+        texts: List[str],
+        labels: List[str],
+        dim: int = 4096,
+        n: int = 3,
+        epochs: int = 200,
+        learning_rate: float = 0.5
+    ) -> "NgramIntentModel":
+        """Train softmax regression with full-batch gradient descent"""
+        classes = sorted(set(labels))
+        model = cls(classes, np.zeros((len(classes), dim), np.float32), np.zeros(len(classes), np.float32), dim, n)
+        x = model.features([normalize_text(t) for t in texts])
+        y = np.zeros((len(texts), len(classes)), np.float32)
+        y[np.arange(len(texts)), [classes.index(label) for label in labels]] = 1.0
+        for _ in range(epochs):
+            logits = x @ model.weights.T + model.bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            grad = (probs - y) / len(texts)
+            model.weights -= learning_rate * grad.T @ x
+            model.bias -= learning_rate * grad.sum(axis=0)
+        return model
+
+    def save(self, path: str) -> None:
+        np.savez(path, labels=np.array(self.labels), weights=self.weights, bias=self.bias,
+                 dim=self.dim, n=self.n)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramIntentModel":
+        data = np.load(path)
+        return cls([str(label) for label in data["labels"]], data["weights"], data["bias"],
+                   int(data["dim"]), int(data["n"]))
+
+
+class IntentEngine:
+    """
+    Keyword automaton compiled once over every intent's keywords.
+    A keyword counts only where it is a whole word (or words); scores are summed weights.
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, Dict[str, float]] = INTENT_KEYWORDS,
+        model: Optional[NgramIntentModel] = None,
+        model_weight: float = KRISHI_INTENT_MODEL_WEIGHT,
+        transliterated: Iterable[str] = TRANSLITERATED_KEYWORDS
+    ):
+        # Structure: {normalized keyword: {intent: weight}}
+        # Spellings that normalize alike keep the higher weight
+        self._keywords: Dict[str, Dict[str, float]] = {}
+        for intent, weighted in keywords.items():
+            for keyword, weight in weighted.items():
+                entry = self._keywords.setdefault(normalize_text(keyword).strip(), {})
+                entry[intent] = max(weight, entry.get(intent, 0.0))
+        self._automaton = AhoCorasick(self._keywords)
+        # Structure: {collapsed spelling: keyword}, e.g. {"khad": "khaad"}
+        self._stretched: Dict[str, str] = {}
+        for keyword in sorted(transliterated):
+            self._stretched.setdefault(collapse_repeats(keyword), keyword)
+        self.intents = list(keywords)
+        self.model = model
+        self.model_weight = model_weight
+
+    def _unstretch(self, normalized: str) -> str:
+        """Map stretched spellings of transliterated keywords ("khaaad") to the keyword"""
+        def replace(match: "re.Match[str]") -> str:
+            word = match.group()
+            if word in self._keywords:
+                return word
+            return self._stretched.get(collapse_repeats(word), word)
+
+        return _DOUBLED_LATIN_WORD.sub(replace, normalized)
+
+    def _keyword_scores(self, normalized: str) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        text = self._unstretch(normalized)
+
+        # normalize_text pads with spaces, so every word is bounded by a space
+        def whole_words(start: int, end: int) -> bool:
+            return text[start - 1] == " " and text[end] == " "
+
+        # Longest keyword wins where whole-word keywords overlap ("leaf curling" over "leaf curl")
+        for start, end in self._automaton.find_leftmost_longest(text, whole_words):
+            for intent, weight in self._keywords[text[start:end]].items():
+                scores[intent] = scores.get(intent, 0.0) + weight
+        return scores
+
+    @staticmethod
+    def _result(scores: Dict[str, float]) -> Dict[str, Any]:
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        detected = [intent for intent, _ in ranked]
+        return {
+            "intents": detected if detected else [GENERAL_INTENT],
+            "scores": {intent: round(score, 3) for intent, score in ranked},
+            "needs_clarification": len(detected) == 0 or len(detected) > 2
+        }
+
+    def _blend(self, scores: Dict[str, float], probabilities: Any) -> None:
+        for label, probability in zip(self.model.labels, probabilities):
+            if label != GENERAL_INTENT and probability >= 0.5:
+                scores[label] = scores.get(label, 0.0) + self.model_weight * float(probability)
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """Ranked intents (highest score first) with their scores"""
+        normalized = normalize_text(message)
+        scores = self._keyword_scores(normalized)
+        if self.model is not None:
+            self._blend(scores, self.model.predict_proba([normalized])[0])
+        return self._result(scores)
+
+    def classify_batch(self, messages: Iterable[str]) -> List[Dict[str, Any]]:
+        """Classify many messages (e.g. logged conversations) with one model call"""
+        normalized = [normalize_text(m) for m in messages]
+        all_scores = [self._keyword_scores(text) for text in normalized]
+        if self.model is not None and normalized:
+            for scores, probabilities in zip(all_scores, self.model.predict_proba(normalized)):
+                self._blend(scores, probabilities)
+        return [self._result(scores) for scores in all_scores]
+
+
+# Singleton instance
+_engine: Optional[IntentEngine] = None
+
+
+def get_intent_engine() -> IntentEngine:
+    """Get or create the intent engine singleton"""
+    global _engine
+    if _engine is None:
+        model = None
+        if KRISHI_INTENT_MODEL_PATH:
+            if np is None:
+                logger.warning("KRISHI_INTENT_MODEL_PATH is set but NumPy is not installed; using keywords only")
+            else:
+                try:
+                    model = NgramIntentModel.load(KRISHI_INTENT_MODEL_PATH)
+                except Exception as e:
+                    logger.error(f"Error loading intent model: {e}")
+        _engine = IntentEngine(model=model)
+    return _engine
@@ -0,0 +1,220 @@
+"""
+KrishiGPT LLM Gateway
+Single entry point for every LLM call in the app.
+Owns the backend, the in-flight cap, timeouts, retries and LLM metrics.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .backends import LLMBackend, create_backend
+from ..utils.metrics import register_metrics
+from ..utils.admission import get_admission_limiter
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = 0.5
+
+
+class LLMError(Exception):
+    """Base error for gateway failures"""
+
+
+class LLMNotConfiguredError(LLMError):
+    """Raised when the backend is not configured (e.g. no API key)"""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when a call exceeds its timeout"""
+
+
+class LLMGateway:
+    """
+    Shared LLM gateway.
+    All callers go through the same backend and the same in-flight
+    semaphore, so capacity is tuned in one place.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        # Call outcomes drive the adaptive admission limit. Permits beyond the
+        # in-flight cap would only queue on the semaphore, so the cap bounds it.
+        self._admission = get_admission_limiter()
+        self._admission.max_limit = min(self._admission.max_limit, max_in_flight)
+        self._admission.limit = min(self._admission.limit, self._admission.max_limit)
+        self._in_flight = 0
+        self._stats = {
+            "requests_total": 0,
+            "stream_requests_total": 0,
+            "errors_total": 0,
+            "timeouts_total": 0,
+            "retries_total": 0,
+            "peak_in_flight": 0,
+            "latency_seconds_total": 0.0,
+        }
+
+    @property
+    def is_configured(self) -> bool:
+        return self.backend.is_configured
+
+    def _require_backend(self) -> None:
+        if not self.backend.is_configured:
+            raise LLMNotConfiguredError("AI service not configured")
+
+    def _enter(self) -> float:
+        self._in_flight += 1
+        self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+        return time.perf_counter()
+
+    def _exit(self, started: float) -> None:
+        self._in_flight -= 1
+        self._stats["latency_seconds_total"] += time.perf_counter() - started
+
+    async def _backoff(self, attempt: int, error: Exception) -> None:
+        self._stats["retries_total"] += 1
+        delay = LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+        logger.warning(f"LLM call failed ({error}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def generate(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        system_instruction: Optional[str] = None,
+        feed_admission: bool = True
+    ) -> str:
+        """
+        Generate a complete response, retrying transient failures.
+        Static instructions go in `system_instruction` rather than the prompt.
+        Background calls pass `feed_admission=False` so their latency and
+        errors do not move the interactive admission limit.
+        """
+        self._require_backend()
+        self._stats["requests_total"] += 1
+        timeout = timeout or self.timeout
+        # Latency fed to admission includes the wait for a gateway slot
+        queued = time.perf_counter()
+
+        async with self._semaphore:
+            started = self._enter()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        text = await asyncio.wait_for(
+                            self.backend.generate(prompt, system_instruction, timeout), timeout
+                        )
+                        if feed_admission:
+                            self._admission.record_outcome(True, time.perf_counter() - queued)
+                        return text
+                    except asyncio.TimeoutError:
+                        self._stats["timeouts_total"] += 1
+                        raise LLMTimeoutError(f"LLM call timed out after {timeout:g}s")
+                    except Exception as e:
+                        if attempt >= self.max_retries:
+                            raise
+                        await self._backoff(attempt, e)
+            except Exception:
+                self._stats["errors_total"] += 1
+                if feed_admission:
+                    self._admission.record_outcome(False, time.perf_counter() - queued)
+                raise
+            finally:
+                self._exit(started)
+
+    async def stream(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        system_instruction: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream response text chunks.
+        Failures before the first chunk are retried; `timeout` bounds the whole stream.
+        """
+        self._require_backend()
+        self._stats["requests_total"] += 1
+        self._stats["stream_requests_total"] += 1
+        timeout = timeout or self.timeout
+        queued = time.perf_counter()
+
+        async with self._semaphore:
+            started = self._enter()
+            deadline = started + timeout
+            try:
+                attempt = 0
+                while True:
+                    chunks = self.backend.stream(prompt, system_instruction, deadline - time.perf_counter())
+                    received = False
+                    try:
+                        while True:
+                            remaining = deadline - time.perf_counter()
+                            if remaining <= 0:
+                                raise asyncio.TimeoutError()
+                            try:
+                                text = await asyncio.wait_for(chunks.__anext__(), remaining)
+                            except StopAsyncIteration:
+                                return
+                            if not received:
+                                # Time to first token (slot wait included) is the congestion signal for streams
+                                self._admission.record_outcome(True, time.perf_counter() - queued)
+                                received = True
+                            yield text
+                    except asyncio.TimeoutError:
+                        self._stats["timeouts_total"] += 1
+                        raise LLMTimeoutError(f"LLM stream timed out after {timeout:g}s")
+                    except LLMError:
+                        raise
+                    except Exception as e:
+                        if received or attempt >= self.max_retries:
+                            raise
+                        await self._backoff(attempt, e)
+                        attempt += 1
+                    finally:
+                        await chunks.aclose()
+            except Exception:
+                self._stats["errors_total"] += 1
+                self._admission.record_outcome(False, time.perf_counter() - queued)
+                raise
+            finally:
+                self._exit(started)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of gateway load for this worker"""
+        return {
+            "backend": self.backend.name,
+            "model": self.backend.model_name,
+            "configured": self.is_configured,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            **self._stats,
+        }
+
+
+# Singleton instance
+_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get or create the shared LLM gateway"""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(create_backend())
+        register_metrics("llm", _gateway.metrics)
+    return _gateway
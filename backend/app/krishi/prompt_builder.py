@@ -3,8 +3,70 @@ KrishiGPT Prompt Builder
 Centralized prompt construction with context injection.
 """
 
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from .types import FarmContext
+from .tokens import fit_history, KRISHI_HISTORY_TOKEN_BUDGET
+
+# Precompiled templates for the per-request part of the prompt
+_USER_PROMPT_TEMPLATE = (
+    "{context_block}{summary_block}{history_block}{tool_block}\n\n"
+    "## FARMER'S QUESTION:\n{question}\n\n"
+    "## YOUR RESPONSE (follow the format above):"
+)
+_TOOL_RESULT_LINE = "- {tool}: {summary}"
+_SUMMARY_BLOCK_TEMPLATE = "\n\n## EARLIER IN THIS CONVERSATION (summary):\n{summary}"
+
+# Distinct farm contexts seen by a worker stay small (a few fields, few values)
+CONTEXT_BLOCK_CACHE_SIZE = 1024
+
+ContextValues = Tuple[
+    Optional[str], Optional[str], Optional[str], Optional[str],
+    Optional[str], Optional[float], Optional[str], Optional[str]
+]
+
+
+def _context_values(context: FarmContext) -> ContextValues:
+    """Hashable snapshot of the FarmContext fields used in the context block"""
+    return (
+        context.location,
+        context.crop,
+        context.crop_stage.value if context.crop_stage else None,
+        context.season.value if context.season else None,
+        context.soil_type.value if context.soil_type else None,
+        context.land_size_acres,
+        context.irrigation_method,
+        context.weather_summary,
+    )
+
+
+@lru_cache(maxsize=CONTEXT_BLOCK_CACHE_SIZE)
+def _render_context_block(values: ContextValues) -> str:
+    location, crop, crop_stage, season, soil_type, land_size, irrigation, weather = values
+    parts = ["## FARMER CONTEXT:"]
+    
+    parts.append(f"- Location: {location}" if location else "- Location: Unknown")
+    parts.append(f"- Crop: {crop}" if crop else "- Crop: Unknown (ASK FARMER)")
+    parts.append(f"- Crop Stage: {crop_stage}" if crop_stage else "- Crop Stage: Unknown (ASK FARMER)")
+    
+    if season:
+        parts.append(f"- Season: {season}")
+    
+    if soil_type:
+        parts.append(f"- Soil Type: {soil_type}")
+    
+    if land_size:
+        parts.append(f"- Land Size: {land_size} acres")
+    else:
+        parts.append("- Land Size: Unknown (DO NOT GIVE DOSAGES)")
+    
+    if irrigation:
+        parts.append(f"- Irrigation: {irrigation}")
+    
+    if weather:
+        parts.append(f"- Recent Weather: {weather}")
+    
+    return "\n".join(parts)
 
 
 class KrishiPromptBuilder:
@@ -72,93 +134,76 @@ Remember: Farmer safety is more important than giving a quick answer. When in do
 
     @classmethod
     def build_context_block(cls, context: FarmContext) -> str:
-        """Build context injection block from FarmContext"""
-        parts = ["## FARMER CONTEXT:"]
-        
-        if context.location:
-            parts.append(f"- Location: {context.location}")
-        else:
-            parts.append("- Location: Unknown")
-        
-        if context.crop:
-            parts.append(f"- Crop: {context.crop}")
-        else:
-            parts.append("- Crop: Unknown (ASK FARMER)")
-        
-        if context.crop_stage:
-            parts.append(f"- Crop Stage: {context.crop_stage.value}")
-        else:
-            parts.append("- Crop Stage: Unknown (ASK FARMER)")
-        
-        if context.season:
-            parts.append(f"- Season: {context.season.value}")
-        
-        if context.soil_type:
-            parts.append(f"- Soil Type: {context.soil_type.value}")
-        
-        if context.land_size_acres:
-            parts.append(f"- Land Size: {context.land_size_acres} acres")
-        else:
-            parts.append("- Land Size: Unknown (DO NOT GIVE DOSAGES)")
-        
-        if context.irrigation_method:
-            parts.append(f"- Irrigation: {context.irrigation_method}")
-        
-        if context.weather_summary:
-            parts.append(f"- Recent Weather: {context.weather_summary}")
-        
-        return "\n".join(parts)
+        """Build context injection block from FarmContext (memoized per context value)"""
+        return _render_context_block(_context_values(context))
     
     @classmethod
-    def build_conversation_history(cls, messages: List[Dict]) -> str:
-        """Format conversation history for context"""
+    def build_conversation_history(
+        cls,
+        messages: List[Dict],
+        token_budget: int = KRISHI_HISTORY_TOKEN_BUDGET
+    ) -> str:
+        """Format conversation history for context, newest messages first into the token budget"""
+        messages = fit_history(messages, token_budget)
         if not messages:
             return ""
         
         parts = ["## PREVIOUS CONVERSATION:"]
         
-        for msg in messages[-10:]:  # Last 10 messages max
+        for msg in messages:
             role = "Farmer" if msg.get("role") == "user" else "KrishiGPT"
-            content = msg.get("content", "")[:500]  # Truncate long messages
-            parts.append(f"\n{role}: {content}")
+            parts.append(f"\n{role}: {msg.get('content', '')}")
         
         return "\n".join(parts)
     
     @classmethod
-    def build_full_prompt(
+    def build_user_prompt(
         cls,
         user_message: str,
         context: FarmContext,
         conversation_history: List[Dict],
-        tool_results: Optional[List[Dict]] = None
+        tool_results: Optional[List[Dict]] = None,
+        conversation_summary: Optional[str] = None
     ) -> str:
         """
-        Build complete prompt with all context injected.
-        This is the main entry point for prompt construction.
+        Build the per-request part of the prompt (context, summary of older
+        turns, recent history, tools, question).
+        SYSTEM_PROMPT is sent separately as the model's system instruction.
         """
-        parts = [cls.SYSTEM_PROMPT]
-        
-        # Add context block
-        parts.append("\n" + cls.build_context_block(context))
-        
-        # Add conversation history
         history_block = cls.build_conversation_history(conversation_history)
-        if history_block:
-            parts.append("\n" + history_block)
         
-        # Add tool results if any
+        tool_block = ""
         if tool_results:
-            parts.append("\n## TOOL RESULTS:")
-            for result in tool_results:
-                parts.append(f"- {result.get('tool')}: {result.get('summary', 'No summary')}")
-        
-        # Add current message
-        parts.append(f"\n## FARMER'S QUESTION:\n{user_message}")
-        
-        # Add response instruction
-        parts.append("\n## YOUR RESPONSE (follow the format above):")
-        
-        return "\n".join(parts)
+            tool_block = "\n\n## TOOL RESULTS:\n" + "\n".join(
+                _TOOL_RESULT_LINE.format(tool=r.get("tool"), summary=r.get("summary", "No summary"))
+                for r in tool_results
+            )
+        
+        return _USER_PROMPT_TEMPLATE.format(
+            context_block=cls.build_context_block(context),
+            summary_block=_SUMMARY_BLOCK_TEMPLATE.format(summary=conversation_summary) if conversation_summary else "",
+            history_block=f"\n\n{history_block}" if history_block else "",
+            tool_block=tool_block,
+            question=user_message
+        )
+    
+    @classmethod
+    def build_full_prompt(
+        cls,
+        user_message: str,
+        context: FarmContext,
+        conversation_history: List[Dict],
+        tool_results: Optional[List[Dict]] = None,
+        conversation_summary: Optional[str] = None
+    ) -> str:
+        """
+        Build the complete single-string prompt (system prompt + user prompt).
+        For backends that cannot take a separate system instruction.
+        """
+        user_prompt = cls.build_user_prompt(
+            user_message, context, conversation_history, tool_results, conversation_summary
+        )
+        return f"{cls.SYSTEM_PROMPT}\n\n{user_prompt}"
     
     @classmethod
     def build_clarification_prompt(
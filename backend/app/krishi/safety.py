@@ -4,9 +4,11 @@ Implements safety-first design for agricultural advice.
 RULE: Farmer safety over correctness, speed, or elegance.
 """
 
+from functools import lru_cache
 from typing import Optional, List, Dict, Tuple
 from .types import FarmContext, ConfidenceLevel
 from .types_continued import ToolResult
+from ..utils.aho_corasick import AhoCorasick
 
 
 # Banned pesticides by region (partial list - expand as needed)
@@ -33,6 +35,71 @@ BANNED_BY_STATE: Dict[str, set] = {
     "punjab": {"monocrotophos", "triazophos"},
 }
 
+
+def _state_key(location: Optional[str]) -> Optional[str]:
+    """Find a state with its own ban list in a free-text location ("Ludhiana, Punjab")"""
+    if not location:
+        return None
+    location_lower = location.lower()
+    for state in BANNED_BY_STATE:
+        if state in location_lower:
+            return state
+    return None
+
+
+@lru_cache(maxsize=None)
+def _banned_automaton(state: Optional[str]) -> AhoCorasick:
+    """National bans plus the state's own list, compiled once per state"""
+    return AhoCorasick(BANNED_CHEMICALS_INDIA | BANNED_BY_STATE.get(state, set()))
+
+
+def _mark_banned(text: str, matches: List[Tuple[int, int]]) -> str:
+    parts = []
+    last = 0
+    for start, end in matches:
+        parts.append(text[last:start])
+        parts.append(f"[BANNED: {text[start:end]}]")
+        last = end
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+class StreamingSanitizer:
+    """
+    Marks banned chemicals in a response that arrives in chunks.
+    Names split across chunks ("endo" + "sulfan") are still caught: only the
+    last `max_length - 1` characters are held back until the next chunk.
+    """
+
+    def __init__(self, automaton: AhoCorasick):
+        self._automaton = automaton
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; return the sanitized text that can be sent now"""
+        text = self._pending + chunk
+        # Every match starting before `cut` is already fully inside `text`
+        cut = len(text) - self._automaton.max_length + 1
+        if cut <= 0:
+            self._pending = text
+            return ""
+
+        matches = []
+        for start, end in self._automaton.find_leftmost_longest(text):
+            if start >= cut:
+                break
+            matches.append((start, end))
+            cut = max(cut, end)
+
+        self._pending = text[cut:]
+        return _mark_banned(text[:cut], matches)
+
+    def flush(self) -> str:
+        """Sanitize and return whatever is still held back at the end of the stream"""
+        text, self._pending = self._pending, ""
+        return _mark_banned(text, self._automaton.find_leftmost_longest(text))
+
+
 # Maximum safe dosages (kg/acre) - conservative limits
 MAX_DOSAGE_LIMITS = {
     "urea": 50,
@@ -193,22 +260,19 @@ class SafetyValidator:
             return ConfidenceLevel.LOW
     
     @staticmethod
-    def sanitize_ai_response(response: str) -> str:
+    def sanitize_ai_response(response: str, location: Optional[str] = None) -> str:
         """
         Remove potentially dangerous advice from AI response.
+        Banned chemicals (national list plus the farmer's state list) are
+        marked case-insensitively in a single pass.
         """
-        # Check for banned chemicals mentioned
-        response_lower = response.lower()
-        
-        for chemical in BANNED_CHEMICALS_INDIA:
-            if chemical in response_lower:
-                response = response.replace(
-                    chemical, 
-                    f"[BANNED: {chemical}]"
-                )
-                response = response.replace(
-                    chemical.title(),
-                    f"[BANNED: {chemical.title()}]"
-                )
-        
-        return response
+        automaton = _banned_automaton(_state_key(location))
+        return _mark_banned(response, automaton.find_leftmost_longest(response))
+    
+    @staticmethod
+    def stream_sanitizer(location: Optional[str] = None) -> StreamingSanitizer:
+        """
+        Sanitizer for a chunked response.
+        Call feed() for each chunk and flush() once the stream ends.
+        """
+        return StreamingSanitizer(_banned_automaton(_state_key(location)))
@@ -0,0 +1,126 @@
+"""
+KrishiGPT Single-Flight
+Coalesces identical in-flight LLM requests into one generation.
+Late subscribers first receive the chunks already produced, then follow live.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One in-progress stream shared by every subscriber of the same key"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        # Wake everyone waiting on the current event, then arm a fresh one
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+    The first caller starts the work in a background task; later callers
+    attach to it. The work is cancelled once every subscriber has gone.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Subscribe to the stream for `key`, starting it via `factory` if nobody else has"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._produce(key, flight, factory))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.subscribers += 1
+        try:
+            index = 0
+            while True:
+                if index < len(flight.chunks):
+                    chunk = flight.chunks[index]
+                    index += 1
+                    yield chunk
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task:
+                flight.task.cancel()
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _Flight,
+        factory: Callable[[], AsyncIterator[str]]
+    ) -> None:
+        try:
+            async for chunk in factory():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = ConnectionAbortedError("Generation cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+
+    async def call(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Await the shared result for `key`, starting it via `factory` if needed"""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget_call(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        # One caller disconnecting must not cancel the work for the others
+        return await asyncio.shield(future)
+
+    def _forget_call(self, key: str, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight_streams": len(self._flights),
+            "in_flight_calls": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,119 @@
+"""
+KrishiGPT Streaming Engine
+Runs blocking Gemini SDK calls on a bounded worker pool so the event loop stays free.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Each in-flight generation holds one worker thread while it waits on the network
+LLM_WORKER_THREADS = int(os.getenv("LLM_WORKER_THREADS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Queue markers passed from the producer thread to the consuming coroutine
+_DONE = object()
+
+
+class _Failure:
+    """Wraps an exception raised inside the producer thread"""
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """Get or create the shared worker pool for blocking LLM calls"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=LLM_WORKER_THREADS,
+                    thread_name_prefix="llm-worker"
+                )
+    return _executor
+
+
+async def iterate_in_thread(
+    factory: Callable[[], Iterable[Any]],
+    executor: Optional[ThreadPoolExecutor] = None
+) -> AsyncIterator[Any]:
+    """
+    Consume a blocking iterator on the worker pool and yield its items asynchronously.
+    The producer thread hands items over through an asyncio.Queue, so awaiting the
+    next item never blocks other requests on the same worker.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+
+    def hand_over(item: Any) -> bool:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+            return True
+        except RuntimeError:
+            # Event loop already closed - nobody is listening anymore
+            return False
+
+    def produce() -> None:
+        try:
+            for item in factory():
+                if stopped.is_set() or not hand_over(item):
+                    return
+        except BaseException as e:
+            hand_over(_Failure(e))
+            return
+        hand_over(_DONE)
+
+    loop.run_in_executor(executor or get_llm_executor(), produce)
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        # Tell the producer to stop pulling chunks if the client went away
+        stopped.set()
+
+
+def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+    """
+    SDK call options. Cancelling the awaiting coroutine cannot stop a worker
+    thread, so the deadline is also given to the SDK call itself: a timed-out
+    call then frees its thread instead of holding it until Gemini answers.
+    """
+    return {"request_options": {"timeout": timeout}} if timeout else {}
+
+
+def _iter_chunk_text(model: Any, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+    """Blocking iterator over the text of each streamed Gemini chunk"""
+    for chunk in model.generate_content(prompt, stream=True, **_request_options(timeout)):
+        if chunk.text:
+            yield chunk.text
+
+
+async def stream_text(model: Any, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """Stream generated text chunks from a Gemini model without blocking the loop"""
+    async for text in iterate_in_thread(lambda: _iter_chunk_text(model, prompt, timeout)):
+        yield text
+
+
+async def generate_text(model: Any, prompt: str, timeout: Optional[float] = None) -> str:
+    """Run a non-streaming Gemini generation on the worker pool"""
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(
+        get_llm_executor(),
+        lambda: model.generate_content(prompt, **_request_options(timeout))
+    )
+    return response.text
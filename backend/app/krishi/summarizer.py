@@ -0,0 +1,233 @@
+"""
+KrishiGPT Rolling Summaries
+Once a thread outgrows the recent window, older turns are folded into a
+stored per-conversation summary that is sent ahead of the recent messages,
+so facts such as the sowing date or a pest already treated stay in the
+prompt while its size stays flat however long the thread gets.
+Summaries are refreshed by background tasks, never on the request path,
+each LLM call holding a BATCH admission permit so folds yield to chat.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .llm import LLMGateway, get_llm_gateway
+from .tokens import clip_to_tokens
+from ..db.repository import get_repository
+from ..utils.admission import AdmissionRejected, Priority, get_admission_limiter
+from ..utils.metrics import register_metrics
+from ..utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Newest messages always kept verbatim (never folded)
+SUMMARY_KEEP_RECENT_MESSAGES = int(os.getenv("SUMMARY_KEEP_RECENT_MESSAGES", "10"))
+# Fold once this many older messages are unsummarized; the first summary is
+# written when a thread passes KEEP_RECENT + FOLD_BATCH messages
+SUMMARY_FOLD_BATCH_MESSAGES = int(os.getenv("SUMMARY_FOLD_BATCH_MESSAGES", "10"))
+# Upper bound on messages folded by one refresh (bounds the summarization prompt)
+SUMMARY_MAX_FOLD_MESSAGES = int(os.getenv("SUMMARY_MAX_FOLD_MESSAGES", "40"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "400"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "300"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+SUMMARY_INSTRUCTION = """You keep a running summary of a conversation between an Indian farmer and KrishiGPT, an agricultural assistant.
+Update the current summary with the new messages.
+
+Keep every fact later advice may depend on: crop and variety, location, land size, sowing or transplanting dates, crop stage, soil and irrigation, pests or diseases seen, treatments and doses already applied, advice given and what the farmer decided.
+Drop greetings and advice that was only repeated.
+Write short bullet points, newest facts last, at most {max_words} words.
+Reply with the summary only."""
+
+_FOLD_PROMPT_TEMPLATE = (
+    "## CURRENT SUMMARY:\n{summary}\n\n"
+    "## NEW MESSAGES:\n{messages}\n\n"
+    "## UPDATED SUMMARY:"
+)
+
+# Cached "this conversation has no summary yet"
+_NO_SUMMARY = object()
+
+
+class RollingSummary(NamedTuple):
+    text: str
+    # Position (created_at, id) of the last message folded into the summary
+    until_at: str
+    until_id: str
+
+
+def _is_after(message: Dict, until: Tuple[datetime, str]) -> bool:
+    """
+    Whether a message comes after the (created_at, id) position `until`.
+    Messages without a created_at cannot be placed and count as after it.
+    """
+    created_at = message.get("created_at")
+    if not created_at:
+        return True
+    return (datetime.fromisoformat(created_at), message["id"]) > until
+
+
+class ConversationSummarizer:
+    """
+    Reads summaries through a per-worker TTL cache and folds older turns
+    in background tasks (at most one per conversation at a time).
+    """
+
+    def __init__(
+        self,
+        llm: Optional[LLMGateway] = None,
+        keep_recent: int = SUMMARY_KEEP_RECENT_MESSAGES,
+        fold_batch: int = SUMMARY_FOLD_BATCH_MESSAGES,
+        max_fold: int = SUMMARY_MAX_FOLD_MESSAGES,
+        max_tokens: int = SUMMARY_MAX_TOKENS
+    ):
+        self._llm = llm
+        self.keep_recent = keep_recent
+        self.fold_batch = fold_batch
+        self.max_fold = max_fold
+        self.max_tokens = max_tokens
+        self._cache = TTLCache(max_entries=SUMMARY_CACHE_MAX_ENTRIES, ttl_seconds=SUMMARY_CACHE_TTL_SECONDS)
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {
+            "refreshes_total": 0,
+            "refreshes_shed_total": 0,
+            "refresh_errors_total": 0,
+            "gaps_total": 0,
+            "messages_folded_total": 0,
+        }
+
+    @property
+    def llm(self) -> LLMGateway:
+        return self._llm or get_llm_gateway()
+
+    async def get(self, conversation_id: str) -> Optional[RollingSummary]:
+        """The conversation's summary, or None if it has none yet"""
+        summary = self._cache.get(conversation_id)
+        if summary is None:
+            row = await get_repository().get_rolling_summary(conversation_id)
+            summary = (
+                RollingSummary(row["summary"], row["summarized_until"], row["summarized_until_id"])
+                if row else _NO_SUMMARY
+            )
+            self._cache.set(conversation_id, summary)
+        return None if summary is _NO_SUMMARY else summary
+
+    def unsummarized(
+        self,
+        conversation_id: str,
+        history: List[Dict],
+        summary: Optional[RollingSummary]
+    ) -> List[Dict]:
+        """
+        The part of a recent-history window (oldest first) that the summary
+        does not cover. Schedules a refresh when too much of it has built up,
+        or right away when messages fall between the summary and the window.
+        """
+        if summary:
+            for index, message in enumerate(history):
+                if message["id"] == summary.until_id:
+                    return self._check_backlog(conversation_id, history[index + 1:])
+
+            # The summary point is outside the window (e.g. after failed refreshes)
+            until = (datetime.fromisoformat(summary.until_at), summary.until_id)
+            unsummarized = [message for message in history if _is_after(message, until)]
+            if unsummarized and len(unsummarized) == len(history):
+                # Older messages after the summary point are in neither the summary nor the window
+                self._stats["gaps_total"] += 1
+                self._schedule_refresh(conversation_id)
+            history = unsummarized
+        return self._check_backlog(conversation_id, history)
+
+    def _check_backlog(self, conversation_id: str, history: List[Dict]) -> List[Dict]:
+        if len(history) >= self.keep_recent + self.fold_batch:
+            self._schedule_refresh(conversation_id)
+        return history
+
+    def _schedule_refresh(self, conversation_id: str) -> None:
+        if conversation_id in self._refreshing or not self.llm.is_configured:
+            return
+        self._refreshing.add(conversation_id)
+        task = asyncio.get_running_loop().create_task(self._refresh(conversation_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, conversation_id: str) -> None:
+        try:
+            summary = await self.get(conversation_id)
+            after = (summary.until_at, summary.until_id) if summary else None
+            messages = await get_repository().messages_after(
+                conversation_id, self.max_fold + self.keep_recent, after
+            )
+            # Stored messages only; the newest `keep_recent` stay verbatim
+            fold = messages[:max(len(messages) - self.keep_recent, 0)][:self.max_fold]
+            if len(fold) < self.fold_batch:
+                return
+
+            try:
+                # Lowest priority: waits behind chat and is shed first under load
+                permit = await get_admission_limiter().acquire(Priority.BATCH)
+            except AdmissionRejected as e:
+                # Retried on a later turn
+                self._stats["refreshes_shed_total"] += 1
+                logger.info(f"Summary refresh for {conversation_id} shed: {e.reason}")
+                return
+            try:
+                text = await self._fold(summary.text if summary else None, fold)
+            finally:
+                permit.release()
+            if not text:
+                return
+            last = fold[-1]
+            await get_repository().save_rolling_summary(
+                conversation_id, text, (last["created_at"], last["id"])
+            )
+            self._cache.set(conversation_id, RollingSummary(text, last["created_at"], last["id"]))
+            self._stats["refreshes_total"] += 1
+            self._stats["messages_folded_total"] += len(fold)
+        except Exception as e:
+            self._stats["refresh_errors_total"] += 1
+            logger.warning(f"Summary refresh failed for {conversation_id}: {e}")
+        finally:
+            self._refreshing.discard(conversation_id)
+
+    async def _fold(self, summary: Optional[str], messages: List[Dict]) -> str:
+        """Ask the LLM for the summary updated with `messages`"""
+        lines = "\n".join(
+            f"{'Farmer' if m['role'] == 'user' else 'KrishiGPT'}: {m['content']}" for m in messages
+        )
+        prompt = _FOLD_PROMPT_TEMPLATE.format(summary=summary or "None yet", messages=lines)
+        # Roughly 3 words per 4 tokens
+        instruction = SUMMARY_INSTRUCTION.format(max_words=self.max_tokens * 3 // 4)
+        # Background latency and errors stay out of the interactive AIMD signal
+        text = await self.llm.generate(prompt, system_instruction=instruction, feed_admission=False)
+        return clip_to_tokens(text, self.max_tokens)
+
+    async def close(self) -> None:
+        """Cancel refreshes still running (they are redone on a later turn)"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def metrics(self) -> Dict:
+        return {
+            "refreshing": len(self._refreshing),
+            **self._stats,
+            "cache": self._cache.stats(),
+        }
+
+
+# Singleton instance
+_summarizer: Optional[ConversationSummarizer] = None
+
+
+def get_summarizer() -> ConversationSummarizer:
+    """Get or create the conversation summarizer singleton"""
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = ConversationSummarizer()
+        register_metrics("summaries", _summarizer.metrics)
+    return _summarizer
@@ -0,0 +1,122 @@
+"""
+KrishiGPT Token Budget
+Local token-count approximation and newest-first history fitting,
+so prompt size stays bounded however long a conversation gets.
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+# Token budget for the conversation-history block of a prompt
+KRISHI_HISTORY_TOKEN_BUDGET = int(os.getenv("KRISHI_HISTORY_TOKEN_BUDGET", "2000"))
+# Longer history messages (e.g. a long earlier answer) are clipped to this
+KRISHI_HISTORY_MESSAGE_MAX_TOKENS = int(os.getenv("KRISHI_HISTORY_MESSAGE_MAX_TOKENS", "250"))
+# Clipping the oldest kept message below this is not worth its overhead
+MIN_CLIPPED_MESSAGE_TOKENS = 16
+CLIP_MARKER = " …"
+
+# Role label, separators and newlines added around every history message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Words, single punctuation marks; \w also matches Devanagari and other scripts
+_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Average characters per token: ~4 for English, closer to 2 for Indic scripts
+_ASCII_CHARS_PER_TOKEN = 4
+_OTHER_CHARS_PER_TOKEN = 2
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """
+    Approximate the number of LLM tokens in `text`.
+    Every word or punctuation mark is at least one token; long words are
+    split by average characters per token for their script.
+    """
+    if not text:
+        return 0
+    total = 0
+    for piece in _PIECES.findall(text):
+        per_token = _ASCII_CHARS_PER_TOKEN if piece.isascii() else _OTHER_CHARS_PER_TOKEN
+        total += -(-len(piece) // per_token)
+    return total
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Leading whole lines of `text` that fit within `max_tokens`; the first
+    line that does not fit is cut at a word boundary.
+    """
+    kept: List[str] = []
+    remaining = max_tokens
+    for line in text.strip().splitlines():
+        cost = count_tokens(line) + 1
+        if cost <= remaining:
+            kept.append(line)
+            remaining -= cost
+            continue
+        words: List[str] = []
+        remaining -= 1
+        for word in line.split():
+            cost = count_tokens(word)
+            if cost > remaining:
+                break
+            words.append(word)
+            remaining -= cost
+        if words:
+            kept.append(" ".join(words))
+        break
+    return "\n".join(kept)
+
+
+def clip_message(message: Dict, max_tokens: int) -> Dict:
+    """
+    Copy of a history message with its content clipped to `max_tokens`;
+    CLIP_MARKER (counted in the limit) is added only if something was cut.
+    """
+    content = message.get("content", "")
+    if count_tokens(content) > max_tokens:
+        content = clip_to_tokens(content, max_tokens - count_tokens(CLIP_MARKER)) + CLIP_MARKER
+    return {**message, "content": content, "tokens_used": count_tokens(content)}
+
+
+def message_tokens(message: Dict) -> int:
+    """
+    Token count of a history message, using the cached `tokens_used` when present.
+    History entries carry count_tokens() values; sliding_window recounts rows loaded
+    from the database, whose stored values may come from older counting schemes.
+    """
+    cached = message.get("tokens_used")
+    if isinstance(cached, int) and cached > 0:
+        return cached
+    return count_tokens(message.get("content", ""))
+
+
+def fit_history(
+    messages: List[Dict],
+    budget: int = KRISHI_HISTORY_TOKEN_BUDGET,
+    overhead: int = MESSAGE_OVERHEAD_TOKENS,
+    max_message_tokens: int = KRISHI_HISTORY_MESSAGE_MAX_TOKENS
+) -> List[Dict]:
+    """
+    Keep the newest messages whose combined size fits within `budget` tokens.
+    Messages are given and returned in chronological order (oldest first).
+    A message over `max_message_tokens` is clipped to it rather than
+    crowding out everything older; once the budget runs out, the oldest
+    kept message is clipped to what is left, so the window stays contiguous.
+    """
+    kept: List[Dict] = []
+    remaining = budget
+    for message in reversed(messages):
+        tokens = message_tokens(message)
+        if tokens > max_message_tokens:
+            message = clip_message(message, max_message_tokens)
+            tokens = message_tokens(message)
+        if tokens + overhead > remaining:
+            if remaining - overhead >= MIN_CLIPPED_MESSAGE_TOKENS:
+                kept.append(clip_message(message, remaining - overhead))
+            break
+        kept.append(message)
+        remaining -= tokens + overhead
+    kept.reverse()
+    return kept
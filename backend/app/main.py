@@ -1,17 +1,18 @@
 # ruff: noqa: E402
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import logging
-import json
-import asyncio
 import time
+from contextlib import asynccontextmanager
 from typing import Callable
 
+from .utils.json_response import FastJSONResponse
+from .utils.cursor import CURSOR_HEADERS
+
 # Load environment variables
 load_dotenv()
 
@@ -23,11 +24,27 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Environment validation
-REQUIRED_ENV_VARS = ["GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_KEY"]
+REQUIRED_ENV_VARS = ["GEMINI_API_KEY"]
+if os.getenv("DB_BACKEND", "supabase") == "supabase":
+    REQUIRED_ENV_VARS += ["SUPABASE_URL", "SUPABASE_KEY"]
 missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
 if missing_vars:
     logger.warning(f"Missing environment variables: {', '.join(missing_vars)}")
 
+from .db.message_writer import get_message_writer
+from .krishi.summarizer import get_summarizer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers; flush queued message writes on graceful shutdown"""
+    message_writer = get_message_writer()
+    message_writer.start()
+    yield
+    await get_summarizer().close()
+    await message_writer.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="KrishiGPT API",
@@ -35,6 +52,8 @@ app = FastAPI(
     version="1.0.1",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 
@@ -87,6 +106,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=CURSOR_HEADERS,
 )
 
 # Import and include routers (after app is created)
@@ -95,6 +115,11 @@ from .routes.messages import router as messages_router
 from .routes.krishi import router as krishi_router
 from .routes.dashboard import router as dashboard_router
 from .routes.admin import router as admin_router
+from .krishi.llm import get_llm_gateway
+from .krishi.answer_cache import AnswerCache, get_answer_cache, iter_replay_chunks
+from .utils.sse import coalesce_chunks, wants_full_text, StreamAccumulator, SSE_HEADERS
+from .krishi.events import ChunkEvent, DoneEvent, ErrorEvent
+from .utils.metrics import collect_metrics
 
 app.include_router(conversations_router)
 app.include_router(messages_router)
@@ -112,19 +137,50 @@ class AnswerResponse(BaseModel):
     source: str = "Gemini AI"
 
 
-# Initialize Gemini
-api_key = os.getenv("GEMINI_API_KEY")
-model = None
+# Shared Gemini gateway (one client and one concurrency cap per worker)
+llm = get_llm_gateway()
+answer_cache = get_answer_cache()
 
-if not api_key:
+if not llm.is_configured:
     logger.error("GEMINI_API_KEY not found in environment variables.")
-else:
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        logger.info("Gemini API configured successfully")
-    except Exception as e:
-        logger.error(f"Error configuring Gemini: {e}")
+
+# Static /ask instructions, sent once per model as the system instruction
+ASK_SYSTEM_PROMPT = """You are KrishiGPT, an AI assistant specifically designed to help farmers with agricultural questions.
+Please provide a helpful, practical answer to the farmer's question.
+
+Keep your response:
+- Practical and actionable
+- Focused on farming and agriculture
+- Easy to understand for farmers
+- Comprehensive and detailed
+
+Formatting rules are STRICT and MUST be followed in every response:
+
+1. You MUST format all responses using GitHub-flavored Markdown (GFM).
+2. Use clear section headings (## or ###) to organize content.
+3. Use bullet points for lists and explanations.
+4. When comparing items, YOU MUST use Markdown tables.
+5. Use numbered lists only when sequence or steps matter.
+6. Use short, scannable paragraphs. Avoid long blocks of text.
+7. NEVER wrap the entire response in a single code block.
+8. Code blocks are allowed ONLY for actual code or commands.
+9. Do NOT mention Markdown, formatting rules, or meta commentary in your output.
+10. Do NOT explain what you are doing — only produce the final formatted answer.
+
+Content quality rules:
+
+11. Be concise but complete.
+12. Prefer structured clarity over conversational tone.
+13. Avoid filler words, emojis, or decorative language.
+14. If the user request is ambiguous, make reasonable assumptions and proceed.
+15. If a table improves clarity, use it without being asked.
+16. If bullet points improve clarity, use them without being asked.
+
+Failure to follow these rules is considered an incorrect response.
+
+If the question is not related to farming, politely redirect to farming topics."""
+
+ASK_PROMPT_TEMPLATE = "Farming question: {question}"
 
 
 @app.get("/")
@@ -134,78 +190,61 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "gemini_configured": model is not None}
+    return {"status": "healthy", "gemini_configured": llm.is_configured}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Per-worker runtime metrics (LLM load, caches, queues)"""
+    return collect_metrics()
+
 
+async def replay_cached_answer(cached_answer: str, include_full_text: bool = False):
+    """Replay a cached answer in the same SSE shape as a live stream"""
+    accumulated = StreamAccumulator()
+    for text in iter_replay_chunks(cached_answer):
+        accumulated.append(text)
+        yield ChunkEvent(text).to_sse()
+    yield DoneEvent(accumulated.text).to_sse(include_full_text)
 
-async def generate_stream(question: str):
+
+async def generate_stream(question: str, include_full_text: bool = False):
     """Generate streaming response from Gemini API"""
-    if not model:
-        error_data = json.dumps({"error": "Gemini API not configured"}) + "\n"
-        yield f"data: {error_data}\n\n"
+    cache_key = AnswerCache.make_key("ask", question)
+    
+    if not llm.is_configured:
+        yield ErrorEvent("Gemini API not configured", done=False).to_sse()
         return
     
     try:
-        farming_prompt = f"""You are KrishiGPT, an AI assistant specifically designed to help farmers with agricultural questions. 
-        Please provide a helpful, practical answer to this farming question: {question}
-        
-        Keep your response:
-        - Practical and actionable
-        - Focused on farming and agriculture
-        - Easy to understand for farmers
-        - Comprehensive and detailed
-        
-        Formatting rules are STRICT and MUST be followed in every response:
+        farming_prompt = ASK_PROMPT_TEMPLATE.format(question=question)
         
-        1. You MUST format all responses using GitHub-flavored Markdown (GFM).
-        2. Use clear section headings (## or ###) to organize content.
-        3. Use bullet points for lists and explanations.
-        4. When comparing items, YOU MUST use Markdown tables.
-        5. Use numbered lists only when sequence or steps matter.
-        6. Use short, scannable paragraphs. Avoid long blocks of text.
-        7. NEVER wrap the entire response in a single code block.
-        8. Code blocks are allowed ONLY for actual code or commands.
-        9. Do NOT mention Markdown, formatting rules, or meta commentary in your output.
-        10. Do NOT explain what you are doing — only produce the final formatted answer.
+        accumulated = StreamAccumulator()
+        async for text in coalesce_chunks(llm.stream(farming_prompt, system_instruction=ASK_SYSTEM_PROMPT)):
+            accumulated.append(text)
+            yield ChunkEvent(text).to_sse()
         
-        Content quality rules:
+        answer_cache.set(cache_key, accumulated.text)
         
-        11. Be concise but complete.
-        12. Prefer structured clarity over conversational tone.
-        13. Avoid filler words, emojis, or decorative language.
-        14. If the user request is ambiguous, make reasonable assumptions and proceed.
-        15. If a table improves clarity, use it without being asked.
-        16. If bullet points improve clarity, use them without being asked.
-        
-        Failure to follow these rules is considered an incorrect response.
-        
-        If the question is not related to farming, politely redirect to farming topics."""
-        
-        response = model.generate_content(farming_prompt, stream=True)
-        
-        accumulated_text = ""
-        for chunk in response:
-            if chunk.text:
-                accumulated_text += chunk.text
-                data = json.dumps({"chunk": chunk.text, "done": False}) + "\n"
-                yield f"data: {data}\n\n"
-                await asyncio.sleep(0.01)
-        
-        final_data = json.dumps({"chunk": "", "done": True, "full_text": accumulated_text}) + "\n"
-        yield f"data: {final_data}\n\n"
+        yield DoneEvent(accumulated.text).to_sse(include_full_text)
         
         logger.info(f"Streamed response for question: {question[:50]}...")
         
     except Exception as e:
         logger.error(f"Error streaming response: {e}")
-        error_data = json.dumps({"error": str(e), "done": True}) + "\n"
-        yield f"data: {error_data}\n\n"
+        yield ErrorEvent(str(e)).to_sse()
 
 
 @app.post("/ask")
-async def ask_question(request: Request, body: QuestionRequest):
+async def ask_question(
+    request: Request,
+    body: QuestionRequest,
+    include_full_text: bool = Depends(wants_full_text)
+):
     """Stream AI response for farming questions"""
     from .utils.rate_limit import check_rate_limit
     from .utils.validation import validate_message_content, ValidationError
+    from .utils.admission import admit_llm_request, Priority
     
     # Rate limiting
     check_rate_limit(request, "ai_query")
@@ -214,19 +253,27 @@ async def ask_question(request: Request, body: QuestionRequest):
         # Validate input
         question = validate_message_content(body.question)
         
-        if not model:
+        # Cache hits need no LLM call, so they skip admission and are served even when shedding
+        cached_answer = answer_cache.get(AnswerCache.make_key("ask", question))
+        if cached_answer is not None:
+            return StreamingResponse(
+                replay_cached_answer(cached_answer, include_full_text),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS
+            )
+        
+        if not llm.is_configured:
             raise HTTPException(status_code=503, detail="Gemini API not configured")
         
+        # Shed load with a fast 503 instead of queueing inside Gemini
+        permit = await admit_llm_request(Priority.INTERACTIVE)
+        
         logger.info(f"Received question: {question[:50]}...")
         
         return StreamingResponse(
-            generate_stream(question),
+            permit.release_after(generate_stream(question, include_full_text)),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
+            headers=SSE_HEADERS
         )
     
     except ValidationError as e:
@@ -10,7 +10,8 @@ from datetime import datetime, date
 import logging
 import asyncio
 
-from ..db.supabase import get_supabase
+from ..db.repository import get_repository
+from ..utils.json_response import FastJSONResponse
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 logger = logging.getLogger(__name__)
@@ -156,19 +157,16 @@ class InsightResponse(BaseModel):
 @router.get("/categories", response_model=List[CropCategoryResponse])
 async def list_categories():
     """List all crop categories"""
-    db = get_supabase()
-    result = db.table("crop_categories").select("*").order("display_order").execute()
-    return result.data
+    return await get_repository().list_categories()
 
 
 @router.post("/categories", response_model=CropCategoryResponse)
 async def create_category(data: CropCategoryCreate):
     """Create a new crop category"""
-    db = get_supabase()
-    result = db.table("crop_categories").insert(data.model_dump()).execute()
-    if not result.data:
+    category = await get_repository().create_category(data.model_dump())
+    if not category:
         raise HTTPException(status_code=400, detail="Failed to create category")
-    return result.data[0]
+    return category
 
 
 # === Crops ===
@@ -179,76 +177,52 @@ async def list_crops(
     category_id: Optional[str] = Query(None, description="Filter by category")
 ):
     """List all crops with optional filters"""
-    db = get_supabase()
-    query = db.table("crops").select("*, crop_categories(name, icon)")
-    
-    if active_only:
-        query = query.eq("is_active", True)
-    if category_id:
-        query = query.eq("category_id", category_id)
-    
-    result = query.order("name").execute()
-    
-    # Transform the response to include category info
-    crops = []
-    for crop in result.data:
-        category = crop.pop("crop_categories", None)
-        crop["category"] = category
-        crops.append(crop)
-    
-    return crops
+    # Each crop comes with its category info
+    return await get_repository().list_crops(active_only, category_id)
 
 
 @router.get("/crops/{crop_id}", response_model=CropResponse)
 async def get_crop(crop_id: str):
     """Get a single crop by ID"""
-    db = get_supabase()
-    result = db.table("crops").select("*, crop_categories(name, icon)").eq("id", crop_id).execute()
+    crop = await get_repository().get_crop(crop_id)
     
-    if not result.data:
+    if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
     
-    crop = result.data[0]
-    category = crop.pop("crop_categories", None)
-    crop["category"] = category
     return crop
 
 
 @router.post("/crops", response_model=CropResponse)
 async def create_crop(data: CropCreate):
     """Create a new crop"""
-    db = get_supabase()
-    result = db.table("crops").insert(data.model_dump(exclude_none=True)).execute()
+    crop = await get_repository().create_crop(data.model_dump(exclude_none=True))
     
-    if not result.data:
+    if not crop:
         raise HTTPException(status_code=400, detail="Failed to create crop")
     
-    return result.data[0]
+    return crop
 
 
 @router.patch("/crops/{crop_id}", response_model=CropResponse)
 async def update_crop(crop_id: str, data: CropUpdate):
     """Update a crop"""
-    db = get_supabase()
-    
     update_data = data.model_dump(exclude_none=True)
     update_data["updated_at"] = datetime.utcnow().isoformat()
     
-    result = db.table("crops").update(update_data).eq("id", crop_id).execute()
+    crop = await get_repository().update_crop(crop_id, update_data)
     
-    if not result.data:
+    if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
     
-    return result.data[0]
+    return crop
 
 
 @router.delete("/crops/{crop_id}")
 async def delete_crop(crop_id: str):
     """Delete a crop (soft delete by setting is_active=False)"""
-    db = get_supabase()
-    result = db.table("crops").update({"is_active": False, "updated_at": datetime.utcnow().isoformat()}).eq("id", crop_id).execute()
+    crop = await get_repository().update_crop(crop_id, {"is_active": False, "updated_at": datetime.utcnow().isoformat()})
     
-    if not result.data:
+    if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
     
     return {"message": "Crop deactivated successfully"}
@@ -261,49 +235,34 @@ async def list_prices(
     crop_id: Optional[str] = Query(None),
     days: int = Query(30, description="Number of days of history"),
     limit: int = Query(100, description="Max records to return")
-):
+) -> FastJSONResponse:
     """List price history"""
-    db = get_supabase()
-    query = db.table("crop_prices").select("*, crops(name, icon)")
-    
-    if crop_id:
-        query = query.eq("crop_id", crop_id)
-    
-    result = query.order("recorded_at", desc=True).limit(limit).execute()
-    
-    prices = []
-    for price in result.data:
-        crop = price.pop("crops", None)
-        price["crop"] = crop
-        prices.append(price)
+    prices = await get_repository().list_prices(crop_id, limit)
     
-    return prices
+    # Rows already have the PriceResponse shape - skip per-row validation
+    return FastJSONResponse(prices)
 
 
 @router.post("/prices", response_model=PriceResponse)
 async def create_price(data: PriceCreate):
     """Add a new price entry"""
-    db = get_supabase()
-    
     price_data = data.model_dump(exclude_none=True)
     if not price_data.get("recorded_at"):
         price_data["recorded_at"] = date.today().isoformat()
     else:
         price_data["recorded_at"] = price_data["recorded_at"].isoformat()
     
-    result = db.table("crop_prices").insert(price_data).execute()
+    result = await get_repository().insert_prices([price_data])
     
-    if not result.data:
+    if not result:
         raise HTTPException(status_code=400, detail="Failed to create price entry")
     
-    return result.data[0]
+    return result[0]
 
 
 @router.post("/prices/bulk")
 async def bulk_create_prices(prices: List[PriceCreate]):
     """Bulk insert price entries"""
-    db = get_supabase()
-    
     price_data = []
     for p in prices:
         d = p.model_dump(exclude_none=True)
@@ -313,18 +272,15 @@ async def bulk_create_prices(prices: List[PriceCreate]):
             d["recorded_at"] = d["recorded_at"].isoformat()
         price_data.append(d)
     
-    result = db.table("crop_prices").insert(price_data).execute()
+    result = await get_repository().insert_prices(price_data)
     
-    return {"inserted": len(result.data)}
+    return {"inserted": len(result)}
 
 
 @router.delete("/prices/{price_id}")
 async def delete_price(price_id: str):
     """Delete a price entry"""
-    db = get_supabase()
-    result = db.table("crop_prices").delete().eq("id", price_id).execute()
-    
-    if not result.data:
+    if not await get_repository().delete_price(price_id):
         raise HTTPException(status_code=404, detail="Price entry not found")
     
     return {"message": "Price entry deleted"}
@@ -335,9 +291,7 @@ async def delete_price(price_id: str):
 @router.get("/insight-types", response_model=List[InsightTypeResponse])
 async def list_insight_types():
     """List all insight types"""
-    db = get_supabase()
-    result = db.table("insight_types").select("*").order("display_order").execute()
-    return result.data
+    return await get_repository().list_insight_types()
 
 
 # === Insights ===
@@ -349,64 +303,40 @@ async def list_insights(
     limit: int = Query(50)
 ):
     """List all insights"""
-    db = get_supabase()
-    query = db.table("insights").select("*, insight_types(name, icon, color)")
-    
-    if published_only:
-        query = query.eq("is_published", True)
-    if type_id:
-        query = query.eq("type_id", type_id)
-    
-    result = query.order("created_at", desc=True).limit(limit).execute()
-    
-    insights = []
-    for insight in result.data:
-        insight_type = insight.pop("insight_types", None)
-        insight["insight_type"] = insight_type
-        insights.append(insight)
-    
-    return insights
+    return await get_repository().list_insights(published_only, type_id, limit)
 
 
 @router.get("/insights/{insight_id}", response_model=InsightResponse)
 async def get_insight(insight_id: str):
     """Get a single insight"""
-    db = get_supabase()
-    result = db.table("insights").select("*, insight_types(name, icon, color)").eq("id", insight_id).execute()
+    insight = await get_repository().get_insight(insight_id)
     
-    if not result.data:
+    if not insight:
         raise HTTPException(status_code=404, detail="Insight not found")
     
-    insight = result.data[0]
-    insight_type = insight.pop("insight_types", None)
-    insight["insight_type"] = insight_type
     return insight
 
 
 @router.post("/insights", response_model=InsightResponse)
 async def create_insight(data: InsightCreate):
     """Create a new insight"""
-    db = get_supabase()
-    
     insight_data = data.model_dump(exclude_none=True)
     if insight_data.get("publish_at"):
         insight_data["publish_at"] = insight_data["publish_at"].isoformat()
     if insight_data.get("expires_at"):
         insight_data["expires_at"] = insight_data["expires_at"].isoformat()
     
-    result = db.table("insights").insert(insight_data).execute()
+    insight = await get_repository().create_insight(insight_data)
     
-    if not result.data:
+    if not insight:
         raise HTTPException(status_code=400, detail="Failed to create insight")
     
-    return result.data[0]
+    return insight
 
 
 @router.patch("/insights/{insight_id}", response_model=InsightResponse)
 async def update_insight(insight_id: str, data: InsightUpdate):
     """Update an insight"""
-    db = get_supabase()
-    
     update_data = data.model_dump(exclude_none=True)
     update_data["updated_at"] = datetime.utcnow().isoformat()
     
@@ -415,21 +345,18 @@ async def update_insight(insight_id: str, data: InsightUpdate):
     if update_data.get("expires_at"):
         update_data["expires_at"] = update_data["expires_at"].isoformat()
     
-    result = db.table("insights").update(update_data).eq("id", insight_id).execute()
+    insight = await get_repository().update_insight(insight_id, update_data)
     
-    if not result.data:
+    if not insight:
         raise HTTPException(status_code=404, detail="Insight not found")
     
-    return result.data[0]
+    return insight
 
 
 @router.delete("/insights/{insight_id}")
 async def delete_insight(insight_id: str):
     """Delete an insight"""
-    db = get_supabase()
-    result = db.table("insights").delete().eq("id", insight_id).execute()
-    
-    if not result.data:
+    if not await get_repository().delete_insight(insight_id):
         raise HTTPException(status_code=404, detail="Insight not found")
     
     return {"message": "Insight deleted"}
@@ -438,14 +365,13 @@ async def delete_insight(insight_id: str):
 @router.post("/insights/{insight_id}/publish")
 async def publish_insight(insight_id: str):
     """Publish an insight"""
-    db = get_supabase()
-    result = db.table("insights").update({
+    insight = await get_repository().update_insight(insight_id, {
         "is_published": True,
         "publish_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat()
-    }).eq("id", insight_id).execute()
+    })
     
-    if not result.data:
+    if not insight:
         raise HTTPException(status_code=404, detail="Insight not found")
     
     return {"message": "Insight published"}
@@ -454,13 +380,12 @@ async def publish_insight(insight_id: str):
 @router.post("/insights/{insight_id}/unpublish")
 async def unpublish_insight(insight_id: str):
     """Unpublish an insight"""
-    db = get_supabase()
-    result = db.table("insights").update({
+    insight = await get_repository().update_insight(insight_id, {
         "is_published": False,
         "updated_at": datetime.utcnow().isoformat()
-    }).eq("id", insight_id).execute()
+    })
     
-    if not result.data:
+    if not insight:
         raise HTTPException(status_code=404, detail="Insight not found")
     
     return {"message": "Insight unpublished"}
@@ -471,31 +396,19 @@ async def unpublish_insight(insight_id: str):
 @router.get("/stats")
 async def get_admin_stats():
     """Get admin dashboard statistics"""
-    db = get_supabase()
-    
-    # Run all queries in parallel for better performance
-    async def get_crops_count():
-        return db.table("crops").select("id", count="exact").eq("is_active", True).execute()
-    
-    async def get_prices_count():
-        return db.table("crop_prices").select("id", count="exact").execute()
-    
-    async def get_insights_count():
-        return db.table("insights").select("id", count="exact").execute()
-    
-    async def get_published_count():
-        return db.table("insights").select("id", count="exact").eq("is_published", True).execute()
+    repo = get_repository()
     
+    # Run all queries in parallel on the DB worker pool
     crops, prices, insights, published = await asyncio.gather(
-        get_crops_count(),
-        get_prices_count(),
-        get_insights_count(),
-        get_published_count()
+        repo.count_rows("crops", {"is_active": True}),
+        repo.count_rows("crop_prices"),
+        repo.count_rows("insights"),
+        repo.count_rows("insights", {"is_published": True})
     )
     
     return {
-        "total_crops": crops.count,
-        "total_prices": prices.count,
-        "total_insights": insights.count,
-        "published_insights": published.count
+        "total_crops": crops,
+        "total_prices": prices,
+        "total_insights": insights,
+        "published_insights": published
     }
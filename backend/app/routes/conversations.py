@@ -1,12 +1,24 @@
 """Conversation routes"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from ..db.supabase import get_supabase
+import uuid
+from ..db.message_writer import get_message_writer
+from ..db.repository import get_repository
+from ..utils.ownership import get_ownership_cache
+from ..utils.history_cache import get_history_cache
+from ..utils.cursor import (
+    NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER, SINCE_CURSOR_HEADER, decode_cursor, encode_cursor
+)
 
 router = APIRouter(prefix="/api/conversations", tags=["conversations"])
 
+MAX_CONVERSATIONS_PAGE = 200
+MAX_MESSAGES_PAGE = 200
+# Length of the last message preview, as in Repository.conversation_summaries
+LAST_MESSAGE_PREVIEW_CHARS = 100
+
 
 class CreateConversationRequest(BaseModel):
     userId: str
@@ -26,20 +38,20 @@ class DeleteConversationRequest(BaseModel):
 async def create_conversation(request: CreateConversationRequest):
     """Create a new conversation"""
     try:
-        supabase = get_supabase()
+        repo = get_repository()
         
         # Generate default title if not provided
         title = request.title or f"Conversation - {datetime.now().strftime('%b %d, %Y')}"
         
-        response = supabase.table("conversations").insert({
-            "user_id": request.userId,
-            "title": title
-        }).execute()
+        conv = await repo.create_conversation(request.userId, title)
         
-        if not response.data:
+        if not conv:
             raise HTTPException(status_code=500, detail="Failed to create conversation")
         
-        conv = response.data[0]
+        # The first message usually follows right away
+        get_ownership_cache().remember(conv["id"], conv["user_id"])
+        get_history_cache().prime(conv["id"])
+        
         return {
             "id": conv["id"],
             "userId": conv["user_id"],
@@ -52,69 +64,154 @@ async def create_conversation(request: CreateConversationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _cursor_position(cursor: str) -> Tuple[str, str]:
+    """(created_at, id) of a conversation or message cursor, validated before it reaches a query filter"""
+    created_at, row_id = decode_cursor(cursor, 2)
+    if not isinstance(created_at, str) or not isinstance(row_id, str):
+        raise ValueError("Malformed cursor")
+    datetime.fromisoformat(created_at)
+    uuid.UUID(row_id)
+    return created_at, row_id
+
+
 @router.get("/user/{user_id}")
-async def get_user_conversations(user_id: str):
-    """Get all conversations for a user with last message preview"""
+async def get_user_conversations(
+    user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_CONVERSATIONS_PAGE),
+    cursor: Optional[str] = None
+):
+    """
+    Get conversations for a user with last message preview, newest first.
+    Without `limit` every conversation is returned; with it, the
+    X-Next-Cursor response header holds the `cursor` of the next page.
+    """
     try:
-        supabase = get_supabase()
-        
-        # Get conversations that aren't deleted
-        response = supabase.table("conversations") \
-            .select("id, title, created_at, updated_at") \
-            .eq("user_id", user_id) \
-            .is_("deleted_at", "null") \
-            .order("created_at", desc=True) \
-            .execute()
+        before = _cursor_position(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        # One query for previews and counts; one extra row tells if there is a next page
+        conversations = await get_repository().conversation_summaries(
+            user_id, limit + 1 if limit else None, before
+        )
+        if limit and len(conversations) > limit:
+            conversations = conversations[:limit]
+            last = conversations[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last["created_at"], last["id"])
         
-        conversations = response.data or []
+        writer = get_message_writer()
         result = []
-        
         for conv in conversations:
-            # Get last message for preview
-            msg_response = supabase.table("messages") \
-                .select("content, role, created_at") \
-                .eq("conversation_id", conv["id"]) \
-                .order("created_at", desc=True) \
-                .limit(1) \
-                .execute()
-            
-            # Get message count
-            count_response = supabase.table("messages") \
-                .select("id", count="exact") \
-                .eq("conversation_id", conv["id"]) \
-                .execute()
-            
-            last_message = msg_response.data[0] if msg_response.data else None
-            
+            # Messages still queued in this worker's writer come after the stored ones
+            pending = writer.pending(conv["id"])
+            newest = pending[-1] if pending else None
             result.append({
                 "id": conv["id"],
                 "title": conv["title"],
                 "createdAt": conv["created_at"],
                 "updatedAt": conv["updated_at"],
-                "lastMessage": last_message["content"][:100] if last_message else None,
-                "lastMessageRole": last_message["role"] if last_message else None,
-                "messageCount": count_response.count or 0
+                "lastMessage": newest["content"][:LAST_MESSAGE_PREVIEW_CHARS] if newest else conv["last_message"],
+                "lastMessageRole": newest["role"] if newest else conv["last_message_role"],
+                "messageCount": conv["message_count"] + len(pending)
             })
-        
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _message_cursor(message: Dict) -> str:
+    return encode_cursor(message["created_at"], message["id"])
+
+
+def _sort_key(created_at: str, message_id: str) -> Tuple[datetime, str]:
+    return datetime.fromisoformat(created_at), message_id
+
+
+def _with_pending(messages: List[Dict], pending: List[Dict]) -> List[Dict]:
+    """Stored messages plus the queued ones not stored yet, oldest first"""
+    stored = {m["id"] for m in messages}
+    unstored = [m for m in pending if m["id"] not in stored]
+    if not unstored:
+        return messages
+    return sorted(messages + unstored, key=lambda m: _sort_key(m["created_at"], m["id"]))
+
+
 @router.get("/{conversation_id}/messages")
-async def get_conversation_messages(conversation_id: str, limit: int = 50, offset: int = 0):
-    """Get messages for a conversation (paginated)"""
+async def get_conversation_messages(
+    conversation_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_MESSAGES_PAGE),
+    offset: int = Query(0, ge=0),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[str] = None,
+    latest: bool = False
+):
+    """
+    Get messages for a conversation (paginated), oldest first.
+
+    - `before` / `after`: the page older / newer than a cursor. X-Prev-Cursor
+      and X-Next-Cursor hold the cursors of the adjacent pages, if any.
+    - `latest`: the newest page, the starting point for paging with `before`
+    - `since`: delta mode for polling clients, messages newer than a cursor
+    - otherwise `offset` pages from the first message
+
+    Whenever a page reaches the newest message, X-Since-Cursor holds the
+    cursor to poll with (in delta mode it is always set).
+    """
+    cursors = [c for c in (before, after, since) if c]
+    if len(cursors) + latest + bool(offset) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of before, after, since, latest and offset")
+    cursor = cursors[0] if cursors else None
     try:
-        supabase = get_supabase()
-        
-        response = supabase.table("messages") \
-            .select("id, role, content, created_at, tokens_used") \
-            .eq("conversation_id", conversation_id) \
-            .order("created_at", desc=False) \
-            .range(offset, offset + limit - 1) \
-            .execute()
-        
-        messages = response.data or []
+        position = _cursor_position(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        repo = get_repository()
+        # Messages still queued in this worker's writer are merged into the page
+        pending = get_message_writer().pending(conversation_id)
+        bound = _sort_key(*position) if position else None
+        # One extra row tells if there is another page in the direction of travel
+        if before or latest:
+            messages = await repo.messages_before(conversation_id, limit + 1, position)
+            messages = _with_pending(messages, [
+                m for m in pending if bound is None or _sort_key(m["created_at"], m["id"]) < bound
+            ])
+            has_older, has_newer = len(messages) > limit, bool(before)
+            messages = messages[-limit:]
+        else:
+            if cursor:
+                messages = await repo.messages_after(conversation_id, limit + 1, position)
+                messages = _with_pending(messages, [
+                    m for m in pending if _sort_key(m["created_at"], m["id"]) > bound
+                ])
+            else:
+                messages = await repo.list_messages(conversation_id, limit + 1, offset)
+                if pending and len(messages) <= limit:
+                    # The page reaches the newest stored message; queued ones follow it
+                    stored_total = offset + len(messages) if messages or not offset else await repo.count_rows(
+                        "messages", {"conversation_id": conversation_id}
+                    )
+                    stored = {m["id"] for m in messages}
+                    unstored = [m for m in pending if m["id"] not in stored]
+                    skip = max(offset - stored_total, 0)
+                    messages = messages + unstored[skip:skip + limit + 1 - len(messages)]
+            has_older, has_newer = bool(cursor or offset), len(messages) > limit
+            messages = messages[:limit]
+
+        if messages and has_older:
+            response.headers[PREV_CURSOR_HEADER] = _message_cursor(messages[0])
+        if messages and has_newer:
+            response.headers[NEXT_CURSOR_HEADER] = _message_cursor(messages[-1])
+        if messages and not has_newer:
+            response.headers[SINCE_CURSOR_HEADER] = _message_cursor(messages[-1])
+        elif since and not messages:
+            response.headers[SINCE_CURSOR_HEADER] = since
+
         return [{
             "id": m["id"],
             "role": m["role"],
@@ -130,27 +227,21 @@ async def get_conversation_messages(conversation_id: str, limit: int = 50, offse
 async def update_conversation(conversation_id: str, request: UpdateConversationRequest):
     """Update conversation title"""
     try:
-        supabase = get_supabase()
+        repo = get_repository()
+        ownership = get_ownership_cache()
         
         # Verify ownership
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", conversation_id) \
-            .single() \
-            .execute()
+        owner = await ownership.lookup(conversation_id)
         
-        if not conv_check.data or conv_check.data["user_id"] != request.userId:
+        if not owner or owner.user_id != request.userId:
             raise HTTPException(status_code=403, detail="Not authorized")
         
-        response = supabase.table("conversations") \
-            .update({"title": request.title}) \
-            .eq("id", conversation_id) \
-            .execute()
+        conv = await repo.update_conversation(conversation_id, {"title": request.title})
+        ownership.invalidate(conversation_id)
         
-        if not response.data:
+        if not conv:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        conv = response.data[0]
         return {
             "id": conv["id"],
             "title": conv["title"],
@@ -166,23 +257,19 @@ async def update_conversation(conversation_id: str, request: UpdateConversationR
 async def delete_conversation(conversation_id: str, request: DeleteConversationRequest):
     """Soft delete a conversation"""
     try:
-        supabase = get_supabase()
+        repo = get_repository()
+        ownership = get_ownership_cache()
         
         # Verify ownership
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", conversation_id) \
-            .single() \
-            .execute()
+        owner = await ownership.lookup(conversation_id)
         
-        if not conv_check.data or conv_check.data["user_id"] != request.userId:
+        if not owner or owner.user_id != request.userId:
             raise HTTPException(status_code=403, detail="Not authorized")
         
         # Soft delete
-        supabase.table("conversations") \
-            .update({"deleted_at": datetime.utcnow().isoformat()}) \
-            .eq("id", conversation_id) \
-            .execute()
+        await repo.update_conversation(conversation_id, {"deleted_at": datetime.utcnow().isoformat()})
+        ownership.invalidate(conversation_id)
+        get_history_cache().invalidate(conversation_id)
         
         return {"success": True, "conversationId": conversation_id}
     except HTTPException:
@@ -6,13 +6,16 @@ Now pulls real data from Supabase database.
 
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta, date
+from itertools import chain
 import httpx
+import numpy as np
 import os
 import logging
 
-from ..db.supabase import get_supabase
+from ..db.repository import get_repository
+from ..utils.json_response import FastJSONResponse
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 logger = logging.getLogger(__name__)
@@ -122,14 +125,44 @@ DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
 # === MSP Data - Now pulled from database ===
 
+TREND_POINTS = 7
+
+
+def price_trends(histories: List[List[float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Trend matrix, current price, change and percent change of every crop at once.
+    `histories` holds each crop's prices, oldest first (at least one each).
+    Rows are left-padded with their first price to `TREND_POINTS` or the longest
+    history, so a crop's trend is the last max(TREND_POINTS, len(history)) columns.
+    """
+    lengths = np.fromiter((len(history) for history in histories), dtype=np.int64, count=len(histories))
+    width = max(TREND_POINTS, int(lengths.max()))
+    values = np.fromiter(chain.from_iterable(histories), dtype=np.float64, count=int(lengths.sum()))
+    values = values.astype(np.int64)
+    
+    # Row and column of every price, right-aligned within its row
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    rows = np.repeat(np.arange(len(histories)), lengths)
+    columns = width - np.repeat(ends, lengths) + np.arange(len(values))
+    
+    first = values[starts]
+    trends = np.repeat(first[:, None], width, axis=1)
+    trends[rows, columns] = values
+    
+    current = trends[:, -1]
+    change = current - first
+    change_percent = np.zeros(len(histories))
+    np.divide(change, first, out=change_percent, where=first != 0)
+    return trends, current, change, change_percent * 100
+
+
 async def get_db_prices(crop_ids: List[str] = None) -> List[PriceItem]:
     """Get prices from database with trend data"""
-    db = get_supabase()
+    repo = get_repository()
     
     # Get active crops
-    crops_query = db.table("crops").select("*").eq("is_active", True)
-    crops_result = crops_query.execute()
-    crops = {c["id"]: c for c in crops_result.data}
+    crops = {c["id"]: c for c in await repo.list_crops(active_only=True)}
     
     if not crops:
         return []
@@ -137,50 +170,33 @@ async def get_db_prices(crop_ids: List[str] = None) -> List[PriceItem]:
     # Filter by crop_ids if provided
     if crop_ids:
         crops = {k: v for k, v in crops.items() if k in crop_ids}
+        if not crops:
+            return []
     
-    prices = []
-    today = date.today()
-    week_ago = today - timedelta(days=7)
+    # Price history of the last 7 days of every crop, in one query
+    week_ago = date.today() - timedelta(days=7)
+    histories: Dict[str, List[float]] = {crop_id: [] for crop_id in crops}
+    for row in await repo.price_histories(list(crops), week_ago):
+        histories[row["crop_id"]].append(row["price"])
     
-    for crop_id, crop in crops.items():
-        # Get price history for last 7 days
-        price_query = db.table("crop_prices").select("price, recorded_at").eq("crop_id", crop_id).gte("recorded_at", week_ago.isoformat()).order("recorded_at").execute()
-        
-        price_history = price_query.data
-        
-        if price_history:
-            # Build trend from actual data
-            trend = [int(p["price"]) for p in price_history]
-            current_price = trend[-1] if trend else int(crop.get("msp_price") or 0)
-            
-            # Calculate change from first to last
-            if len(trend) >= 2:
-                prev_price = trend[0]
-                change = current_price - prev_price
-                change_percent = round((change / prev_price) * 100, 1) if prev_price else 0
-            else:
-                change = 0
-                change_percent = 0
-            
-            # Pad trend to 7 points if needed
-            while len(trend) < 7:
-                trend.insert(0, trend[0] if trend else current_price)
-        else:
-            # No price history - use MSP as baseline
-            msp = int(crop.get("msp_price") or 0)
-            current_price = msp
-            change = 0
-            change_percent = 0
-            trend = [msp] * 7
-        
+    # No price history - use MSP as baseline (a flat trend with no change)
+    for crop_id, history in histories.items():
+        if not history:
+            history.append(crops[crop_id].get("msp_price") or 0)
+    
+    trends, current, change, change_percent = price_trends(list(histories.values()))
+    
+    prices = []
+    for i, (crop_id, history) in enumerate(histories.items()):
+        crop = crops[crop_id]
         prices.append(PriceItem(
             id=crop_id,
             name=crop["name"],
             icon=crop.get("icon", "🌾"),
-            price=current_price,
-            change=change,
-            changePercent=change_percent,
-            trend=trend
+            price=int(current[i]),
+            change=int(change[i]),
+            changePercent=round(float(change_percent[i]), 1),
+            trend=trends[i, trends.shape[1] - max(TREND_POINTS, len(history)):].tolist()
         ))
     
     return prices
@@ -188,20 +204,18 @@ async def get_db_prices(crop_ids: List[str] = None) -> List[PriceItem]:
 
 async def get_db_insights() -> List[TimelineItem]:
     """Get published insights from database"""
-    db = get_supabase()
-    
     now = datetime.utcnow().isoformat()
     
     # Get published, non-expired insights
-    result = db.table("insights").select("*, insight_types(name, icon, color)").eq("is_published", True).lte("publish_at", now).order("priority", desc=True).order("created_at", desc=True).limit(10).execute()
+    published = await get_repository().published_insights(now, limit=10)
     
     items = []
-    for insight in result.data:
+    for insight in published:
         # Check expiry
         if insight.get("expires_at") and insight["expires_at"] < now:
             continue
         
-        insight_type = insight.get("insight_types", {})
+        insight_type = insight.get("insight_type", {})
         type_name = insight_type.get("name", "insight") if insight_type else "insight"
         
         # Calculate relative time
@@ -451,43 +465,48 @@ def get_timeline_items(weather: WeatherResponse, prices: List[PriceItem]) -> Lis
 
 # === API Endpoints ===
 
-@router.get("/weather")
+# Response models are built (and validated) by the helpers below, so the
+# endpoints return FastJSONResponse directly and skip re-validation.
+
+@router.get("/weather", response_model=WeatherResponse)
 async def get_weather(
     lat: float = Query(30.9, description="Latitude"),
     lon: float = Query(75.85, description="Longitude"),
     location: str = Query("Ludhiana, Punjab", description="Location name")
-) -> WeatherResponse:
+) -> FastJSONResponse:
     """Get weather data for a location"""
-    return await fetch_weather_data(lat, lon, location)
+    return FastJSONResponse(await fetch_weather_data(lat, lon, location))
 
 
-@router.get("/prices")
+@router.get("/prices", response_model=List[PriceItem])
 async def get_prices(
     crops: str = Query(None, description="Comma-separated crop IDs")
-) -> List[PriceItem]:
+) -> FastJSONResponse:
     """Get prices for crops from database"""
     crop_list = crops.split(",") if crops else None
-    return await get_db_prices(crop_list)
+    return FastJSONResponse(await get_db_prices(crop_list))
 
 
 @router.get("/prices/all")
 async def get_all_crops_info():
     """Get all crops information from database"""
-    db = get_supabase()
-    result = db.table("crops").select("*, crop_categories(name)").eq("is_active", True).execute()
+    crops = await get_repository().list_crops(active_only=True)
+    # Keep the embedded key this endpoint has always returned
+    for crop in crops:
+        crop["crop_categories"] = crop.pop("category", None)
     return {
-        "crops": result.data,
+        "crops": crops,
         "lastUpdated": "2024-25 Season",
         "source": "Government of India"
     }
 
 
-@router.get("")
+@router.get("", response_model=DashboardResponse)
 async def get_dashboard(
     lat: float = Query(30.9, description="Latitude"),
     lon: float = Query(75.85, description="Longitude"),
     location: str = Query("Ludhiana, Punjab", description="Location name")
-) -> DashboardResponse:
+) -> FastJSONResponse:
     """Get complete dashboard data from database"""
     
     # Fetch weather
@@ -528,23 +547,22 @@ async def get_dashboard(
     ]
     
     # Quick stats
-    db = get_supabase()
-    crops_count = db.table("crops").select("id", count="exact").eq("is_active", True).execute()
+    crops_count = await get_repository().count_rows("crops", {"is_active": True})
     
     quick_stats = {
         "hectares": 25.5,
-        "activeCrops": crops_count.count or 4,
+        "activeCrops": crops_count or 4,
         "harvestsSoon": 2
     }
     
-    return DashboardResponse(
+    return FastJSONResponse(DashboardResponse(
         weather=weather,
         prices=prices,
         statusChips=status_chips,
         timeline=timeline,
         insights=insights,
         quickStats=quick_stats
-    )
+    ))
 
 
 # === Location Search ===
@@ -3,17 +3,26 @@ KrishiGPT Routes
 New routes for the KrishiGPT system with forms and tools.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import asyncio
 import logging
 
 from ..krishi.controller import get_krishi_controller
 from ..krishi.types import FarmContext, CropStage, Season, SoilType
 from ..krishi.forms import get_form, get_all_forms
-from ..db.supabase import get_supabase
-from ..utils.sliding_window import get_sliding_window_history
+from ..krishi.tokens import count_tokens
+from ..krishi.events import DoneEvent
+from ..krishi.summarizer import get_summarizer
+from ..krishi.context_store import get_context_store
+from ..db.message_writer import get_message_writer
+from ..utils.ownership import verify_conversation_owner
+from ..utils.sliding_window import get_sliding_window_history, remember_message, with_message
+from ..utils.timing import StageTimer
+from ..utils.admission import admit_llm_request, Priority
+from ..utils.sse import wants_full_text, SSE_HEADERS
 
 router = APIRouter(prefix="/api/krishi", tags=["krishi"])
 logger = logging.getLogger(__name__)
@@ -22,7 +31,10 @@ logger = logging.getLogger(__name__)
 # === Request Models ===
 
 class FarmContextRequest(BaseModel):
-    """Farm context from frontend"""
+    """
+    Farm context from frontend. On a conversation only the fields sent are
+    applied to its stored context; a field sent as null clears it.
+    """
     location: Optional[str] = None
     crop: Optional[str] = None
     crop_stage: Optional[str] = None
@@ -57,56 +69,46 @@ class UpdateContextRequest(BaseModel):
 
 # === Helper Functions ===
 
-def request_to_farm_context(req: Optional[FarmContextRequest]) -> FarmContext:
-    """Convert request model to FarmContext"""
+_ENUM_FIELDS = {"crop_stage": CropStage, "season": Season, "soil_type": SoilType}
+
+
+def request_to_context_changes(req: Optional[FarmContextRequest]) -> Dict[str, Any]:
+    """
+    FarmContext fields set in the request, with enums parsed.
+    Empty values map to None (clear the field); unknown enum values are ignored.
+    """
     if not req:
-        return FarmContext()
-    
-    context_dict = {}
+        return {}
     
-    if req.location:
-        context_dict["location"] = req.location
-    if req.crop:
-        context_dict["crop"] = req.crop
-    if req.crop_stage:
-        try:
-            context_dict["crop_stage"] = CropStage(req.crop_stage)
-        except ValueError:
-            pass
-    if req.season:
-        try:
-            context_dict["season"] = Season(req.season)
-        except ValueError:
-            pass
-    if req.soil_type:
-        try:
-            context_dict["soil_type"] = SoilType(req.soil_type)
-        except ValueError:
-            pass
-    if req.land_size_acres:
-        context_dict["land_size_acres"] = req.land_size_acres
-    if req.irrigation_method:
-        context_dict["irrigation_method"] = req.irrigation_method
+    changes = {}
+    for field, value in req.model_dump(exclude_unset=True).items():
+        if not value:
+            changes[field] = None
+        elif field in _ENUM_FIELDS:
+            try:
+                changes[field] = _ENUM_FIELDS[field](value)
+            except ValueError:
+                pass
+        else:
+            changes[field] = value
     
-    return FarmContext(**context_dict)
+    return changes
+
+
+def request_to_farm_context(req: Optional[FarmContextRequest]) -> FarmContext:
+    """Convert request model to FarmContext"""
+    changes = request_to_context_changes(req)
+    return FarmContext(**{field: value for field, value in changes.items() if value is not None})
 
 
 async def save_message(conversation_id: str, role: str, content: str, tokens_used: int = None, metadata: Dict = None):
-    """Save a message to the database"""
-    supabase = get_supabase()
-    
-    insert_data = {
-        "conversation_id": conversation_id,
-        "role": role,
-        "content": content,
-        "tokens_used": tokens_used
-    }
-    
+    """Queue a message for the background writer and return its row (id, created_at) immediately"""
     # Store metadata as JSON if provided (for form data, confidence, etc.)
     # Note: This requires a metadata column in the messages table
     
-    response = supabase.table("messages").insert(insert_data).execute()
-    return response.data[0] if response.data else None
+    row = await get_message_writer().write(conversation_id, role, content, tokens_used)
+    remember_message(row)
+    return row
 
 
 # === Routes ===
@@ -117,44 +119,56 @@ async def send_krishi_message(request: KrishiMessageRequest):
     Send a message to KrishiGPT and get a response.
     Handles context validation and form requests.
     """
+    timer = StageTimer("krishi.send")
+    permit = None
+    
     try:
-        supabase = get_supabase()
         controller = get_krishi_controller()
+        summarizer = get_summarizer()
         
-        # Verify conversation exists
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", request.conversationId) \
-            .is_("deleted_at", "null") \
-            .single() \
-            .execute()
+        # Verify conversation exists (ownership is cached per worker)
+        await timer.measure("ownership", verify_conversation_owner(request.conversationId, request.userId))
         
-        if not conv_check.data:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+        # Fetch history, summary and the stored farm context (merged with any
+        # fields the request changes) concurrently
+        history, summary, stored = await asyncio.gather(
+            timer.measure("history", get_sliding_window_history(request.conversationId, limit=30)),
+            timer.measure("summary", summarizer.get(request.conversationId)),
+            timer.measure("context", get_context_store().merge(
+                request.conversationId, request_to_context_changes(request.context)
+            ))
+        )
+        summary_text = summary.text if summary else None
         
-        if conv_check.data["user_id"] != request.userId:
-            raise HTTPException(status_code=403, detail="Not authorized")
+        # Cache hits need no LLM call, so they skip admission and are served even when shedding
+        lookup = controller.lookup_answer(
+            request.userMessage, stored.context, history, request.formData, summary_text
+        )
+        if lookup.answer is None:
+            # Shed load with a fast 503 before the user message is stored
+            permit = await timer.measure("admission", admit_llm_request(Priority.STANDARD))
         
-        # Save user message
-        user_msg = await save_message(
+        # Queued for the background writer; merged into the window locally
+        user_msg = await timer.measure("save_user_message", save_message(
             request.conversationId,
             "user",
-            request.userMessage
-        )
-        
-        # Get conversation history
-        history = await get_sliding_window_history(request.conversationId, limit=30)
-        
-        # Convert context
-        farm_context = request_to_farm_context(request.context)
+            request.userMessage,
+            count_tokens(request.userMessage)
+        ))
+        history = with_message(history, user_msg, limit=30)
+        # Turns already folded into the summary are sent as the summary
+        history = summarizer.unsummarized(request.conversationId, history, summary)
+        timer.mark("pre_generation")
         
         # Process message
-        result = await controller.process_message(
+        result = await timer.measure("generation", controller.process_message(
             request.userMessage,
-            farm_context,
+            stored.context,
             history,
-            request.formData
-        )
+            request.formData,
+            summary_text,
+            lookup=lookup
+        ))
         
         # Handle different response types
         if result["type"] == "form_request":
@@ -172,7 +186,7 @@ async def send_krishi_message(request: KrishiMessageRequest):
                 request.conversationId,
                 "assistant",
                 result["content"],
-                len(result["content"].split())  # Rough token estimate
+                count_tokens(result["content"])
             )
             
             return {
@@ -198,76 +212,86 @@ async def send_krishi_message(request: KrishiMessageRequest):
     except Exception as e:
         logger.error(f"Error in send_krishi_message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if permit:
+            permit.release()
+        timer.mark("total")
 
 
 @router.post("/send/stream")
-async def send_krishi_message_stream(request: KrishiMessageRequest):
+async def send_krishi_message_stream(
+    request: KrishiMessageRequest,
+    include_full_text: bool = Depends(wants_full_text)
+):
     """
     Send a message to KrishiGPT with streaming response.
     """
+    timer = StageTimer("krishi.send_stream")
+    permit = None
+    
     try:
-        supabase = get_supabase()
         controller = get_krishi_controller()
+        summarizer = get_summarizer()
         
-        # Verify conversation
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", request.conversationId) \
-            .is_("deleted_at", "null") \
-            .single() \
-            .execute()
-        
-        if not conv_check.data:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+        # Verify conversation (ownership is cached per worker)
+        await timer.measure("ownership", verify_conversation_owner(request.conversationId, request.userId))
         
-        if conv_check.data["user_id"] != request.userId:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        # Save user message
-        await save_message(request.conversationId, "user", request.userMessage)
+        # Fetch history, summary and the stored farm context (merged with the
+        # request's changes) concurrently
+        history, summary, stored = await asyncio.gather(
+            timer.measure("history", get_sliding_window_history(request.conversationId, limit=30)),
+            timer.measure("summary", summarizer.get(request.conversationId)),
+            timer.measure("context", get_context_store().merge(
+                request.conversationId, request_to_context_changes(request.context)
+            ))
+        )
+        summary_text = summary.text if summary else None
         
-        # Get history
-        history = await get_sliding_window_history(request.conversationId, limit=30)
+        # Cached answers are replayed without an admission permit, even when shedding
+        lookup = controller.lookup_answer(
+            request.userMessage, stored.context, history, request.formData, summary_text
+        )
+        if lookup.answer is None:
+            # Shed load with a fast 503 before the user message is stored
+            permit = await timer.measure("admission", admit_llm_request(Priority.INTERACTIVE))
         
-        # Convert context
-        farm_context = request_to_farm_context(request.context)
+        user_msg = await timer.measure("save_user_message", save_message(
+            request.conversationId, "user", request.userMessage, count_tokens(request.userMessage)
+        ))
+        history = with_message(history, user_msg, limit=30)
+        history = summarizer.unsummarized(request.conversationId, history, summary)
+        timer.mark("pre_generation")
         
         async def stream_and_save():
-            accumulated = ""
-            async for chunk_data in controller.process_message_stream(
+            # Events are encoded once here; the answer text is read straight from DoneEvent
+            async for event in controller.process_message_stream(
                 request.userMessage,
-                farm_context,
+                stored.context,
                 history,
-                request.formData
+                request.formData,
+                summary_text,
+                lookup=lookup
             ):
-                yield chunk_data
+                timer.mark("first_event")
+                yield event.to_sse(include_full_text)
                 
-                # Parse to accumulate for saving
-                if chunk_data.startswith("data: "):
+                if isinstance(event, DoneEvent) and event.text:
                     try:
-                        import json
-                        data = json.loads(chunk_data[6:].strip())
-                        if data.get("chunk"):
-                            accumulated += data["chunk"]
-                        if data.get("done") and accumulated and data.get("type") != "form_request":
-                            # Save AI response
-                            await save_message(
-                                request.conversationId,
-                                "assistant",
-                                accumulated,
-                                len(accumulated.split())
-                            )
-                    except Exception:
-                        pass
+                        await save_message(
+                            request.conversationId,
+                            "assistant",
+                            event.text,
+                            count_tokens(event.text)
+                        )
+                    except Exception as e:
+                        logger.error(f"Error saving streamed response: {e}")
+            timer.mark("total")
         
+        events = stream_and_save()
         return StreamingResponse(
-            stream_and_save(),
+            permit.release_after(events) if permit else events,
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
+            headers=SSE_HEADERS
         )
         
     except HTTPException:
@@ -275,6 +299,9 @@ async def send_krishi_message_stream(request: KrishiMessageRequest):
     except Exception as e:
         logger.error(f"Error in stream: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if permit:
+            permit.release_unless_streaming()
 
 
 @router.get("/forms")
@@ -323,34 +350,21 @@ async def get_available_tools():
 async def update_conversation_context(request: UpdateContextRequest):
     """
     Update the context for a conversation.
-    This stores context in the conversation metadata.
+    The fields sent are merged into its stored context, which later
+    messages use without resending it.
     """
     try:
-        supabase = get_supabase()
-        
-        # Verify conversation
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", request.conversationId) \
-            .is_("deleted_at", "null") \
-            .single() \
-            .execute()
+        # Verify conversation (ownership is cached per worker)
+        await verify_conversation_owner(request.conversationId, request.userId)
         
-        if not conv_check.data:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        if conv_check.data["user_id"] != request.userId:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        # Convert and validate context
-        farm_context = request_to_farm_context(request.context)
-        
-        # TODO: Store context in conversation metadata
-        # This requires adding a metadata/context column to conversations table
+        stored = await get_context_store().merge(
+            request.conversationId, request_to_context_changes(request.context)
+        )
         
         return {
             "success": True,
-            "context": farm_context.model_dump()
+            "context": stored.context.model_dump(),
+            "version": stored.version
         }
         
     except HTTPException:
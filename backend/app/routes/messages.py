@@ -1,24 +1,25 @@
 """Message routes with AI integration"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import google.generativeai as genai
-import os
-import json
 import asyncio
 import logging
-from ..db.supabase import get_supabase
-from ..utils.sliding_window import get_sliding_window_history
+from ..db.message_writer import get_message_writer
+from ..utils.ownership import verify_conversation_owner
+from ..utils.sliding_window import get_sliding_window_history, remember_message, with_message
+from ..utils.timing import StageTimer
+from ..krishi.llm import get_llm_gateway
+from ..krishi.tokens import count_tokens, fit_history
+from ..utils.admission import admit_llm_request, Priority
+from ..utils.sse import coalesce_chunks, wants_full_text, StreamAccumulator, SSE_HEADERS
+from ..krishi.events import ChunkEvent, DoneEvent, ErrorEvent
+from ..krishi.summarizer import get_summarizer
 
 router = APIRouter(prefix="/api/messages", tags=["messages"])
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini
-api_key = os.getenv("GEMINI_API_KEY")
-model = None
-if api_key:
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+# Shared Gemini gateway
+llm = get_llm_gateway()
 
 
 class SendMessageRequest(BaseModel):
@@ -47,125 +48,105 @@ Formatting rules:
 
 If the question is not related to farming, politely redirect to farming topics."""
 
-
-async def save_message(conversation_id: str, role: str, content: str, tokens_used: int = None):
-    """Save a message to the database"""
-    supabase = get_supabase()
-    response = supabase.table("messages").insert({
-        "conversation_id": conversation_id,
-        "role": role,
-        "content": content,
-        "tokens_used": tokens_used
-    }).execute()
-    return response.data[0] if response.data else None
-
-
-async def generate_ai_response_stream(user_message: str, conversation_history: list):
-    """Generate streaming response from Gemini with conversation history"""
-    if not model:
-        error_data = json.dumps({"error": "AI not configured"}) + "\n"
-        yield f"data: {error_data}\n\n"
-        return
-    
-    try:
-        # Build conversation context
-        context_messages = []
-        for msg in conversation_history:
-            role_label = "User" if msg["role"] == "user" else "Assistant"
-            context_messages.append(f"{role_label}: {msg['content']}")
-        
-        context = "\n\n".join(context_messages) if context_messages else ""
-        
-        full_prompt = f"""{SYSTEM_PROMPT}
-
-Previous conversation:
+# Per-request part of the prompt; SYSTEM_PROMPT is sent as the system instruction
+PROMPT_TEMPLATE = """Previous conversation:
 {context}
 
 User: {user_message}
 
 Please provide a helpful response:"""
+
+SUMMARY_TEMPLATE = "Summary of the earlier conversation:\n{summary}"
+
+
+def build_prompt(user_message: str, conversation_history: list, summary: str = None) -> str:
+    """Prompt with the summary of older turns, then the newest messages up to the history token budget"""
+    context_messages = [SUMMARY_TEMPLATE.format(summary=summary)] if summary else []
+    for msg in fit_history(conversation_history):
+        role_label = "User" if msg["role"] == "user" else "Assistant"
+        context_messages.append(f"{role_label}: {msg['content']}")
+    
+    context = "\n\n".join(context_messages) if context_messages else ""
+    return PROMPT_TEMPLATE.format(context=context, user_message=user_message)
+
+
+async def save_message(conversation_id: str, role: str, content: str, tokens_used: int = None):
+    """Queue a message for the background writer and return its row (id, created_at) immediately"""
+    row = await get_message_writer().write(conversation_id, role, content, tokens_used)
+    remember_message(row)
+    return row
+
+
+async def generate_ai_response_stream(user_message: str, conversation_history: list, summary: str = None):
+    """Generate streaming response events from Gemini with conversation history"""
+    if not llm.is_configured:
+        yield ErrorEvent("AI not configured", done=False)
+        return
+    
+    try:
+        prompt = build_prompt(user_message, conversation_history, summary)
         
-        response = model.generate_content(full_prompt, stream=True)
-        
-        accumulated_text = ""
-        for chunk in response:
-            if chunk.text:
-                accumulated_text += chunk.text
-                data = json.dumps({"chunk": chunk.text, "done": False}) + "\n"
-                yield f"data: {data}\n\n"
-                await asyncio.sleep(0.01)
+        accumulated = StreamAccumulator()
+        async for text in coalesce_chunks(llm.stream(prompt, system_instruction=SYSTEM_PROMPT)):
+            accumulated.append(text)
+            yield ChunkEvent(text)
         
-        final_data = json.dumps({"chunk": "", "done": True, "full_text": accumulated_text}) + "\n"
-        yield f"data: {final_data}\n\n"
+        yield DoneEvent(accumulated.text)
         
     except Exception as e:
         logger.error(f"Error streaming response: {e}")
-        error_data = json.dumps({"error": str(e), "done": True}) + "\n"
-        yield f"data: {error_data}\n\n"
+        yield ErrorEvent(str(e))
 
 
 @router.post("/send")
 async def send_message(request: SendMessageRequest):
     """Send a message and get AI response (non-streaming for DB storage)"""
+    timer = StageTimer("messages.send")
+    
+    # Shed load with a fast 503 before touching the database
+    permit = await timer.measure("admission", admit_llm_request(Priority.STANDARD))
+    
     try:
-        supabase = get_supabase()
-        
-        # Verify conversation exists and belongs to user
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", request.conversationId) \
-            .is_("deleted_at", "null") \
-            .single() \
-            .execute()
-        
-        if not conv_check.data:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        if conv_check.data["user_id"] != request.userId:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        # 1. Save user message immediately
-        user_msg = await save_message(
-            request.conversationId, 
-            "user", 
-            request.userMessage
+        summarizer = get_summarizer()
+        
+        # Verify conversation exists and belongs to user (ownership is cached per worker)
+        await timer.measure("ownership", verify_conversation_owner(request.conversationId, request.userId))
+        
+        # 1-2. Save user message and get conversation history (sliding window) and the
+        # summary of older turns concurrently; the message is merged into the window
+        # locally in case the fetch did not see it
+        user_msg, history, summary = await asyncio.gather(
+            timer.measure("save_user_message", save_message(
+                request.conversationId, 
+                "user", 
+                request.userMessage,
+                count_tokens(request.userMessage)
+            )),
+            timer.measure("history", get_sliding_window_history(request.conversationId, limit=30)),
+            timer.measure("summary", summarizer.get(request.conversationId))
         )
-        
-        # 2. Get conversation history (sliding window)
-        history = await get_sliding_window_history(request.conversationId, limit=30)
+        history = with_message(history, user_msg, limit=30)
+        history = summarizer.unsummarized(request.conversationId, history, summary)
         
         # 3. Generate AI response
-        if not model:
+        if not llm.is_configured:
             raise HTTPException(status_code=503, detail="AI not configured")
         
-        context_messages = []
-        for msg in history:
-            role_label = "User" if msg["role"] == "user" else "Assistant"
-            context_messages.append(f"{role_label}: {msg['content']}")
-        
-        context = "\n\n".join(context_messages) if context_messages else ""
+        prompt = build_prompt(request.userMessage, history, summary.text if summary else None)
+        timer.mark("pre_generation")
         
-        full_prompt = f"""{SYSTEM_PROMPT}
-
-Previous conversation:
-{context}
-
-User: {request.userMessage}
-
-Please provide a helpful response:"""
+        ai_content = await timer.measure("generation", llm.generate(prompt, system_instruction=SYSTEM_PROMPT))
         
-        response = model.generate_content(full_prompt)
-        ai_content = response.text
-        
-        # Estimate tokens (rough approximation)
-        tokens_used = len(full_prompt.split()) + len(ai_content.split())
+        # The column caches per-message counts; the response reports the whole call
+        ai_tokens = count_tokens(ai_content)
+        tokens_used = count_tokens(SYSTEM_PROMPT) + count_tokens(prompt) + ai_tokens
         
         # 4. Save AI response
         ai_msg = await save_message(
             request.conversationId,
             "assistant",
             ai_content,
-            tokens_used
+            ai_tokens
         )
         
         return {
@@ -181,63 +162,65 @@ Please provide a helpful response:"""
     except Exception as e:
         logger.error(f"Error sending message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        permit.release()
+        timer.mark("total")
 
 
 @router.post("/send/stream")
-async def send_message_stream(request: SendMessageRequest):
+async def send_message_stream(
+    request: SendMessageRequest,
+    include_full_text: bool = Depends(wants_full_text)
+):
     """Send a message and get streaming AI response"""
+    timer = StageTimer("messages.send_stream")
+    
+    # Shed load with a fast 503 before touching the database
+    permit = await timer.measure("admission", admit_llm_request(Priority.INTERACTIVE))
+    
     try:
-        supabase = get_supabase()
-        
-        # Verify conversation
-        conv_check = supabase.table("conversations") \
-            .select("user_id") \
-            .eq("id", request.conversationId) \
-            .is_("deleted_at", "null") \
-            .single() \
-            .execute()
-        
-        if not conv_check.data:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        if conv_check.data["user_id"] != request.userId:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        # Save user message
-        await save_message(request.conversationId, "user", request.userMessage)
-        
-        # Get history
-        history = await get_sliding_window_history(request.conversationId, limit=30)
+        summarizer = get_summarizer()
+        
+        # Verify conversation (ownership is cached per worker)
+        await timer.measure("ownership", verify_conversation_owner(request.conversationId, request.userId))
+        
+        # Save user message and get history and summary concurrently, then merge locally
+        user_msg, history, summary = await asyncio.gather(
+            timer.measure("save_user_message", save_message(
+                request.conversationId, "user", request.userMessage, count_tokens(request.userMessage)
+            )),
+            timer.measure("history", get_sliding_window_history(request.conversationId, limit=30)),
+            timer.measure("summary", summarizer.get(request.conversationId))
+        )
+        history = with_message(history, user_msg, limit=30)
+        history = summarizer.unsummarized(request.conversationId, history, summary)
+        timer.mark("pre_generation")
         
         async def stream_and_save():
-            accumulated = ""
-            async for chunk_data in generate_ai_response_stream(request.userMessage, history):
-                yield chunk_data
-                # Parse to accumulate
-                if chunk_data.startswith("data: "):
+            # Events are encoded once here; the answer text is read straight from DoneEvent
+            async for event in generate_ai_response_stream(
+                request.userMessage, history, summary.text if summary else None
+            ):
+                timer.mark("first_event")
+                yield event.to_sse(include_full_text)
+                
+                if isinstance(event, DoneEvent) and event.text:
+                    # Save AI response after streaming completes
                     try:
-                        data = json.loads(chunk_data[6:].strip())
-                        if data.get("chunk"):
-                            accumulated += data["chunk"]
-                        if data.get("done") and accumulated:
-                            # Save AI response after streaming completes
-                            await save_message(
-                                request.conversationId,
-                                "assistant",
-                                accumulated,
-                                len(accumulated.split())
-                            )
-                    except Exception:
-                        pass
+                        await save_message(
+                            request.conversationId,
+                            "assistant",
+                            event.text,
+                            count_tokens(event.text)
+                        )
+                    except Exception as e:
+                        logger.error(f"Error saving streamed response: {e}")
+            timer.mark("total")
         
         return StreamingResponse(
-            stream_and_save(),
+            permit.release_after(stream_and_save()),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
+            headers=SSE_HEADERS
         )
         
     except HTTPException:
@@ -245,3 +228,5 @@ async def send_message_stream(request: SendMessageRequest):
     except Exception as e:
         logger.error(f"Error in stream: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        permit.release_unless_streaming()
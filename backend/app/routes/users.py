@@ -2,7 +2,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
-from ..db.supabase import get_supabase
+from ..db.repository import get_repository
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -19,21 +19,18 @@ class CreateUserRequest(BaseModel):
 async def create_user(request: CreateUserRequest):
     """Create a new user"""
     try:
-        supabase = get_supabase()
-        
         # In production, hash the password!
-        response = supabase.table("users").insert({
+        user = await get_repository().create_user({
             "email": request.email,
             "username": request.username,
             "password_hash": request.password,  # Should be hashed!
             "location": request.location,
             "phone": request.phone
-        }).execute()
+        })
         
-        if not response.data:
+        if not user:
             raise HTTPException(status_code=500, detail="Failed to create user")
         
-        user = response.data[0]
         return {
             "id": user["id"],
             "email": user["email"],
@@ -50,19 +47,12 @@ async def create_user(request: CreateUserRequest):
 async def get_user(user_id: str):
     """Get user by ID"""
     try:
-        supabase = get_supabase()
-        
-        response = supabase.table("users") \
-            .select("id, email, username, location, phone, created_at") \
-            .eq("id", user_id) \
-            .is_("deleted_at", "null") \
-            .single() \
-            .execute()
+        user = await get_repository().get_user(user_id)
         
-        if not response.data:
+        if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return response.data
+        return user
     except HTTPException:
         raise
     except Exception as e:
@@ -73,27 +63,22 @@ async def get_user(user_id: str):
 async def setup_test_user():
     """Create a test user for development"""
     try:
-        supabase = get_supabase()
+        repo = get_repository()
         
         test_user_id = "00000000-0000-0000-0000-000000000001"
         
         # Check if test user exists
-        existing = supabase.table("users") \
-            .select("id") \
-            .eq("id", test_user_id) \
-            .execute()
-        
-        if existing.data:
+        if await repo.count_rows("users", {"id": test_user_id}):
             return {"message": "Test user already exists", "userId": test_user_id}
         
         # Create test user
-        supabase.table("users").insert({
+        await repo.create_user({
             "id": test_user_id,
             "email": "test@krishiai.com",
             "username": "testfarmer",
             "password_hash": "test123",
             "location": "India"
-        }).execute()
+        })
         
         return {"message": "Test user created", "userId": test_user_id}
     except Exception as e:
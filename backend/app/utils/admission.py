@@ -0,0 +1,266 @@
+"""
+Admission Control for AI Endpoints
+Adaptive (AIMD) concurrency limit with a bounded, prioritised wait queue.
+Requests that cannot be admitted in time get a fast 503 with Retry-After
+instead of piling up inside Gemini.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+import weakref
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ADMISSION_INITIAL_LIMIT = float(os.getenv("ADMISSION_INITIAL_LIMIT", "8"))
+ADMISSION_MIN_LIMIT = float(os.getenv("ADMISSION_MIN_LIMIT", "1"))
+ADMISSION_MAX_LIMIT = float(os.getenv("ADMISSION_MAX_LIMIT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+# Latency above this (time to first token for streams) counts as congestion
+ADMISSION_TARGET_LATENCY_SECONDS = float(os.getenv("ADMISSION_TARGET_LATENCY_SECONDS", "15"))
+ADMISSION_DECREASE_FACTOR = 0.7
+ADMISSION_DECREASE_COOLDOWN_SECONDS = 1.0
+ADMISSION_RETRY_AFTER_SECONDS = 5
+
+
+class Priority(IntEnum):
+    """Lower value is admitted first"""
+    INTERACTIVE = 0  # Streaming chat
+    STANDARD = 1     # Non-streaming chat
+    BATCH = 2        # Background work (summaries, offline jobs)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+    def __init__(self, reason: str, retry_after: int = ADMISSION_RETRY_AFTER_SECONDS):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(reason)
+
+
+class Permit:
+    """A granted slot. Release exactly once; extra calls are ignored."""
+
+    def __init__(self, limiter: "AdaptiveLimiter", priority: Priority):
+        self._limiter = limiter
+        self.priority = priority
+        self._released = False
+        self._streaming = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release()
+
+    def release_unless_streaming(self) -> None:
+        """Release now unless ownership was handed to a response stream"""
+        if not self._streaming:
+            self.release()
+
+    def release_after(self, stream: AsyncIterator[T]) -> AsyncIterator[T]:
+        """Hold the permit until `stream` finishes, fails or is abandoned"""
+        self._streaming = True
+
+        async def guarded() -> AsyncIterator[T]:
+            try:
+                async for item in stream:
+                    yield item
+            finally:
+                self.release()
+
+        wrapped = guarded()
+        # Safety net: a stream the server never started still frees its slot
+        weakref.finalize(wrapped, self.release)
+        return wrapped
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter.
+    Each healthy LLM outcome raises the limit by 1/limit; failures or slow
+    responses cut it by ADMISSION_DECREASE_FACTOR (at most once per cooldown).
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = ADMISSION_INITIAL_LIMIT,
+        min_limit: float = ADMISSION_MIN_LIMIT,
+        max_limit: float = ADMISSION_MAX_LIMIT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        target_latency: float = ADMISSION_TARGET_LATENCY_SECONDS
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.in_flight = 0
+        # Heap of (priority, sequence, future)
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        self._stats = {
+            "admitted_total": 0,
+            "queued_total": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "evicted_by_priority": 0,
+            "limit_increases": 0,
+            "limit_decreases": 0,
+        }
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self, priority: Priority = Priority.STANDARD, timeout: Optional[float] = None) -> Permit:
+        """Admit immediately, wait in the priority queue, or raise AdmissionRejected"""
+        if self._has_capacity() and not self._waiters:
+            return self._grant(priority)
+
+        if len(self._waiters) >= self.max_queue and not self._evict_lower_than(priority):
+            self._stats["rejected_queue_full"] += 1
+            raise AdmissionRejected("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._stats["queued_total"] += 1
+
+        try:
+            await asyncio.wait_for(future, timeout or self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected_timeout"] += 1
+            raise AdmissionRejected("queue_timeout")
+        except AdmissionRejected:
+            raise
+        except asyncio.CancelledError:
+            # Slot may have been granted in the same tick the caller went away
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release()
+            raise
+        finally:
+            self._drop_waiter(future)
+
+        return self._grant(priority, counted=True)
+
+    def _grant(self, priority: Priority, counted: bool = False) -> Permit:
+        if not counted:
+            self.in_flight += 1
+        self._stats["admitted_total"] += 1
+        return Permit(self, priority)
+
+    def _evict_lower_than(self, priority: Priority) -> bool:
+        """Make room for a higher-priority request by shedding the lowest-priority waiter"""
+        if not self._waiters:
+            return False
+        worst = max(self._waiters)
+        if worst[0] <= int(priority):
+            return False
+        self._waiters.remove(worst)
+        heapq.heapify(self._waiters)
+        if not worst[2].done():
+            worst[2].set_exception(AdmissionRejected("evicted"))
+        self._stats["evicted_by_priority"] += 1
+        return True
+
+    def _drop_waiter(self, future: asyncio.Future) -> None:
+        for index, entry in enumerate(self._waiters):
+            if entry[2] is future:
+                self._waiters.pop(index)
+                heapq.heapify(self._waiters)
+                return
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        # Waiters that are granted a slot count towards in_flight immediately
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def record_outcome(self, success: bool, latency: float) -> None:
+        """Feed an LLM call outcome into the AIMD controller"""
+        if success and latency <= self.target_latency:
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self._stats["limit_increases"] += 1
+                self._wake_waiters()
+            return
+
+        now = time.monotonic()
+        if now - self._last_decrease < ADMISSION_DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        new_limit = max(self.min_limit, self.limit * ADMISSION_DECREASE_FACTOR)
+        if new_limit < self.limit:
+            logger.warning(
+                f"LLM congestion ({'slow' if success else 'error'}, {latency:.1f}s): "
+                f"admission limit {self.limit:.1f} -> {new_limit:.1f}"
+            )
+            self.limit = new_limit
+            self._stats["limit_decreases"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        by_priority = {p.name.lower(): 0 for p in Priority}
+        for priority, _, _ in self._waiters:
+            by_priority[Priority(priority).name.lower()] += 1
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "queue_depth_by_priority": by_priority,
+            "max_queue": self.max_queue,
+            **self._stats,
+        }
+
+
+# Global limiter instance
+_limiter: Optional[AdaptiveLimiter] = None
+
+
+def get_admission_limiter() -> AdaptiveLimiter:
+    """Get the global admission limiter instance"""
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter()
+        register_metrics("admission", _limiter.metrics)
+    return _limiter
+
+
+async def admit_llm_request(priority: Priority = Priority.STANDARD) -> Permit:
+    """
+    Admit an AI request or raise HTTPException 503.
+
+    Raises:
+        HTTPException: 503 Service Unavailable with Retry-After when shed
+    """
+    try:
+        return await get_admission_limiter().acquire(priority)
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding {priority.name.lower()} AI request: {e.reason}")
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "code": "SERVER_BUSY",
+                "message": "KrishiGPT is busy right now. Please try again shortly.",
+                "retry_after": e.retry_after
+            },
+            headers={"Retry-After": str(e.retry_after)}
+        )
@@ -0,0 +1,111 @@
+"""
+Aho-Corasick Automaton
+Finds every occurrence of a fixed set of patterns in one linear pass.
+Matching is case-insensitive; the automaton is compiled once and is read-only afterwards.
+"""
+
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def fold_case(text: str) -> str:
+    """Lowercase `text` without changing its length, so match offsets stay valid"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. 'İ') expand when lowercased; keep those as-is
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher.
+    Node 0 is the root; each node has goto edges, a failure link and the
+    lengths of the patterns that end there (including via failure links).
+    Failure links are folded into a transition table at compile time, so
+    scanning is a single dict lookup per character.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted({fold_case(p) for p in patterns if p})
+        self.max_length = max((len(p) for p in self.patterns), default=0)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for pattern in self.patterns:
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] = (len(pattern),)
+
+        self._build_failure_links()
+        self._delta = self._build_transitions()
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _build_transitions(self) -> List[Dict[str, int]]:
+        """Resolve every (node, char) to its next node; missing entries mean the root"""
+        alphabet = {char for pattern in self.patterns for char in pattern}
+        delta: List[Dict[str, int]] = []
+        for node in range(len(self._goto)):
+            row = {}
+            for char in alphabet:
+                state = node
+                while state and char not in self._goto[state]:
+                    state = self._fail[state]
+                target = self._goto[state].get(char, 0)
+                if target:
+                    row[char] = target
+            delta.append(row)
+        return delta
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) for every pattern occurrence, ordered by end offset"""
+        delta, out = self._delta, self._out
+        node = 0
+        for index, char in enumerate(fold_case(text)):
+            node = delta[node].get(char, 0)
+            if out[node]:
+                end = index + 1
+                for length in out[node]:
+                    yield end - length, end
+
+    def find_leftmost_longest(
+        self,
+        text: str,
+        accept: Optional[Callable[[int, int], bool]] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Non-overlapping matches, preferring the earliest start and then the longest pattern.
+        Matches rejected by `accept(start, end)` are dropped first, so they never shadow others.
+        """
+        matches = self.iter_matches(text)
+        if accept is not None:
+            matches = (m for m in matches if accept(*m))
+        candidates = sorted(matches, key=lambda m: (m[0], -m[1]))
+        selected: List[Tuple[int, int]] = []
+        covered = 0
+        for start, end in candidates:
+            if start >= covered:
+                selected.append((start, end))
+                covered = end
+        return selected
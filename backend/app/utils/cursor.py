@@ -0,0 +1,40 @@
+"""
+Opaque Pagination Cursors
+Keyset positions (e.g. the created_at and id of the last row on a page)
+encoded as URL-safe base64 JSON, so clients pass them back unchanged
+without depending on their shape.
+"""
+
+import base64
+import json
+from typing import Any, List
+
+# Response headers carrying the cursors of the adjacent pages (absent at either end)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+# Position of the newest item returned, for clients polling for new items
+SINCE_CURSOR_HEADER = "X-Since-Cursor"
+
+CURSOR_HEADERS = [NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER, SINCE_CURSOR_HEADER]
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Values of a cursor made by encode_cursor().
+
+    Raises:
+        ValueError: if the cursor is malformed or does not hold `size` values
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Malformed cursor")
+    return values
@@ -0,0 +1,150 @@
+"""
+Conversation History Cache
+Per-conversation ring buffers of the most recent messages, kept write-through
+by save_message so an active chat reads its history without a DB round trip.
+Bounded by conversation count and total bytes; idle conversations are
+evicted least-recently-used first. Each worker keeps its own copy, so
+turns of one conversation are expected to reach the same worker (a single
+worker or sticky routing); HISTORY_CACHE_MAX_CONVERSATIONS=0 disables it.
+"""
+
+import os
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional
+
+from .metrics import register_metrics
+
+HISTORY_CACHE_WINDOW = int(os.getenv("HISTORY_CACHE_WINDOW", "30"))
+HISTORY_CACHE_MAX_CONVERSATIONS = int(os.getenv("HISTORY_CACHE_MAX_CONVERSATIONS", "5000"))
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Rough per-message cost of the dict and its other fields
+_MESSAGE_OVERHEAD_BYTES = 200
+
+
+def _sizeof(message: Dict) -> int:
+    return len(message["content"].encode("utf-8")) + _MESSAGE_OVERHEAD_BYTES
+
+
+class HistoryCache:
+    """
+    A cached buffer always holds the newest `window` messages of its
+    conversation (or all of them, if there are fewer), so any request for
+    up to `window` messages can be answered from it.
+    """
+
+    def __init__(
+        self,
+        window: int = HISTORY_CACHE_WINDOW,
+        max_conversations: int = HISTORY_CACHE_MAX_CONVERSATIONS,
+        max_bytes: int = HISTORY_CACHE_MAX_BYTES
+    ):
+        self.window = window
+        self.max_conversations = max_conversations
+        self.max_bytes = max_bytes
+        # Structure: {conversation_id: deque of {id, role, content, tokens_used, created_at}, oldest first}
+        self._buffers: "OrderedDict[str, Deque[Dict]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        # Conversations being loaded from the DB -> whether a message arrived meanwhile
+        self._filling: Dict[str, bool] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, conversation_id: str, limit: int) -> Optional[List[Dict]]:
+        """The newest `limit` messages, oldest first, or None on a miss"""
+        buffer = self._buffers.get(conversation_id)
+        if buffer is None or limit > self.window:
+            self.misses += 1
+            return None
+        self._buffers.move_to_end(conversation_id)
+        self.hits += 1
+        return list(islice(buffer, max(len(buffer) - limit, 0), None))
+
+    def start_fill(self, conversation_id: str) -> None:
+        """Mark the start of a DB load, so fill() can tell if it raced with a new message"""
+        self._filling.setdefault(conversation_id, False)
+
+    def fill(self, conversation_id: str, messages: List[Dict]) -> None:
+        """Cache the newest messages loaded from the DB (skipped if a message arrived meanwhile)"""
+        if self._filling.pop(conversation_id, True):
+            return
+        self._store(conversation_id, deque(messages[-self.window:], maxlen=self.window))
+
+    def end_fill(self, conversation_id: str) -> None:
+        """Drop the marker of a DB load that failed or was cancelled (no-op after fill())"""
+        self._filling.pop(conversation_id, None)
+
+    def prime(self, conversation_id: str) -> None:
+        """Start an empty buffer for a conversation that was just created"""
+        self._store(conversation_id, deque(maxlen=self.window))
+
+    def append(self, conversation_id: str, message: Dict) -> None:
+        """Write-through for a newly saved message; ignored for conversations not cached"""
+        buffer = self._buffers.get(conversation_id)
+        if buffer is None:
+            if conversation_id in self._filling:
+                self._filling[conversation_id] = True
+            return
+        if len(buffer) == buffer.maxlen:
+            self._resize(conversation_id, -_sizeof(buffer[0]))
+        buffer.append(message)
+        self._resize(conversation_id, _sizeof(message))
+        self._buffers.move_to_end(conversation_id)
+        self._evict()
+
+    def invalidate(self, conversation_id: str) -> None:
+        if conversation_id in self._buffers:
+            self._remove(conversation_id)
+
+    def _store(self, conversation_id: str, buffer: Deque[Dict]) -> None:
+        if conversation_id in self._buffers:
+            self._remove(conversation_id)
+        self._buffers[conversation_id] = buffer
+        self._sizes[conversation_id] = 0
+        self._resize(conversation_id, sum(_sizeof(m) for m in buffer))
+        self._evict()
+
+    def _resize(self, conversation_id: str, delta: int) -> None:
+        self._sizes[conversation_id] += delta
+        self._bytes += delta
+
+    def _remove(self, conversation_id: str) -> None:
+        del self._buffers[conversation_id]
+        self._bytes -= self._sizes.pop(conversation_id)
+
+    def _evict(self) -> None:
+        while self._buffers and (
+            len(self._buffers) > self.max_conversations or self._bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._buffers)))
+            self.evictions += 1
+
+    def metrics(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "conversations": len(self._buffers),
+            "max_conversations": self.max_conversations,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "window": self.window,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+_history_cache: Optional[HistoryCache] = None
+
+
+def get_history_cache() -> HistoryCache:
+    """Get or create the history cache singleton"""
+    global _history_cache
+    if _history_cache is None:
+        _history_cache = HistoryCache()
+        register_metrics("history_cache", _history_cache.metrics)
+    return _history_cache
@@ -0,0 +1,57 @@
+"""
+Fast JSON Encoding
+orjson-backed response class and encoder shared by the API and the SSE paths.
+Falls back to the standard library when orjson is not installed.
+"""
+
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+# Non-string dict keys (e.g. year -> value maps) and NumPy arrays are allowed
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def _default(obj: Any) -> Any:
+    """Types the encoder does not handle natively"""
+    if isinstance(obj, BaseModel):
+        # Already validated - dump as-is instead of validating again
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(content: Any) -> bytes:
+    """Encode `content` (dicts, lists, Pydantic models, datetimes...) as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class for the app.
+    Return one directly with an already-validated model (or rows whose
+    shape is fixed by the query) to skip FastAPI's response_model
+    validation; the model is serialized as-is.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
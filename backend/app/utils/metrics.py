@@ -0,0 +1,19 @@
+"""
+In-process Metrics Registry
+Components register a snapshot function; GET /metrics returns all of them.
+Values are per worker process.
+"""
+
+from typing import Any, Callable, Dict
+
+_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, source: Callable[[], Dict[str, Any]]) -> None:
+    """Register (or replace) a named metrics snapshot function"""
+    _sources[name] = source
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot every registered metrics source"""
+    return {name: source() for name, source in _sources.items()}
@@ -0,0 +1,88 @@
+"""
+Conversation Ownership Cache
+Remembers who owns each conversation (and whether it was deleted) so chat
+turns don't spend a DB round trip re-checking it.
+Each worker keeps its own copy; entries expire after a short TTL so a
+delete made through another worker is picked up within that window.
+"""
+
+import os
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from ..db.repository import get_repository
+from .metrics import register_metrics
+from .ttl_cache import TTLCache
+
+OWNERSHIP_CACHE_TTL_SECONDS = float(os.getenv("OWNERSHIP_CACHE_TTL_SECONDS", "120"))
+OWNERSHIP_CACHE_MAX_ENTRIES = int(os.getenv("OWNERSHIP_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ConversationOwner(NamedTuple):
+    user_id: str
+    deleted: bool
+
+
+class OwnershipCache:
+    """TTL/LRU cache of conversation_id -> ConversationOwner, filled from the repository"""
+
+    def __init__(
+        self,
+        max_entries: int = OWNERSHIP_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = OWNERSHIP_CACHE_TTL_SECONDS
+    ):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.invalidations = 0
+
+    async def lookup(self, conversation_id: str) -> Optional[ConversationOwner]:
+        """Owner of a conversation, or None if it does not exist (misses are not cached)"""
+        owner = self._cache.get(conversation_id)
+        if owner is None:
+            row = await get_repository().get_conversation(conversation_id)
+            if not row:
+                return None
+            owner = ConversationOwner(row["user_id"], bool(row.get("deleted_at")))
+            self._cache.set(conversation_id, owner)
+        return owner
+
+    def remember(self, conversation_id: str, user_id: str) -> None:
+        """Record a conversation just created by `user_id`"""
+        self._cache.set(conversation_id, ConversationOwner(user_id, False))
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Forget a conversation after it was updated or deleted"""
+        if self._cache.delete(conversation_id):
+            self.invalidations += 1
+
+    def metrics(self) -> Dict:
+        return {"invalidations": self.invalidations, **self._cache.stats()}
+
+
+# Singleton instance
+_ownership_cache: Optional[OwnershipCache] = None
+
+
+def get_ownership_cache() -> OwnershipCache:
+    """Get or create the ownership cache singleton"""
+    global _ownership_cache
+    if _ownership_cache is None:
+        _ownership_cache = OwnershipCache()
+        register_metrics("ownership_cache", _ownership_cache.metrics)
+    return _ownership_cache
+
+
+async def verify_conversation_owner(conversation_id: str, user_id: str) -> None:
+    """
+    Check that a live conversation belongs to `user_id`.
+
+    Raises:
+        HTTPException: 404 if the conversation is missing or deleted, 403 if owned by someone else
+    """
+    owner = await get_ownership_cache().lookup(conversation_id)
+
+    if owner is None or owner.deleted:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    if owner.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
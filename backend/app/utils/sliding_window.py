@@ -1,27 +1,65 @@
 """Sliding window utility for conversation history"""
 from typing import List, Dict
-from ..db.supabase import get_supabase
+from ..db.repository import get_repository
+from ..db.message_writer import get_message_writer
+from ..krishi.tokens import count_tokens
+from .history_cache import get_history_cache
+
+
+def _entry(message: Dict) -> Dict:
+    return {
+        "id": message["id"],
+        "role": message["role"],
+        "content": message["content"],
+        "tokens_used": message.get("tokens_used"),
+        "created_at": message.get("created_at")
+    }
+
+
+def remember_message(row: Dict) -> None:
+    """Write-through: add a just-saved message row to its conversation's cached window"""
+    get_history_cache().append(row["conversation_id"], _entry(row))
 
 
 async def get_sliding_window_history(conversation_id: str, limit: int = 30) -> List[Dict]:
     """
     Fetch last N messages from conversation for AI context.
     Returns messages in chronological order (oldest first).
+    Served from the history cache in an active chat; the DB is read on a miss.
     """
-    supabase = get_supabase()
-    
-    # Fetch last {limit} messages, ordered by created_at DESC
-    response = supabase.table("messages") \
-        .select("role, content") \
-        .eq("conversation_id", conversation_id) \
-        .order("created_at", desc=True) \
-        .limit(limit) \
-        .execute()
+    cache = get_history_cache()
+    messages = cache.get(conversation_id, limit)
     
-    messages = response.data or []
+    if messages is None:
+        cache.start_fill(conversation_id)
+        try:
+            # Load a full cache window (at least {limit}), already in chronological order
+            messages = await get_repository().recent_messages(conversation_id, max(limit, cache.window))
+            
+            # Messages still queued for the background writer are newer than anything stored
+            stored_ids = {m["id"] for m in messages}
+            queued = [m for m in get_message_writer().pending(conversation_id) if m["id"] not in stored_ids]
+            # Older rows stored tokens_used on other scales (word counts, whole prompts), so
+            # stored messages are recounted once here; queued rows were counted when written
+            messages = [{**_entry(m), "tokens_used": count_tokens(m["content"])} for m in messages]
+            messages += [_entry(m) for m in queued]
+            
+            cache.fill(conversation_id, messages)
+        finally:
+            # A failed or cancelled load must not leave its marker behind
+            cache.end_fill(conversation_id)
+        messages = messages[-limit:]
     
-    # Reverse to get chronological order (oldest first)
-    messages.reverse()
-    
-    # Format for AI API
-    return [{"role": m["role"], "content": m["content"]} for m in messages]
+    # Format for AI API; tokens_used lets the prompt budget skip re-counting and
+    # created_at places each message relative to the conversation summary
+    return [_entry(m) for m in messages]
+
+
+def with_message(history: List[Dict], row: Dict, limit: int = 30) -> List[Dict]:
+    """
+    The window with a just-saved message at the end.
+    Used when the history was fetched concurrently with the save and may or may not include it.
+    """
+    if any(m["id"] == row["id"] for m in history):
+        return history
+    return (history + [_entry(row)])[-limit:]
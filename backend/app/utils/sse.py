@@ -0,0 +1,150 @@
+"""
+Server-Sent Events Utilities
+Frame payloads as SSE, coalesce small LLM chunks into fewer frames and
+accumulate streamed text without repeated string copies.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import Header, Query
+
+from .json_response import json_dumps
+
+# A frame is flushed once it holds this many bytes...
+SSE_MAX_FRAME_BYTES = int(os.getenv("SSE_MAX_FRAME_BYTES", "512"))
+# ...or once its oldest chunk has waited this long
+SSE_MAX_FRAME_DELAY_MS = float(os.getenv("SSE_MAX_FRAME_DELAY_MS", "50"))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+# Clients that want the whole answer echoed in the final event send this header
+FULL_TEXT_HEADER = "X-Include-Full-Text"
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """Format one payload as an SSE `data:` frame"""
+    return f"data: {json_dumps(payload).decode()}\n\n"
+
+
+def wants_full_text(
+    x_include_full_text: Optional[str] = Header(None),
+    include_full_text: Optional[bool] = Query(None)
+) -> bool:
+    """
+    FastAPI dependency: did the client ask for `full_text` in the final event?
+    Negotiated with the X-Include-Full-Text header or ?include_full_text=true.
+    """
+    if include_full_text is not None:
+        return include_full_text
+    return (x_include_full_text or "").strip().lower() in ("1", "true", "yes")
+
+
+class StreamAccumulator:
+    """
+    Collects streamed text chunks in a list and joins them once.
+    Replaces `text += chunk`, which can copy the growing answer on every chunk.
+    """
+
+    __slots__ = ("_parts", "_length")
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._length = 0
+
+    def append(self, chunk: str) -> None:
+        if chunk:
+            self._parts.append(chunk)
+            self._length += len(chunk)
+
+    @property
+    def text(self) -> str:
+        """The full text so far (joined once, then kept as a single part)"""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+
+async def coalesce_chunks(
+    source: AsyncIterator[str],
+    max_bytes: int = SSE_MAX_FRAME_BYTES,
+    max_delay_ms: float = SSE_MAX_FRAME_DELAY_MS
+) -> AsyncIterator[str]:
+    """
+    Merge a stream of small text chunks into larger ones.
+    The first chunk is passed through immediately (time to first byte);
+    later chunks are buffered until `max_bytes` or `max_delay_ms` is reached.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    max_delay = max_delay_ms / 1000
+
+    async def pump() -> None:
+        try:
+            async for chunk in source:
+                queue.put_nowait(chunk)
+        except Exception as e:
+            queue.put_nowait(_Failure(e))
+            return
+        queue.put_nowait(_END)
+
+    pump_task = asyncio.create_task(pump())
+    buffer = []
+    buffered_bytes = 0
+    flush_at = 0.0
+    first = True
+
+    try:
+        while True:
+            if buffer:
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(0.0, flush_at - loop.time()))
+                except asyncio.TimeoutError:
+                    yield "".join(buffer)
+                    buffer, buffered_bytes = [], 0
+                    continue
+            else:
+                item = await queue.get()
+
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                if buffer:
+                    yield "".join(buffer)
+                raise item.exc
+
+            if first:
+                first = False
+                yield item
+                continue
+
+            if not buffer:
+                flush_at = loop.time() + max_delay
+            buffer.append(item)
+            buffered_bytes += len(item.encode("utf-8"))
+            if buffered_bytes >= max_bytes:
+                yield "".join(buffer)
+                buffer, buffered_bytes = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        pump_task.cancel()
@@ -0,0 +1,83 @@
+"""
+Per-stage Request Timing
+StageTimer measures the stages of one request (ownership check, history,
+LLM call, first streamed chunk...) and folds them into per-pipeline
+aggregates exported under "stages" in /metrics.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict, Iterator, Optional
+
+from .metrics import register_metrics
+
+# Structure: {pipeline: {stage: {"count", "total_seconds", "max_seconds"}}}
+_stage_stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+
+def record_stage(pipeline: str, stage: str, seconds: float) -> None:
+    """Add one measurement to a pipeline's stage aggregates"""
+    stats = _stage_stats.setdefault(pipeline, {}).setdefault(
+        stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+    )
+    stats["count"] += 1
+    stats["total_seconds"] += seconds
+    stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+
+def stage_metrics() -> Dict[str, Any]:
+    """Aggregates with the mean of each stage, for the metrics endpoint"""
+    return {
+        pipeline: {
+            stage: {
+                **stats,
+                "total_seconds": round(stats["total_seconds"], 4),
+                "max_seconds": round(stats["max_seconds"], 4),
+                "avg_seconds": round(stats["total_seconds"] / stats["count"], 4),
+            }
+            for stage, stats in stages.items()
+        }
+        for pipeline, stages in _stage_stats.items()
+    }
+
+
+register_metrics("stages", stage_metrics)
+
+
+class StageTimer:
+    """
+    Times the stages of one request.
+    Stages may overlap (e.g. awaited together with asyncio.gather); `mark()`
+    records time since the timer started, for milestones such as TTFT.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    def _record(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = seconds
+        record_stage(self.pipeline, stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    async def measure(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable`, timing it as a stage, and return its result"""
+        with self.stage(name):
+            return await awaitable
+
+    def mark(self, name: str) -> Optional[float]:
+        """Record the time since the request started (first call per name only)"""
+        if name in self.durations:
+            return None
+        elapsed = time.perf_counter() - self.started
+        self._record(name, elapsed)
+        return elapsed
@@ -0,0 +1,73 @@
+"""
+Benchmark: accumulating a streamed answer, `text += chunk` vs StreamAccumulator,
+and the final-event bytes saved by making the `full_text` echo opt-in.
+
+Usage (from backend/):
+    python -m benchmarks.bench_accumulator --sizes 10000 50000 100000 --chunk 40
+"""
+
+import argparse
+import timeit
+
+from app.krishi.events import ChunkEvent, DoneEvent
+from app.utils.sse import StreamAccumulator
+
+
+def make_chunks(size: int, chunk: int):
+    text = ("Apply urea after the first irrigation and keep the field weed free. " * (size // 60 + 1))[:size]
+    return [text[i:i + chunk] for i in range(0, len(text), chunk)]
+
+
+def concat(chunks) -> str:
+    # Stored on an object, as in a closure or shared state, so CPython cannot resize in place
+    holder = type("Holder", (), {})()
+    holder.text = ""
+    for c in chunks:
+        holder.text += c
+    return holder.text
+
+
+def accumulate(chunks) -> str:
+    accumulated = StreamAccumulator()
+    for c in chunks:
+        accumulated.append(c)
+    return accumulated.text
+
+
+def copied_chars_concat(chunks) -> int:
+    """Characters copied when every += builds a new string"""
+    total = length = 0
+    for c in chunks:
+        length += len(c)
+        total += length
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--chunk", type=int, default=40, help="characters per streamed chunk")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'chars':>7} {'chunks':>7} {'+= copied':>11} {'list copied':>12} {'+= ms':>7} {'list ms':>8} "
+          f"{'stream bytes':>13} {'done+full_text':>15} {'done only':>10}")
+    for size in args.sizes:
+        chunks = make_chunks(size, args.chunk)
+        assert concat(chunks) == accumulate(chunks)
+        concat_ms = timeit.timeit(lambda: concat(chunks), number=args.repeat) / args.repeat * 1000
+        list_ms = timeit.timeit(lambda: accumulate(chunks), number=args.repeat) / args.repeat * 1000
+
+        accumulated = StreamAccumulator()
+        for c in chunks:
+            accumulated.append(c)
+        stream_bytes = sum(len(ChunkEvent(c).to_sse().encode()) for c in chunks)
+        with_full = len(DoneEvent(accumulated.text).to_sse(True).encode())
+        without_full = len(DoneEvent(accumulated.text).to_sse(False).encode())
+
+        print(f"{size:>7} {len(chunks):>7} {copied_chars_concat(chunks):>11} {size:>12} {concat_ms:>7.3f} {list_ms:>8.3f} "
+              f"{stream_bytes:>13} {with_full:>15} {without_full:>10}")
+
+
+if __name__ == "__main__":
+    main()
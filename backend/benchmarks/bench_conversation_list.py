@@ -0,0 +1,180 @@
+"""
+Benchmark: the conversation list as N+1 queries vs. one aggregated query.
+
+- before: list the user's conversations, then one "last message" and one
+  "count" query per conversation (1 + 2N queries)
+- after: the conversation_summaries query (one LATERAL-style query with
+  the preview and count per row), all at once and paged with a keyset cursor
+
+Runs against a seeded local SQLite database with the same tables and
+indexes as the Supabase migration, so it measures query work only. Every
+query is a network round trip against Supabase; --rtt-ms adds that cost
+per query to the "with RTT" column.
+
+Usage (from backend/):
+    python -m benchmarks.bench_conversation_list --conversations 3000 --messages 20 --rtt-ms 5
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+from app.utils.cursor import decode_cursor, encode_cursor
+
+SCHEMA = """
+CREATE TABLE conversations (
+    id TEXT PRIMARY KEY, user_id TEXT NOT NULL, title TEXT,
+    created_at TEXT NOT NULL, updated_at TEXT NOT NULL, deleted_at TEXT
+);
+CREATE TABLE messages (
+    id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL, role TEXT NOT NULL,
+    content TEXT NOT NULL, tokens_used INTEGER, created_at TEXT NOT NULL
+);
+CREATE INDEX messages_conversation_created_at_idx ON messages (conversation_id, created_at DESC);
+CREATE INDEX conversations_user_created_at_idx ON conversations (user_id, created_at DESC, id DESC)
+    WHERE deleted_at IS NULL;
+"""
+
+SUMMARIES_SQL = """
+SELECT c.id, c.title, c.created_at, c.updated_at,
+       (SELECT substr(m.content, 1, 100) FROM messages m
+         WHERE m.conversation_id = c.id ORDER BY m.created_at DESC LIMIT 1) AS last_message,
+       (SELECT m.role FROM messages m
+         WHERE m.conversation_id = c.id ORDER BY m.created_at DESC LIMIT 1) AS last_message_role,
+       (SELECT count(*) FROM messages m WHERE m.conversation_id = c.id) AS message_count
+FROM conversations c
+WHERE c.user_id = ? AND c.deleted_at IS NULL
+  AND (? IS NULL OR (c.created_at, c.id) < (?, ?))
+ORDER BY c.created_at DESC, c.id DESC
+LIMIT ?
+"""
+
+
+def seed(db: sqlite3.Connection, user_id: str, conversations: int, messages: int, others: int) -> None:
+    db.executescript(SCHEMA)
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    conv_rows, message_rows = [], []
+    # Other users' conversations share the tables, as they would in production
+    owners = [user_id] * conversations + [str(uuid.uuid4()) for _ in range(others)]
+    for i, owner in enumerate(owners):
+        cid = str(uuid.uuid4())
+        created = start + timedelta(minutes=i)
+        count = rng.randint(0, messages * 2)
+        deleted = created.isoformat() if rng.random() < 0.05 else None
+        conv_rows.append((cid, owner, f"Conversation {i}", created.isoformat(),
+                          (created + timedelta(minutes=count)).isoformat(), deleted))
+        for j in range(count):
+            message_rows.append((
+                str(uuid.uuid4()), cid, "user" if j % 2 == 0 else "assistant",
+                f"Message {j}: " + "gehu ki fasal mein paani kab dena chahiye? " * 4,
+                None if j % 2 == 0 else 120, (created + timedelta(seconds=j)).isoformat(),
+            ))
+    db.executemany("INSERT INTO conversations VALUES (?, ?, ?, ?, ?, ?)", conv_rows)
+    db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)", message_rows)
+    db.commit()
+    db.execute("ANALYZE")
+
+
+def list_before(db: sqlite3.Connection, user_id: str) -> Tuple[List[dict], int]:
+    """The old route: one query for the list, then two per conversation"""
+    conversations = db.execute(
+        "SELECT id, title, created_at, updated_at FROM conversations "
+        "WHERE user_id = ? AND deleted_at IS NULL ORDER BY created_at DESC",
+        (user_id,),
+    ).fetchall()
+    result = []
+    for cid, title, created_at, updated_at in conversations:
+        last = db.execute(
+            "SELECT content, role, created_at FROM messages WHERE conversation_id = ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (cid,),
+        ).fetchone()
+        count = db.execute("SELECT count(*) FROM messages WHERE conversation_id = ?", (cid,)).fetchone()[0]
+        result.append({
+            "id": cid, "title": title, "createdAt": created_at, "updatedAt": updated_at,
+            "lastMessage": last[0][:100] if last else None,
+            "lastMessageRole": last[1] if last else None,
+            "messageCount": count,
+        })
+    return result, 1 + 2 * len(conversations)
+
+
+def summaries(db: sqlite3.Connection, user_id: str, limit: Optional[int], cursor: Optional[str]) -> List[tuple]:
+    before_created_at, before_id = decode_cursor(cursor, 2) if cursor else (None, None)
+    return db.execute(
+        SUMMARIES_SQL, (user_id, before_created_at, before_created_at, before_id, -1 if limit is None else limit)
+    ).fetchall()
+
+
+def to_item(row: tuple) -> dict:
+    cid, title, created_at, updated_at, last_message, last_role, count = row
+    return {
+        "id": cid, "title": title, "createdAt": created_at, "updatedAt": updated_at,
+        "lastMessage": last_message, "lastMessageRole": last_role, "messageCount": count,
+    }
+
+
+def list_after(db: sqlite3.Connection, user_id: str) -> Tuple[List[dict], int]:
+    """The new route without a limit: one query"""
+    return [to_item(row) for row in summaries(db, user_id, None, None)], 1
+
+
+def list_paged(db: sqlite3.Connection, user_id: str, page: int) -> Tuple[List[dict], int]:
+    """Walk every page with the cursor, as a client scrolling to the end would"""
+    result, queries, cursor = [], 0, None
+    while True:
+        rows = summaries(db, user_id, page + 1, cursor)
+        queries += 1
+        result.extend(to_item(row) for row in rows[:page])
+        if len(rows) <= page:
+            return result, queries
+        cursor = encode_cursor(rows[page - 1][2], rows[page - 1][0])
+
+
+def timed(fn: Callable[[], Tuple[List[dict], int]], repeat: int) -> Tuple[float, List[dict], int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result, queries = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result, queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=3000, help="conversations of the listed user")
+    parser.add_argument("--messages", type=int, default=20, help="average messages per conversation")
+    parser.add_argument("--others", type=int, default=2000, help="conversations of other users")
+    parser.add_argument("--page", type=int, default=50, help="page size for the paged walk")
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="database round trip added per query")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    user_id = str(uuid.uuid4())
+    db = sqlite3.connect(":memory:")
+    seed(db, user_id, args.conversations, args.messages, args.others)
+    total_messages = db.execute("SELECT count(*) FROM messages").fetchone()[0]
+    print(f"seeded {args.conversations + args.others} conversations, {total_messages} messages "
+          f"(sqlite {sqlite3.sqlite_version})")
+
+    expected, _ = list_before(db, user_id)
+    print(f"{'case':<26} {'queries':>8} {'query ms':>9} {'with RTT ms':>12}")
+    cases = [
+        ("before (N+1)", lambda: list_before(db, user_id)),
+        ("after (one query)", lambda: list_after(db, user_id)),
+        (f"after (pages of {args.page})", lambda: list_paged(db, user_id, args.page)),
+        ("after (first page)", lambda: ([to_item(r) for r in summaries(db, user_id, args.page, None)], 1)),
+    ]
+    for name, fn in cases:
+        ms, result, queries = timed(fn, args.repeat)
+        assert result == (expected[:args.page] if name.endswith("first page)") else expected), name
+        print(f"{name:<26} {queries:>8} {ms:>9.2f} {ms + queries * args.rtt_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
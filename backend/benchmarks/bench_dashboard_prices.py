@@ -0,0 +1,167 @@
+"""
+Benchmark: dashboard prices as one query per crop vs. one batched query.
+
+- before: one crop_prices query per crop for the last 7 days, then the
+  trend, change and percent built per crop in Python (1 + N queries)
+- after: get_db_prices - one query for every crop's last 7 days, grouped
+  in memory, with trends and changes computed for all crops in one NumPy pass
+
+Runs the app's SQL repository on a seeded in-memory SQLite database holding
+a year of daily prices per crop. --rtt-ms adds a database round trip to
+every query, as against Supabase.
+
+Usage (from backend/):
+    python -m benchmarks.bench_dashboard_prices --crops 300 --days 365 --rtt-ms 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import select
+
+import app.db.repository as repository
+from app.db.session import create_db_engine
+from app.db.sql_repository import SqlRepository, crop_prices
+from app.routes.dashboard import PriceItem, get_db_prices, price_trends
+
+
+class RoundTripRepository(SqlRepository):
+    """SQL repository that waits `rtt_ms` before every query and counts them"""
+
+    def __init__(self, rtt_ms: float):
+        super().__init__(engine=create_db_engine("sqlite:///:memory:", echo=False))
+        self.rtt_ms = rtt_ms
+        self.queries = 0
+
+    async def run(self, work: Callable) -> Any:
+        self.queries += 1
+        await asyncio.sleep(self.rtt_ms / 1000)
+        return await super().run(work)
+
+
+async def seed(repo: SqlRepository, crops: int, days: int) -> None:
+    rng = random.Random(7)
+    today = date.today()
+    category = await repo.create_category({"name": "Cereals", "icon": "🌾"})
+    for i in range(crops):
+        crop = await repo.create_crop({
+            "name": f"Crop {i}", "category_id": category["id"],
+            # Some crops have no recent prices and fall back to MSP
+            "msp_price": 2000 + i, "is_active": i % 10 != 9,
+        })
+        if i % 15 == 14:
+            continue
+        price = rng.uniform(1000, 8000)
+        rows = []
+        for day in range(days):
+            price *= 1 + rng.uniform(-0.02, 0.02)
+            rows.append({"crop_id": crop["id"], "price": round(price, 2),
+                         "recorded_at": (today - timedelta(days=days - 1 - day)).isoformat()})
+        await repo.insert_prices(rows)
+
+
+async def prices_before(repo: SqlRepository) -> List[PriceItem]:
+    """The old get_db_prices: one history query per crop"""
+    crops = {c["id"]: c for c in await repo.list_crops(active_only=True)}
+    prices = []
+    week_ago = date.today() - timedelta(days=7)
+    for crop_id, crop in crops.items():
+        price_history = await repo._rows(
+            select(crop_prices.c.price, crop_prices.c.recorded_at)
+            .where(crop_prices.c.crop_id == crop_id, crop_prices.c.recorded_at >= week_ago)
+            .order_by(crop_prices.c.recorded_at, crop_prices.c.id)
+        )
+        if price_history:
+            trend = [int(p["price"]) for p in price_history]
+            current_price = trend[-1]
+            if len(trend) >= 2:
+                prev_price = trend[0]
+                change = current_price - prev_price
+                change_percent = round((change / prev_price) * 100, 1) if prev_price else 0
+            else:
+                change = 0
+                change_percent = 0
+            while len(trend) < 7:
+                trend.insert(0, trend[0])
+        else:
+            msp = int(crop.get("msp_price") or 0)
+            current_price, change, change_percent, trend = msp, 0, 0, [msp] * 7
+        prices.append(PriceItem(
+            id=crop_id, name=crop["name"], icon=crop.get("icon", "🌾"), price=current_price,
+            change=change, changePercent=change_percent, trend=trend
+        ))
+    return prices
+
+
+def trends_python(histories: List[List[float]]) -> List[tuple]:
+    """Per-crop trend arithmetic of the old loop"""
+    result = []
+    for history in histories:
+        trend = [int(p) for p in history]
+        change = trend[-1] - trend[0]
+        change_percent = round((change / trend[0]) * 100, 1) if trend[0] else 0
+        while len(trend) < 7:
+            trend.insert(0, trend[0])
+        result.append((trend[-1], change, change_percent, trend))
+    return result
+
+
+async def timed(repo: RoundTripRepository, fn: Callable, repeat: int) -> Dict[str, Any]:
+    best = float("inf")
+    for _ in range(repeat):
+        repo.queries = 0
+        start = time.perf_counter()
+        result = await fn()
+        best = min(best, time.perf_counter() - start)
+    return {"ms": best * 1000, "queries": repo.queries, "result": result}
+
+
+def best_ms(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+    repo = RoundTripRepository(rtt_ms=0)
+    repository._repository = repo
+    await seed(repo, args.crops, args.days)
+    total = await repo.count_rows("crop_prices")
+    print(f"seeded {args.crops} crops, {total} prices over {args.days} days")
+
+    print(f"{'case':<10} {'queries':>8} {'ms (rtt 0)':>11} {f'ms (rtt {args.rtt_ms:g})':>12}")
+    results = {}
+    for name, fn in (("before", lambda: prices_before(repo)), ("after", lambda: get_db_prices())):
+        repo.rtt_ms = 0
+        local = await timed(repo, fn, args.repeat)
+        repo.rtt_ms = args.rtt_ms
+        remote = await timed(repo, fn, 1)
+        results[name] = local["result"]
+        print(f"{name:<10} {local['queries']:>8} {local['ms']:>11.1f} {remote['ms']:>12.1f}")
+    assert results["before"] == results["after"]
+
+    # Trend arithmetic alone, over a full year per crop
+    rng = random.Random(1)
+    histories = [[rng.uniform(1000, 8000) for _ in range(args.days)] for _ in range(args.crops)]
+    print(f"trends of {args.crops} x {args.days} prices: python {best_ms(lambda: trends_python(histories), 3):.1f} ms, "
+          f"numpy {best_ms(lambda: price_trends(histories), 3):.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crops", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365, help="days of daily prices per crop")
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="database round trip added per query")
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
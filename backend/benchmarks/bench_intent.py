@@ -0,0 +1,104 @@
+"""
+Benchmark: intent detection, legacy keyword loops vs the compiled intent engine.
+
+Usage (from backend/):
+    python -m benchmarks.bench_intent --messages 5000
+"""
+
+import argparse
+import random
+import time
+
+from app.krishi.intent import IntentEngine
+
+SAMPLES = [
+    "My wheat leaves are turning yellow, what should I do?",
+    "gehun me khaad kab daalein",
+    "सिंचाई कब करें?",
+    "mandi bhav kya hai aaj",
+    "Which spray for aphids on mustard?",
+    "Will it rain this week in Nashik?",
+    "फसल में कीड़े लग गए हैं, कौन सी दवाई डालें",
+    "How much urea for 2 acres of paddy?",
+    "Best time to sell onions at the market",
+    "hello",
+]
+
+# Expected top intent ("general" for none); the first group are English words
+# that merely contain, or collapse to, a keyword and must not match it
+CHECKS = [
+    ("I grow palak myself", "general"),
+    ("is this selection okay", "general"),
+    ("watermelon planting time", "general"),
+    ("crop rotation plan", "general"),
+    ("check dam near my field", "general"),
+    ("How much urea should I sell", "price"),
+    ("gehun me khaaad kab daalein", "fertilizer"),
+    ("paaani kitna dena hai", "irrigation"),
+    ("mirchi ki patti mein leaf curling hai", "diagnosis"),
+    ("Tomatoes are rotting after the rains", "diagnosis"),
+    ("टमाटर में कीड़े लग गए", "diagnosis"),
+]
+
+LEGACY_INTENTS = {
+    "diagnosis": ["problem", "disease", "pest", "yellow", "spots", "wilting", "insects", "dying", "help"],
+    "fertilizer": ["fertilizer", "urea", "dap", "npk", "nutrient", "manure", "खाद"],
+    "irrigation": ["water", "irrigation", "सिंचाई", "पानी", "when to water"],
+    "weather": ["rain", "weather", "frost", "heat", "cold", "बारिश", "मौसम"],
+    "price": ["price", "msp", "rate", "sell", "market", "मंडी", "भाव"],
+    "pesticide": ["pesticide", "spray", "कीटनाशक", "दवाई"],
+}
+
+
+def legacy_detect(message: str) -> list:
+    """The previous substring-loop implementation, kept here for comparison"""
+    message_lower = message.lower()
+    detected = [i for i, keywords in LEGACY_INTENTS.items() if any(kw in message_lower for kw in keywords)]
+    return detected or ["general"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    messages = [rng.choice(SAMPLES) for _ in range(args.messages)]
+    engine = IntentEngine()
+
+    start = time.perf_counter()
+    legacy = [legacy_detect(m) for m in messages]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [engine.classify(m) for m in messages]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.classify_batch(messages)
+    batch_s = time.perf_counter() - start
+
+    print(f"{'mode':>10} {'total ms':>9} {'us/msg':>8}")
+    for name, elapsed in (("legacy", legacy_s), ("engine", single_s), ("batch", batch_s)):
+        print(f"{name:>10} {elapsed * 1000:>9.1f} {elapsed / len(messages) * 1e6:>8.1f}")
+
+    print("\nSample classifications (legacy -> engine):")
+    for message in SAMPLES:
+        print(f"  {message[:40]:<40} {','.join(legacy_detect(message)):<22} {engine.classify(message)['scores']}")
+    unmatched = sum(1 for r in legacy if r == ["general"]) - sum(1 for r in single if r["intents"] == ["general"])
+    print(f"\nMessages recognised by the engine but not the legacy loops: {unmatched}")
+
+    failures = [
+        (message, expected, engine.classify(message)["intents"][0])
+        for message, expected in CHECKS
+        if engine.classify(message)["intents"][0] != expected
+    ]
+    for message, expected, got in failures:
+        print(f"  MISCLASSIFIED {message!r}: expected {expected}, got {got}")
+    print(f"Checks: {len(CHECKS) - len(failures)}/{len(CHECKS)} passed")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
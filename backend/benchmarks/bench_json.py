@@ -0,0 +1,131 @@
+"""
+Benchmark: response encoding before/after FastJSONResponse.
+
+- /api/dashboard: return the model and let FastAPI re-validate it vs.
+  returning FastJSONResponse(model)
+- /api/admin/prices: validate every row against PriceResponse vs.
+  returning the selected rows as-is
+- a 2,000-chunk stream: SSE frames encoded with json.dumps vs. json_dumps
+
+Routes run in-process on a small app with synthetic data, so the numbers
+cover routing + serialization only, not the database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_json --prices 300 --rows 1000 --chunks 2000
+"""
+
+import argparse
+import json
+import timeit
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes.admin import PriceResponse
+from app.routes.dashboard import (
+    DashboardResponse, ForecastDay, InsightData, PriceItem, StatusChip, TimelineItem, WeatherResponse,
+)
+from app.utils.json_response import FastJSONResponse, orjson
+from app.utils.sse import sse_event
+
+
+def make_dashboard(prices: int) -> DashboardResponse:
+    return DashboardResponse(
+        weather=WeatherResponse(
+            location="Ludhiana, Punjab", temperature=28, condition="Clear", humidity=55,
+            windSpeed=12, uvIndex=6, rainProbability=10,
+            forecast=[ForecastDay(day=f"Day {i}", temp=27 + i, icon="☀️") for i in range(5)],
+        ),
+        prices=[
+            PriceItem(id=f"crop-{i}", name=f"Crop {i}", icon="🌾", price=2000 + i, change=i % 50 - 25,
+                      changePercent=round((i % 50 - 25) / 20, 1), trend=[2000 + i + d for d in range(7)])
+            for i in range(prices)
+        ],
+        statusChips=[StatusChip(id=f"chip-{i}", label="Soil", value="Good", status="good", icon="🌱") for i in range(4)],
+        timeline=[
+            TimelineItem(id=f"t-{i}", type="insight", title="Irrigation window",
+                         message="Light irrigation is advised before the heat wave.", time="2h ago")
+            for i in range(10)
+        ],
+        insights=[InsightData(title="Yield", subtitle="This season", value="42", unit="q/acre", gradient="green")],
+        quickStats={"crops": prices, "alerts": 2, "marketOpen": True},
+    )
+
+
+def make_price_rows(rows: int) -> List[dict]:
+    today = date.today()
+    created = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()), "crop_id": f"crop-{i % 40}", "price": 2000.0 + i % 300,
+            "price_type": "market", "market_name": "Khanna Mandi", "state": "Punjab", "district": "Ludhiana",
+            "recorded_at": (today - timedelta(days=i % 30)).isoformat(), "source": "agmarknet",
+            "created_at": created.isoformat(), "crop": {"name": f"Crop {i % 40}", "icon": "🌾"},
+        }
+        for i in range(rows)
+    ]
+
+
+def build_app(dashboard: DashboardResponse, rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before/dashboard", response_model=DashboardResponse)
+    async def dashboard_before():
+        return dashboard
+
+    @app.get("/after/dashboard", response_model=DashboardResponse)
+    async def dashboard_after():
+        return FastJSONResponse(dashboard)
+
+    @app.get("/before/prices", response_model=List[PriceResponse])
+    async def prices_before():
+        return rows
+
+    @app.get("/after/prices", response_model=List[PriceResponse])
+    async def prices_after():
+        return FastJSONResponse(rows)
+
+    return app
+
+
+def stream_before(chunks: List[str]) -> int:
+    return sum(len(f"data: {json.dumps({'chunk': c, 'done': False})}\n\n".encode()) for c in chunks)
+
+
+def stream_after(chunks: List[str]) -> int:
+    return sum(len(sse_event({"chunk": c, "done": False}).encode()) for c in chunks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prices", type=int, default=300, help="price cards on the dashboard")
+    parser.add_argument("--rows", type=int, default=1000, help="admin price rows")
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks in the SSE stream")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    client = TestClient(build_app(make_dashboard(args.prices), make_price_rows(args.rows)))
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+    print(f"{'case':<18} {'before ms':>10} {'after ms':>9} {'bytes before':>13} {'bytes after':>12}")
+
+    for name in ("dashboard", "prices"):
+        before = client.get(f"/before/{name}")
+        after = client.get(f"/after/{name}")
+        # Validation re-formats timestamps ("+00:00" -> "Z"), so compare shapes only
+        assert len(before.json()) == len(after.json()), name
+        before_ms = timeit.timeit(lambda: client.get(f"/before/{name}"), number=args.repeat) / args.repeat * 1000
+        after_ms = timeit.timeit(lambda: client.get(f"/after/{name}"), number=args.repeat) / args.repeat * 1000
+        print(f"{name:<18} {before_ms:>10.3f} {after_ms:>9.3f} {len(before.content):>13} {len(after.content):>12}")
+
+    chunks = [f"धान की फसल में {i} chunk of advice " for i in range(args.chunks)]
+    before_ms = timeit.timeit(lambda: stream_before(chunks), number=args.repeat) / args.repeat * 1000
+    after_ms = timeit.timeit(lambda: stream_after(chunks), number=args.repeat) / args.repeat * 1000
+    print(f"{f'stream x{args.chunks}':<18} {before_ms:>10.3f} {after_ms:>9.3f} "
+          f"{stream_before(chunks):>13} {stream_after(chunks):>12}")
+
+
+if __name__ == "__main__":
+    main()
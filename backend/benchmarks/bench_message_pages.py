@@ -0,0 +1,152 @@
+"""
+Benchmark: message pages by offset vs. keyset cursor.
+
+- offset: ORDER BY created_at LIMIT n OFFSET k, as the endpoint paged
+  before; the database walks and discards k rows per page
+- keyset: WHERE (created_at, id) > cursor ORDER BY created_at, id LIMIT n
+  (and < cursor, descending, for older pages), which seeks the index
+- delta: the few messages since the newest cursor, as a polling client asks
+
+Runs against a seeded local SQLite database with the messages table and
+the (conversation_id, created_at, id) index of the Supabase migration.
+
+Usage (from backend/):
+    python -m benchmarks.bench_message_pages --messages 100000 --page 50
+"""
+
+import argparse
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from app.utils.cursor import decode_cursor, encode_cursor
+
+SCHEMA = """
+CREATE TABLE messages (
+    id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL, role TEXT NOT NULL,
+    content TEXT NOT NULL, tokens_used INTEGER, created_at TEXT NOT NULL
+);
+CREATE INDEX messages_conversation_created_at_id_idx ON messages (conversation_id, created_at, id);
+"""
+
+COLUMNS = "id, role, content, created_at, tokens_used"
+
+
+def seed(db: sqlite3.Connection, conversation_id: str, messages: int, others: int) -> None:
+    db.executescript(SCHEMA)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    # Other conversations interleave with the long one, as they would in production
+    owners = [conversation_id] * messages + [str(uuid.uuid4()) for _ in range(others // 20)] * 20
+    for i, owner in enumerate(owners):
+        rows.append((
+            str(uuid.uuid4()), owner, "user" if i % 2 == 0 else "assistant",
+            f"Message {i}: " + "dhaan ki ropai ke baad khad kab daalein? " * 4,
+            None if i % 2 == 0 else 120,
+            # Pairs share a timestamp, so the id tiebreak is exercised
+            (start + timedelta(seconds=i // 2)).isoformat(),
+        ))
+    db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)", rows)
+    db.commit()
+    db.execute("ANALYZE")
+
+
+def page_offset(db: sqlite3.Connection, conversation_id: str, limit: int, offset: int) -> List[tuple]:
+    return db.execute(
+        f"SELECT {COLUMNS} FROM messages WHERE conversation_id = ? ORDER BY created_at LIMIT ? OFFSET ?",
+        (conversation_id, limit, offset),
+    ).fetchall()
+
+
+def page_after(db: sqlite3.Connection, conversation_id: str, limit: int, cursor: Optional[str]) -> List[tuple]:
+    # Without a cursor the page starts at the first message ("" sorts before any timestamp)
+    created_at, message_id = decode_cursor(cursor, 2) if cursor else ("", "")
+    return db.execute(
+        f"SELECT {COLUMNS} FROM messages WHERE conversation_id = ? AND (created_at, id) > (?, ?) "
+        "ORDER BY created_at, id LIMIT ?",
+        (conversation_id, created_at, message_id, limit),
+    ).fetchall()
+
+
+def page_before(db: sqlite3.Connection, conversation_id: str, limit: int, cursor: str) -> List[tuple]:
+    created_at, message_id = decode_cursor(cursor, 2)
+    rows = db.execute(
+        f"SELECT {COLUMNS} FROM messages WHERE conversation_id = ? AND (created_at, id) < (?, ?) "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        (conversation_id, created_at, message_id, limit),
+    ).fetchall()
+    rows.reverse()
+    return rows
+
+
+def cursor_of(row: tuple) -> str:
+    return encode_cursor(row[3], row[0])
+
+
+def best_ms(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000, help="messages in the long conversation")
+    parser.add_argument("--others", type=int, default=20_000, help="messages of other conversations")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cid = str(uuid.uuid4())
+    db = sqlite3.connect(":memory:")
+    seed(db, cid, args.messages, args.others)
+    print(f"seeded {args.messages} messages in one conversation, {args.others} in others "
+          f"(sqlite {sqlite3.sqlite_version})")
+
+    # Ids sort within a timestamp in keyset order, so the reference order is (created_at, id)
+    ordered = db.execute(
+        f"SELECT {COLUMNS} FROM messages WHERE conversation_id = ? ORDER BY created_at, id", (cid,)
+    ).fetchall()
+
+    print(f"{'depth':>8} {'offset ms':>10} {'after ms':>9} {'before ms':>10}")
+    for depth in (0, args.messages // 10, args.messages // 2, args.messages - args.page - 1):
+        # Cursors of the rows bordering the page at this depth
+        after = cursor_of(ordered[depth - 1]) if depth else None
+        before = cursor_of(ordered[depth + args.page])
+        expected = ordered[depth:depth + args.page]
+        assert page_after(db, cid, args.page, after) == expected
+        assert page_before(db, cid, args.page, before) == expected
+        offset_ms = best_ms(lambda: page_offset(db, cid, args.page, depth), args.repeat)
+        after_ms = best_ms(lambda: page_after(db, cid, args.page, after), args.repeat)
+        before_ms = best_ms(lambda: page_before(db, cid, args.page, before), args.repeat)
+        print(f"{depth:>8} {offset_ms:>10.3f} {after_ms:>9.3f} {before_ms:>10.3f}")
+
+    # Every page of the thread: offset from the start, keyset back from the newest message
+    pages = -(-args.messages // args.page)
+    offset_walk = best_ms(
+        lambda: [page_offset(db, cid, args.page, k * args.page) for k in range(pages)], 1
+    )
+
+    def keyset_walk() -> None:
+        cursor = cursor_of(ordered[-1])
+        rows = [ordered[-1]]
+        while rows:
+            rows = page_before(db, cid, args.page, cursor)
+            if rows:
+                cursor = cursor_of(rows[0])
+
+    print(f"full walk of {pages} pages: offset {offset_walk:.1f} ms, keyset {best_ms(keyset_walk, 1):.1f} ms")
+
+    # A polling client that is 3 messages behind
+    since = cursor_of(ordered[-4])
+    assert page_after(db, cid, args.page, since) == ordered[-3:]
+    print(f"delta (3 new messages): {best_ms(lambda: page_after(db, cid, args.page, since), args.repeat):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
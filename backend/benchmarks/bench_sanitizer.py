@@ -0,0 +1,87 @@
+"""
+Benchmark: banned-chemical sanitizer, legacy per-chemical str.replace vs the Aho-Corasick automaton.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sanitizer --sizes 1000 10000 100000 --chunk 40
+"""
+
+import argparse
+import random
+import timeit
+
+from app.krishi.safety import BANNED_CHEMICALS_INDIA, SafetyValidator
+
+WORDS = (
+    "apply water to the field after sowing check leaves for pests neem oil "
+    "spray in the evening consult your local agriculture officer urea dap"
+).split()
+
+
+def legacy_sanitize(response: str) -> str:
+    """The previous implementation, kept here for comparison"""
+    response_lower = response.lower()
+    for chemical in BANNED_CHEMICALS_INDIA:
+        if chemical in response_lower:
+            response = response.replace(chemical, f"[BANNED: {chemical}]")
+            response = response.replace(chemical.title(), f"[BANNED: {chemical.title()}]")
+    return response
+
+
+def make_text(size: int, rng: random.Random) -> str:
+    banned = sorted(BANNED_CHEMICALS_INDIA)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(banned) if rng.random() < 0.02 else rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def split(text: str, chunk: int):
+    return [text[i:i + chunk] for i in range(0, len(text), chunk)]
+
+
+def legacy_stream(chunks) -> str:
+    return "".join(legacy_sanitize(c) for c in chunks)
+
+
+def automaton_stream(chunks) -> str:
+    sanitizer = SafetyValidator.stream_sanitizer()
+    out = [sanitizer.feed(c) for c in chunks]
+    out.append(sanitizer.flush())
+    return "".join(out)
+
+
+def missed(text: str, sanitized: str) -> int:
+    """Banned names present in the input that were not marked in the output"""
+    expected = SafetyValidator.sanitize_ai_response(text).count("[BANNED:")
+    return expected - sanitized.count("[BANNED:")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--chunk", type=int, default=40, help="characters per streamed chunk")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'chars':>8} {'mode':>7} {'legacy ms':>10} {'automaton ms':>13} {'legacy missed':>14} {'automaton missed':>17}")
+    for size in args.sizes:
+        text = make_text(size, rng)
+        chunks = split(text, args.chunk)
+
+        legacy_full = timeit.timeit(lambda: legacy_sanitize(text), number=args.repeat) / args.repeat
+        new_full = timeit.timeit(lambda: SafetyValidator.sanitize_ai_response(text), number=args.repeat) / args.repeat
+        print(f"{size:>8} {'full':>7} {legacy_full * 1000:>10.3f} {new_full * 1000:>13.3f} "
+              f"{missed(text, legacy_sanitize(text)):>14} {missed(text, SafetyValidator.sanitize_ai_response(text)):>17}")
+
+        legacy_chunked = timeit.timeit(lambda: legacy_stream(chunks), number=args.repeat) / args.repeat
+        new_chunked = timeit.timeit(lambda: automaton_stream(chunks), number=args.repeat) / args.repeat
+        print(f"{size:>8} {'stream':>7} {legacy_chunked * 1000:>10.3f} {new_chunked * 1000:>13.3f} "
+              f"{missed(text, legacy_stream(chunks)):>14} {missed(text, automaton_stream(chunks)):>17}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: SSE framing, one frame per LLM chunk + sleep vs size/time coalescing.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sse --tokens 400 --delay 0.002 --streams 1 16
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator, Tuple
+
+from app.utils.sse import coalesce_chunks, sse_event
+
+
+async def fake_tokens(count: int, delay: float) -> AsyncIterator[str]:
+    """Small word-sized chunks arriving with a fixed inter-token delay"""
+    for i in range(count):
+        await asyncio.sleep(delay)
+        yield f"word{i} "
+
+
+async def per_chunk(count: int, delay: float) -> AsyncIterator[str]:
+    """The old pattern: one frame per chunk followed by a 10 ms sleep"""
+    async for chunk in fake_tokens(count, delay):
+        yield sse_event({"chunk": chunk, "done": False})
+        await asyncio.sleep(0.01)
+
+
+async def coalesced(count: int, delay: float) -> AsyncIterator[str]:
+    async for chunk in coalesce_chunks(fake_tokens(count, delay)):
+        yield sse_event({"chunk": chunk, "done": False})
+
+
+async def consume(stream: AsyncIterator[str]) -> Tuple[int, int, float, float]:
+    start = time.perf_counter()
+    ttfb = 0.0
+    frames = 0
+    size = 0
+    async for frame in stream:
+        if frames == 0:
+            ttfb = time.perf_counter() - start
+        frames += 1
+        size += len(frame)
+    return frames, size, ttfb, time.perf_counter() - start
+
+
+async def run(pipeline, streams: int, count: int, delay: float) -> Tuple[int, int, float, float]:
+    results = await asyncio.gather(*(consume(pipeline(count, delay)) for _ in range(streams)))
+    frames, size, ttfb, total = results[0]
+    return frames, size, max(r[2] for r in results), max(r[3] for r in results)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--delay", type=float, default=0.002, help="seconds between tokens")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    print(f"{'pipeline':>10} {'streams':>8} {'frames':>7} {'bytes':>8} {'ttfb ms':>8} {'total s':>8}")
+    for n in args.streams:
+        for name, pipeline in (("per-chunk", per_chunk), ("coalesced", coalesced)):
+            frames, size, ttfb, total = await run(pipeline, n, args.tokens, args.delay)
+            print(f"{name:>10} {n:>8} {frames:>7} {size:>8} {ttfb * 1000:>8.1f} {total:>8.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Benchmark: concurrent Gemini streams, blocking iteration vs the worker-pool engine.
+
+Usage (from backend/):
+    python -m benchmarks.bench_streaming --streams 1 8 32 --chunks 20 --delay 0.02
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.krishi.streaming import stream_text
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Mimics GenerativeModel.generate_content(stream=True) with a fixed per-chunk network delay"""
+
+    def __init__(self, chunks: int, delay: float):
+        self.chunks = chunks
+        self.delay = delay
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        for i in range(self.chunks):
+            time.sleep(self.delay)
+            yield FakeChunk(f"token{i} ")
+
+
+async def consume_blocking(model: FakeModel) -> int:
+    """The old pattern: iterate the SDK stream directly inside the coroutine"""
+    received = 0
+    for chunk in model.generate_content("prompt", stream=True):
+        if chunk.text:
+            received += 1
+    return received
+
+
+async def consume_pooled(model: FakeModel) -> int:
+    received = 0
+    async for _ in stream_text(model, "prompt"):
+        received += 1
+    return received
+
+
+async def run(consumer, model: FakeModel, streams: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(consumer(model) for _ in range(streams)))
+    elapsed = time.perf_counter() - start
+    assert all(r == model.chunks for r in results)
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.02, help="seconds per chunk")
+    args = parser.parse_args()
+
+    model = FakeModel(args.chunks, args.delay)
+    print(f"{'streams':>8} {'blocking s':>11} {'pooled s':>9} {'blocking str/s':>15} {'pooled str/s':>13}")
+    for n in args.streams:
+        blocking = await run(consume_blocking, model, n)
+        pooled = await run(consume_pooled, model, n)
+        print(f"{n:>8} {blocking:>11.3f} {pooled:>9.3f} {n / blocking:>15.1f} {n / pooled:>13.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
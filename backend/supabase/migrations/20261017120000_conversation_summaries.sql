@@ -0,0 +1,57 @@
+-- Conversation list in one round trip: every live conversation of a user
+-- with its last-message preview and message count, newest first.
+-- Keyset pagination on (created_at, id): pass the last row of the previous
+-- page as p_before_created_at / p_before_id; p_limit null returns all rows.
+
+create index if not exists messages_conversation_created_at_idx
+    on public.messages (conversation_id, created_at desc);
+
+create index if not exists conversations_user_created_at_idx
+    on public.conversations (user_id, created_at desc, id desc)
+    where deleted_at is null;
+
+create or replace function public.conversation_summaries(
+    p_user_id uuid,
+    p_limit integer default null,
+    p_before_created_at timestamptz default null,
+    p_before_id uuid default null
+)
+returns table (
+    id uuid,
+    title text,
+    created_at timestamptz,
+    updated_at timestamptz,
+    last_message text,
+    last_message_role text,
+    message_count bigint
+)
+language sql
+stable
+as $$
+    select
+        c.id,
+        c.title::text,
+        c.created_at,
+        c.updated_at,
+        left(last_msg.content, 100),
+        last_msg.role::text,
+        coalesce(counts.message_count, 0)
+    from public.conversations c
+    left join lateral (
+        select m.content, m.role
+        from public.messages m
+        where m.conversation_id = c.id
+        order by m.created_at desc
+        limit 1
+    ) last_msg on true
+    left join lateral (
+        select count(*) as message_count
+        from public.messages m
+        where m.conversation_id = c.id
+    ) counts on true
+    where c.user_id = p_user_id
+      and c.deleted_at is null
+      and (p_before_created_at is null or (c.created_at, c.id) < (p_before_created_at, p_before_id))
+    order by c.created_at desc, c.id desc
+    limit p_limit;
+$$;
@@ -0,0 +1,8 @@
+-- Keyset pagination of a conversation's messages orders and filters on
+-- (created_at, id) in both directions; one ascending index serves both
+-- and supersedes the (conversation_id, created_at desc) index.
+
+create index if not exists messages_conversation_created_at_id_idx
+    on public.messages (conversation_id, created_at, id);
+
+drop index if exists public.messages_conversation_created_at_idx;
@@ -0,0 +1,11 @@
+-- Rolling summary of each long conversation: older turns folded into one
+-- text, sent ahead of the recent messages. summarized_until /
+-- summarized_until_id are the (created_at, id) of the last folded message.
+
+create table if not exists public.rolling_summaries (
+    conversation_id uuid primary key references public.conversations (id) on delete cascade,
+    summary text not null,
+    summarized_until timestamptz not null,
+    summarized_until_id uuid not null,
+    updated_at timestamptz not null default now()
+);
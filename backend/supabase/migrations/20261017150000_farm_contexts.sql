@@ -0,0 +1,11 @@
+-- FarmContext of each conversation, merged server-side with the fields a
+-- request changes. version is bumped by every write; writers update only
+-- the version they read (compare-and-set), so concurrent merges retry
+-- instead of overwriting each other.
+
+create table if not exists public.farm_contexts (
+    conversation_id uuid primary key references public.conversations (id) on delete cascade,
+    context jsonb not null default '{}'::jsonb,
+    version integer not null,
+    updated_at timestamptz not null default now()
+);
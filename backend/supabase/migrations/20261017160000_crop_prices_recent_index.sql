@@ -0,0 +1,6 @@
+-- The dashboard reads the last week of prices of all listed crops in one
+-- query (crop_id in (...) and recorded_at >= ...); this index serves it
+-- without scanning the full price history.
+
+create index if not exists crop_prices_crop_recorded_at_idx
+    on public.crop_prices (crop_id, recorded_at);
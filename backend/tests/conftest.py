@@ -0,0 +1,51 @@
+"""
+Shared fixtures: an in-memory SQL repository installed as the app's
+repository, with fresh per-worker caches around every test that uses it.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import pytest
+
+import app.db.message_writer as message_writer
+import app.db.repository as repository
+import app.utils.history_cache as history_cache
+from app.db.session import create_db_engine
+from app.db.sql_repository import SqlRepository
+
+
+@pytest.fixture
+def repo(monkeypatch) -> SqlRepository:
+    sql_repository = SqlRepository(engine=create_db_engine("sqlite:///:memory:", echo=False))
+    monkeypatch.setattr(repository, "_repository", sql_repository)
+    monkeypatch.setattr(history_cache, "_history_cache", None)
+    monkeypatch.setattr(message_writer, "_writer", None)
+    return sql_repository
+
+
+@pytest.fixture
+def conversation_id(repo: SqlRepository) -> str:
+    async def create() -> str:
+        user = await repo.create_user({"email": f"{uuid.uuid4()}@example.com", "username": "farmer"})
+        return (await repo.create_conversation(user["id"], "Paddy"))["id"]
+
+    return asyncio.run(create())
+
+
+def message_rows(conversation_id: str, count: int) -> List[Dict]:
+    """`count` alternating user/assistant rows one second apart, oldest first"""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i}",
+            "tokens_used": 2,
+            "created_at": (start + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
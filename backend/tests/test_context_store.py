@@ -0,0 +1,44 @@
+"""
+Tests for serialized farm context merges.
+"""
+
+import asyncio
+
+from app.krishi.context_store import FarmContextStore
+
+
+def test_merges_stay_serialized_while_others_wait(repo, conversation_id, monkeypatch):
+    store = FarmContextStore()
+    save = repo.save_farm_context
+    saving = {"now": 0, "peak": 0}
+
+    async def slow_save(*args):
+        saving["now"] += 1
+        saving["peak"] = max(saving["peak"], saving["now"])
+        await asyncio.sleep(0.01)
+        try:
+            return await save(*args)
+        finally:
+            saving["now"] -= 1
+
+    monkeypatch.setattr(repo, "save_farm_context", slow_save)
+
+    async def run():
+        first = asyncio.create_task(store.merge(conversation_id, {"crop": "paddy"}))
+        waiting = [
+            asyncio.create_task(store.merge(conversation_id, {"location": "Thanjavur"})),
+            asyncio.create_task(store.merge(conversation_id, {"land_size_acres": 2.5})),
+        ]
+        await first
+        # Arrives after the first merge released the lock, while others still wait for it
+        await store.merge(conversation_id, {"irrigation_method": "canal"})
+        await asyncio.gather(*waiting)
+        return await store.get(conversation_id)
+
+    final = asyncio.run(run())
+    assert saving["peak"] == 1
+    assert store.metrics()["write_conflicts_total"] == 0
+    assert final.version == 4
+    assert (final.context.crop, final.context.location, final.context.land_size_acres) == ("paddy", "Thanjavur", 2.5)
+    assert final.context.irrigation_method == "canal"
+    assert len(store._locks) == 0
@@ -0,0 +1,55 @@
+"""
+Tests for cursor validation on the paginated conversation routes.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.routes.conversations import get_conversation_messages, get_user_conversations
+from app.utils.cursor import encode_cursor
+
+INVALID_CURSORS = [
+    "not a cursor",
+    "é",
+    encode_cursor("2026-01-01T00:00:00+00:00"),
+    encode_cursor("yesterday", str(uuid.uuid4())),
+    encode_cursor("2026-01-01T00:00:00+00:00", "not-a-uuid"),
+    encode_cursor(20260101, str(uuid.uuid4())),
+    encode_cursor("2026-01-01T00:00:00+00:00", None),
+]
+
+
+def status_of(call) -> int:
+    try:
+        asyncio.run(call)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+@pytest.mark.parametrize("cursor", INVALID_CURSORS)
+def test_invalid_conversation_cursor_is_rejected(repo, cursor):
+    assert status_of(get_user_conversations(str(uuid.uuid4()), Response(), limit=10, cursor=cursor)) == 400
+
+
+@pytest.mark.parametrize("cursor", INVALID_CURSORS)
+def test_invalid_message_cursor_is_rejected(repo, conversation_id, cursor):
+    assert status_of(get_conversation_messages(
+        conversation_id, Response(), limit=10, offset=0, before=cursor, after=None, since=None, latest=False
+    )) == 400
+
+
+def test_conversation_cursor_pages(repo):
+    async def pages():
+        user = await repo.create_user({"email": "pages@example.com", "username": "farmer"})
+        for title in ("Wheat", "Paddy", "Mustard"):
+            await repo.create_conversation(user["id"], title)
+        response = Response()
+        first = await get_user_conversations(user["id"], response, limit=2, cursor=None)
+        rest = await get_user_conversations(user["id"], Response(), limit=2, cursor=response.headers["x-next-cursor"])
+        return first + rest
+
+    assert sorted(c["title"] for c in asyncio.run(pages())) == ["Mustard", "Paddy", "Wheat"]
@@ -0,0 +1,34 @@
+"""
+Tests for filling the history cache from the database.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.history_cache import get_history_cache
+from app.utils.sliding_window import get_sliding_window_history
+from conftest import message_rows
+
+
+def test_failed_load_clears_fill_marker(repo, conversation_id, monkeypatch):
+    async def unavailable(*args):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(repo, "recent_messages", unavailable)
+    with pytest.raises(ConnectionError):
+        asyncio.run(get_sliding_window_history(conversation_id))
+    assert get_history_cache()._filling == {}
+
+
+def test_load_fills_cache(repo, conversation_id):
+    rows = message_rows(conversation_id, 4)
+
+    async def load():
+        await repo.insert_messages(rows)
+        return await get_sliding_window_history(conversation_id)
+
+    assert [m["id"] for m in asyncio.run(load())] == [row["id"] for row in rows]
+    cache = get_history_cache()
+    assert cache._filling == {}
+    assert [m["id"] for m in cache.get(conversation_id, 30)] == [row["id"] for row in rows]
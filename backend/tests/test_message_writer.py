@@ -0,0 +1,155 @@
+"""
+Tests for the write-behind message writer: batching, retries, dead letters
+and reads that include messages not stored yet.
+"""
+
+import asyncio
+from typing import Dict, List
+
+import pytest
+from fastapi import Response
+
+import app.db.message_writer as message_writer
+from app.db.message_writer import MessageWriter
+from app.routes.conversations import get_conversation_messages, get_user_conversations
+from app.utils.cursor import encode_cursor
+from conftest import message_rows
+
+
+class StubRepository:
+    """Records inserted batches; fails the first `failures` calls and any batch holding a poison row"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches: List[List[Dict]] = []
+
+    async def insert_messages(self, rows: List[Dict]) -> List[Dict]:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        if any(row["content"] == "poison" for row in rows):
+            raise ValueError("row rejected")
+        self.batches.append(rows)
+        return rows
+
+    @property
+    def stored(self) -> List[str]:
+        return [row["content"] for batch in self.batches for row in batch]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(message_writer, "MESSAGE_WRITER_RETRY_BACKOFF_SECONDS", 0)
+
+
+def write_all(writer: MessageWriter, contents: List[str]) -> None:
+    async def run():
+        for content in contents:
+            await writer.write("c1", "user", content)
+        await writer.close()
+
+    asyncio.run(run())
+
+
+def test_flush_stores_everything_in_batches_in_order():
+    stub = StubRepository()
+    writer = MessageWriter(repository=stub, batch_size=3, flush_ms=10)
+    contents = [f"message {i}" for i in range(7)]
+    write_all(writer, contents)
+    assert stub.stored == contents
+    assert all(len(batch) <= 3 for batch in stub.batches)
+    assert writer.pending("c1") == []
+    assert writer.metrics()["written_total"] == 7
+
+
+def test_rows_are_pending_until_stored():
+    async def run():
+        writer = MessageWriter(repository=StubRepository(), flush_ms=10)
+        row = await writer.write("c1", "user", "hello")
+        assert writer.pending("c1") == [row]
+        await writer.flush()
+        assert writer.pending("c1") == []
+        await writer.close()
+
+    asyncio.run(run())
+
+
+def test_failed_batch_is_retried():
+    stub = StubRepository(failures=2)
+    writer = MessageWriter(repository=stub, batch_size=3, flush_ms=10, max_retries=2)
+    write_all(writer, ["a", "b", "c"])
+    assert stub.stored == ["a", "b", "c"]
+    assert writer.dead_letters() == []
+    assert writer.metrics()["retries_total"] == 2
+
+
+def test_poison_row_is_dead_lettered_alone():
+    stub = StubRepository()
+    writer = MessageWriter(repository=stub, batch_size=3, flush_ms=10, max_retries=1)
+    write_all(writer, ["a", "poison", "c"])
+    assert stub.stored == ["a", "c"]
+    assert [row["content"] for row in writer.dead_letters()] == ["poison"]
+    metrics = writer.metrics()
+    assert (metrics["written_total"], metrics["failed_total"], metrics["dead_letters"]) == (2, 1, 1)
+
+
+def test_batch_that_keeps_failing_is_dead_lettered():
+    stub = StubRepository(failures=100)
+    writer = MessageWriter(repository=stub, batch_size=2, flush_ms=10, max_retries=1)
+    write_all(writer, ["a", "b"])
+    assert stub.stored == []
+    assert [row["content"] for row in writer.dead_letters()] == ["a", "b"]
+    assert writer.pending("c1") == []
+
+
+def test_reads_include_pending_messages(repo, conversation_id, monkeypatch):
+    async def run():
+        conversation = await repo.get_conversation(conversation_id)
+        rows = message_rows(conversation_id, 3)
+        await repo.insert_messages(rows)
+
+        # A writer whose inserts wait until released
+        released = asyncio.Event()
+
+        class StalledRepository:
+            async def insert_messages(self, rows):
+                await released.wait()
+                return await repo.insert_messages(rows)
+
+        writer = MessageWriter(repository=StalledRepository(), flush_ms=10)
+        monkeypatch.setattr(message_writer, "_writer", writer)
+        await writer.write(conversation_id, "user", "is it time to irrigate?")
+        await writer.write(conversation_id, "assistant", "yes, irrigate tomorrow")
+
+        async def read():
+            page = await get_conversation_messages(
+                conversation_id, Response(), limit=50, offset=0, before=None, after=None, since=None, latest=False
+            )
+            latest_response = Response()
+            latest = await get_conversation_messages(
+                conversation_id, latest_response, limit=2, offset=0, before=None, after=None, since=None, latest=True
+            )
+            since_cursor = latest_response.headers["x-since-cursor"]
+            delta = await get_conversation_messages(
+                conversation_id, Response(), limit=50, offset=0, before=None, after=None,
+                since=encode_cursor(rows[-1]["created_at"], rows[-1]["id"]), latest=False
+            )
+            conversations = await get_user_conversations(conversation["user_id"], Response(), limit=None, cursor=None)
+            return page, latest, delta, since_cursor, conversations
+
+        for _ in range(2):
+            page, latest, delta, since_cursor, conversations = await read()
+            assert [m["content"] for m in page] == [
+                "message 0", "message 1", "message 2", "is it time to irrigate?", "yes, irrigate tomorrow"
+            ]
+            assert [m["content"] for m in latest] == ["is it time to irrigate?", "yes, irrigate tomorrow"]
+            assert [m["id"] for m in delta] == [m["id"] for m in latest]
+            assert since_cursor == encode_cursor(latest[-1]["createdAt"], latest[-1]["id"])
+            assert conversations[0]["messageCount"] == 5
+            assert conversations[0]["lastMessage"] == "yes, irrigate tomorrow"
+            # Once stored, the same messages are read back without duplicates
+            released.set()
+            await writer.flush()
+        await writer.close()
+
+    asyncio.run(run())
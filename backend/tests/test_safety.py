@@ -0,0 +1,99 @@
+"""
+Tests for banned-chemical marking, in one pass and on a chunked stream.
+"""
+
+import pytest
+
+from app.krishi import safety
+from app.krishi.safety import BANNED_CHEMICALS_INDIA, SafetyValidator, StreamingSanitizer
+from app.utils.aho_corasick import AhoCorasick
+
+
+def stream(sanitizer: StreamingSanitizer, chunks) -> str:
+    return "".join(sanitizer.feed(chunk) for chunk in chunks) + sanitizer.flush()
+
+
+def splits(text: str):
+    """Every way of cutting `text` into two chunks"""
+    for offset in range(len(text) + 1):
+        yield offset, [text[:offset], text[offset:]]
+
+
+@pytest.fixture
+def state_bans(monkeypatch):
+    """Give Kerala a ban that is not on the national list"""
+    monkeypatch.setitem(safety.BANNED_BY_STATE, "kerala", {"endosulfan", "glyphosate"})
+    safety._banned_automaton.cache_clear()
+    yield
+    safety._banned_automaton.cache_clear()
+
+
+@pytest.mark.parametrize("name", sorted(BANNED_CHEMICALS_INDIA))
+def test_name_split_at_every_offset(name):
+    text = f"Spray {name} at 2 ml per litre."
+    expected = f"Spray [BANNED: {name}] at 2 ml per litre."
+    assert SafetyValidator.sanitize_ai_response(text) == expected
+    for offset, chunks in splits(text):
+        assert stream(SafetyValidator.stream_sanitizer(), chunks) == expected, offset
+
+
+def test_one_character_chunks():
+    text = "Avoid phorate; carbofuran is also banned."
+    assert stream(SafetyValidator.stream_sanitizer(), list(text)) == (
+        "Avoid [BANNED: phorate]; [BANNED: carbofuran] is also banned."
+    )
+
+
+def test_mixed_case_keeps_original_spelling():
+    text = "Use EndoSulfan or MONOCROTOPHOS"
+    expected = "Use [BANNED: EndoSulfan] or [BANNED: MONOCROTOPHOS]"
+    assert SafetyValidator.sanitize_ai_response(text) == expected
+    for offset, chunks in splits(text):
+        assert stream(SafetyValidator.stream_sanitizer(), chunks) == expected, offset
+
+
+def test_state_specific_ban(state_bans):
+    text = "Glyphosate controls the weeds."
+    marked = "[BANNED: Glyphosate] controls the weeds."
+    assert SafetyValidator.sanitize_ai_response(text, "Thrissur, Kerala") == marked
+    assert SafetyValidator.sanitize_ai_response(text, "Ludhiana, Punjab") == text
+    assert SafetyValidator.sanitize_ai_response(text) == text
+    for offset, chunks in splits(text):
+        assert stream(SafetyValidator.stream_sanitizer("kerala"), chunks) == marked, offset
+        assert stream(SafetyValidator.stream_sanitizer("Punjab"), chunks) == text, offset
+
+
+def test_overlapping_names_prefer_leftmost_longest():
+    automaton = AhoCorasick({"methyl", "parathion", "methyl parathion", "thionate"})
+    text = "no methyl parathionate here"
+    expected = "no [BANNED: methyl parathion]ate here"
+    for offset, chunks in splits(text):
+        assert stream(StreamingSanitizer(automaton), chunks) == expected, offset
+
+
+def test_adjacent_names():
+    text = "phoratecarbofuran"
+    expected = "[BANNED: phorate][BANNED: carbofuran]"
+    for offset, chunks in splits(text):
+        assert stream(SafetyValidator.stream_sanitizer(), chunks) == expected, offset
+
+
+def test_flush_marks_name_at_end_of_stream():
+    sanitizer = SafetyValidator.stream_sanitizer()
+    sent = sanitizer.feed("Never use dicofol")
+    # The tail that could still grow into a longer name is held back
+    assert "dicofol" not in sent
+    assert sent + sanitizer.flush() == "Never use [BANNED: dicofol]"
+
+
+def test_flush_releases_partial_name_unchanged():
+    sanitizer = SafetyValidator.stream_sanitizer()
+    assert sanitizer.feed("Ask about endo") + sanitizer.flush() == "Ask about endo"
+    # A flushed sanitizer starts empty
+    assert sanitizer.flush() == ""
+
+
+def test_holds_back_less_than_longest_name():
+    sanitizer = SafetyValidator.stream_sanitizer()
+    text = "x" * 100
+    assert len(text) - len(sanitizer.feed(text)) == safety._banned_automaton(None).max_length - 1
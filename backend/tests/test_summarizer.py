@@ -0,0 +1,66 @@
+"""
+Tests for cutting the history window at the rolling summary.
+"""
+
+import asyncio
+
+import pytest
+
+from app.krishi.summarizer import ConversationSummarizer, RollingSummary
+from app.utils.sliding_window import get_sliding_window_history
+from conftest import message_rows
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    summarizer = ConversationSummarizer(keep_recent=10, fold_batch=10)
+    summarizer.scheduled = []
+    monkeypatch.setattr(summarizer, "_schedule_refresh", summarizer.scheduled.append)
+    return summarizer
+
+
+def summary_until(row) -> RollingSummary:
+    return RollingSummary("- paddy sown on 1 July", row["created_at"], row["id"])
+
+
+def window(repo, conversation_id, rows, limit=30):
+    async def load():
+        await repo.insert_messages(rows)
+        return await get_sliding_window_history(conversation_id, limit=limit)
+
+    return asyncio.run(load())
+
+
+def test_summary_inside_window_cuts_after_it(repo, conversation_id, summarizer):
+    rows = message_rows(conversation_id, 12)
+    history = window(repo, conversation_id, rows)
+    kept = summarizer.unsummarized(conversation_id, history, summary_until(rows[7]))
+    assert [m["id"] for m in kept] == [r["id"] for r in rows[8:]]
+    assert summarizer.scheduled == []
+
+
+def test_gap_before_window_schedules_refresh(repo, conversation_id, summarizer):
+    # The summary ends at message 3 but the window holds messages 10-39
+    rows = message_rows(conversation_id, 40)
+    history = window(repo, conversation_id, rows)
+    assert all(m["created_at"] for m in history)
+    kept = summarizer.unsummarized(conversation_id, history, summary_until(rows[3]))
+    assert [m["id"] for m in kept] == [r["id"] for r in rows[10:]]
+    assert conversation_id in summarizer.scheduled
+    assert summarizer.metrics()["gaps_total"] == 1
+
+
+def test_summary_point_missing_from_window_cuts_by_position(repo, conversation_id, summarizer):
+    rows = message_rows(conversation_id, 12)
+    history = window(repo, conversation_id, rows[:5] + rows[6:])
+    # The last summarized message is gone (e.g. deleted); newer messages are kept
+    kept = summarizer.unsummarized(conversation_id, history, summary_until(rows[5]))
+    assert [m["id"] for m in kept] == [r["id"] for r in rows[6:]]
+    assert summarizer.metrics()["gaps_total"] == 0
+
+
+def test_messages_without_created_at_do_not_fail(conversation_id, summarizer):
+    history = [{"id": f"m{i}", "role": "user", "content": "hi", "tokens_used": 1} for i in range(3)]
+    summary = RollingSummary("- wheat", "2026-01-01T00:00:00+00:00", "gone")
+    assert summarizer.unsummarized(conversation_id, history, summary) == history
+    assert conversation_id in summarizer.scheduled
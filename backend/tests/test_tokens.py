@@ -0,0 +1,48 @@
+"""
+Tests for clipping history messages and fitting them to the token budget.
+"""
+
+import asyncio
+
+from app.krishi.tokens import CLIP_MARKER, clip_message, count_tokens, fit_history
+from app.utils.sliding_window import get_sliding_window_history
+from conftest import message_rows
+
+
+def message(content: str, tokens_used=None):
+    return {"id": "m1", "role": "assistant", "content": content, "tokens_used": tokens_used}
+
+
+def test_clip_message_leaves_short_content_unmarked():
+    clipped = clip_message(message("Irrigate tomorrow."), 50)
+    assert clipped["content"] == "Irrigate tomorrow."
+    assert clipped["tokens_used"] == count_tokens("Irrigate tomorrow.")
+
+
+def test_clip_message_marks_cut_content_within_limit():
+    content = "\n".join(f"Step {i}: check the field for stem borer damage." for i in range(40))
+    clipped = clip_message(message(content), 30)
+    assert clipped["content"].endswith(CLIP_MARKER)
+    assert clipped["content"].startswith("Step 0:")
+    assert clipped["tokens_used"] <= 30
+
+
+def test_fit_history_keeps_short_messages_whole():
+    history = [message("short answer", 1)]
+    assert fit_history(history, budget=100, max_message_tokens=50) == history
+
+
+def test_legacy_tokens_used_is_recounted(repo, conversation_id):
+    # Older rows stored word counts of whole prompts plus answers
+    rows = message_rows(conversation_id, 6)
+    for row in rows:
+        row["tokens_used"] = 5000
+
+    async def load():
+        await repo.insert_messages(rows)
+        return await get_sliding_window_history(conversation_id, limit=30)
+
+    history = asyncio.run(load())
+    assert [m["tokens_used"] for m in history] == [count_tokens(row["content"]) for row in rows]
+    # Nothing is clipped or dropped on account of the stale counts
+    assert fit_history(history, budget=200, max_message_tokens=50) == history